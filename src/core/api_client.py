@@ -1,14 +1,54 @@
+import asyncio
 import httpx
+import threading
 import uuid
 import time
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, AsyncIterator, Awaitable, TypeVar
+from .rate_limit import GENERATE, SESSION, RateLimiter
+from .utils import parse_expiry
+
+try:
+    import h2  # noqa: F401  (enables httpx's HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_IMAGE_MODEL = "IMAGEN_3_5"
+
+T = TypeVar("T")
 
 class WhiskClient:
+    """
+    Whisk API client. One instance is meant to be shared by every worker: the sync
+    httpx.Client is thread-safe and the AsyncClient multiplexes all coroutines of the
+    engine loop over a small pool of (HTTP/2 when available) keep-alive connections.
+
+    With a `rate_limiter`, the blocking calls (validate_session, generate_image) wait
+    for a token of their endpoint's bucket. The async generate_image_body leaves pacing to
+    the caller, which can then wait for a token before committing a concurrency slot.
+    A resend after a 401 is a new request and always waits for its own token.
+
+    The Authorization header is not part of the shared clients' defaults: every request
+    sends a snapshot of the current one, and a refresh swaps it in a single assignment.
+    A 401 triggers one single-flight refresh (concurrent 401s wait for it instead of
+    refreshing again) and the request is retried once with the new token.
+    """
     BASE_URL = "https://aisandbox-pa.googleapis.com/v1/whisk:generateImage"
+    SESSION_URL = "https://labs.google/fx/api/auth/session"
+    # Origins we talk to; connections to both are opened ahead of the first real request
+    WARMUP_URLS = ("https://labs.google/", "https://aisandbox-pa.googleapis.com/")
     
-    def __init__(self, token: str, cookies: Optional[Dict[str, str]] = None):
+    def __init__(self,
+                 token: str,
+                 cookies: Optional[Dict[str, str]] = None,
+                 http2: bool = True,
+                 max_connections: int = 100,
+                 max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 120.0,
+                 rate_limiter: Optional[RateLimiter] = None):
         self.token = token
+        self.rate_limiter = rate_limiter
         self.cookies = cookies or {}
         self.headers = {
             "Content-Type": "text/plain;charset=UTF-8",
@@ -18,10 +58,44 @@ class WhiskClient:
             "Accept": "*/*"
         }
         
+        # Replaced wholesale (never mutated) so in-flight requests keep a consistent snapshot
+        self._auth_headers: Dict[str, str] = {}
         if token and token != "placeholder":
-            self.headers["Authorization"] = f"Bearer {token}"
+            self._auth_headers = {"Authorization": f"Bearer {token}"}
+        # Bumped on every token swap; lets concurrent 401s share one refresh
+        self._auth_generation = 0
+        self._auth_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        # Epoch seconds the session expires at, from the last session fetch
+        self.expires_at: Optional[float] = None
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_stop = threading.Event()
+        # Set on stop and whenever expires_at changes, so the refresher recomputes its wait
+        self._refresher_wake = threading.Event()
+        # HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive without it
+        self.http2 = http2 and HTTP2_AVAILABLE
+        # Idle connections are kept long enough to span the ~10s gaps between generations
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
         # Initialize client with cookies if provided
-        self.client = httpx.Client(headers=self.headers, cookies=self.cookies, timeout=60.0)
+        self.client = httpx.Client(headers=self.headers, cookies=self.cookies, timeout=60.0,
+                                   http2=self.http2, limits=self.limits)
+        # Async client is bound to the event loop that created it, so it is built lazily
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def warmup_async(self):
+        """Opens pooled connections (TCP + TLS) to each origin so the first real call skips the handshake."""
+        client = self.get_async_client()
+
+        async def _head(url):
+            try:
+                await client.head(url, timeout=10.0)
+            except httpx.HTTPError as e:
+                print(f"Warmup of {url} failed: {e}")
+
+        await asyncio.gather(*(_head(url) for url in self.WARMUP_URLS))
 
     def validate_session(self) -> Optional[Dict[str, Any]]:
         """
@@ -36,28 +110,99 @@ class WhiskClient:
             # I will implement the logic to fetch and return data here. The delay should be handled by the caller or if strictly necessary here.
             # Given the context of "after 10 sec dely", I'll add a small sleep if this is running in a thread, but for now let's just fetch.
             
-            resp = self.client.get("https://labs.google/fx/api/auth/session")
+            if self.rate_limiter:
+                self.rate_limiter.acquire(SESSION)
+            resp = self.client.get(self.SESSION_URL)
             resp.raise_for_status()
             data = resp.json()
-            
-            # Update token if present
-            if "access_token" in data:
-                self.token = data["access_token"]
-                self.headers["Authorization"] = f"Bearer {self.token}"
-                self.client.headers.update(self.headers)
-                
+            self._apply_session(data)
             return data
         except Exception as e:
             print(f"Session validation failed: {e}")
             return None
 
-    def generate_image(self, 
-                       prompt: str, 
-                       aspect_ratio: str = "IMAGE_ASPECT_RATIO_LANDSCAPE", 
-                       image_model: str = "IMAGEN_3_5",
-                       seed: Optional[int] = None,
-                       workflow_id: Optional[str] = None) -> Dict[str, Any]:
-        
+    def _apply_session(self, data: Dict[str, Any]):
+        with self._auth_lock:
+            # Update token if present
+            if "access_token" in data:
+                self.token = data["access_token"]
+                self._auth_headers = {"Authorization": f"Bearer {self.token}"}
+                self._auth_generation += 1
+            self.expires_at = parse_expiry(data.get("expires"))
+        self._refresher_wake.set()
+
+    @property
+    def auth_generation(self) -> int:
+        """Counts token swaps; changes whenever a session fetch or refresh brings a new token."""
+        return self._auth_generation
+
+    def refresh_token(self, seen_generation: Optional[int] = None) -> bool:
+        """
+        Fetches a fresh access token. Single-flight: if the token already changed since
+        the caller saw `seen_generation`, returns True without another fetch.
+        """
+        with self._refresh_lock:
+            if seen_generation is not None and self._auth_generation != seen_generation:
+                return True
+            generation = self._auth_generation
+            return self.validate_session() is not None and self._auth_generation != generation
+
+    def start_auto_refresh(self, margin: float = 300.0, fallback_interval: float = 1800.0, retry_interval: float = 60.0):
+        """
+        Refreshes the token in a background thread `margin` seconds before the session
+        expires (every `fallback_interval` when the expiry is unknown). The wait is
+        recomputed every time a session fetch changes the expiry.
+        """
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._refresher_stop.clear()
+
+        def _loop():
+            # After a refresh, don't try again sooner than this (the session may not report a later expiry)
+            min_wait = 0.0
+            while True:
+                # Cleared before reading expires_at, so a change from here on wakes the wait below
+                self._refresher_wake.clear()
+                if self._refresher_stop.is_set():
+                    return
+                if self.expires_at is not None:
+                    wait = max(min_wait, self.expires_at - margin - time.time())
+                else:
+                    wait = fallback_interval
+                woken = self._refresher_wake.wait(wait)
+                if self._refresher_stop.is_set():
+                    return
+                if woken:
+                    min_wait = 0.0
+                    continue
+                generation = self._auth_generation
+                min_wait = retry_interval
+                if not self.refresh_token(generation):
+                    print(f"Background token refresh failed; retrying in {retry_interval:.0f}s")
+
+        self._refresher = threading.Thread(target=_loop, name="WhiskTokenRefresher", daemon=True)
+        self._refresher.start()
+
+    def stop_auto_refresh(self):
+        self._refresher_stop.set()
+        self._refresher_wake.set()
+
+    def _send(self, request: Callable[[Dict[str, str]], httpx.Response], bucket: str = GENERATE) -> httpx.Response:
+        """Sends with the current auth header; on 401 refreshes once (single-flight) and resends."""
+        generation = self._auth_generation
+        response = request(self._auth_headers)
+        if response.status_code == 401 and self.refresh_token(generation):
+            if self.rate_limiter:
+                self.rate_limiter.acquire(bucket)
+            response = request(self._auth_headers)
+        return response
+
+    def _build_payload(self,
+                       prompt: str,
+                       aspect_ratio: str,
+                       image_model: str,
+                       seed: Optional[int],
+                       workflow_id: Optional[str]) -> Dict[str, Any]:
         if not workflow_id:
             workflow_id = str(uuid.uuid4())
             
@@ -77,6 +222,16 @@ class WhiskClient:
         
         if seed is not None:
             payload["seed"] = seed
+        return payload
+
+    def generate_image(self, 
+                       prompt: str, 
+                       aspect_ratio: str = "IMAGE_ASPECT_RATIO_LANDSCAPE", 
+                       image_model: str = DEFAULT_IMAGE_MODEL,
+                       seed: Optional[int] = None,
+                       workflow_id: Optional[str] = None) -> Dict[str, Any]:
+        
+        payload = self._build_payload(prompt, aspect_ratio, image_model, seed, workflow_id)
             
         try:
             print(f"Generating image with model: {image_model}, aspect: {aspect_ratio}")
@@ -87,7 +242,9 @@ class WhiskClient:
             #     masked_headers["Authorization"] = masked_headers["Authorization"][:15] + "..."
             # print(f"Headers: {masked_headers}")
             
-            response = self.client.post(self.BASE_URL, json=payload)
+            if self.rate_limiter:
+                self.rate_limiter.acquire(GENERATE)
+            response = self._send(lambda auth: self.client.post(self.BASE_URL, json=payload, headers=auth))
             print(f"Response Status: {response.status_code}")
             response.raise_for_status()
             return response.json()
@@ -98,5 +255,69 @@ class WhiskClient:
             print(f"Request Error: {e}")
             raise
 
+    def get_async_client(self) -> httpx.AsyncClient:
+        """Returns the AsyncClient for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(headers=self.headers, cookies=self.cookies, timeout=60.0,
+                                                   http2=self.http2, limits=self.limits)
+            self._async_loop = loop
+        return self._async_client
+
+    async def generate_image_body(self,
+                                  prompt: str,
+                                  consume: Callable[[AsyncIterator[bytes]], Awaitable[T]],
+                                  aspect_ratio: str = "IMAGE_ASPECT_RATIO_LANDSCAPE",
+                                  image_model: str = DEFAULT_IMAGE_MODEL,
+                                  seed: Optional[int] = None,
+                                  workflow_id: Optional[str] = None) -> T:
+        """
+        Streams the generateImage response body without parsing it. Once the response is
+        known to be successful, `consume` gets an async iterator of raw (gzip-decoded)
+        chunks as they arrive and its result is returned, so decoding can run in another
+        stage while the body is still downloading (see ChunkChannel).
+        """
+        payload = self._build_payload(prompt, aspect_ratio, image_model, seed, workflow_id)
+
+        async def _read(auth: Dict[str, str]) -> T:
+            async with self.get_async_client().stream("POST", self.BASE_URL, json=payload, headers=auth) as response:
+                print(f"Response Status: {response.status_code}")
+                if response.is_error:
+                    # Error bodies are small; read them so the message can be logged
+                    await response.aread()
+                    response.raise_for_status()
+                return await consume(response.aiter_bytes())
+
+        try:
+            print(f"Generating image with model: {image_model}, aspect: {aspect_ratio}")
+            return await self._send_async(_read)
+        except httpx.HTTPStatusError as e:
+            print(f"HTTP Error: {e.response.status_code} - {e.response.text}")
+            raise
+        except Exception as e:
+            print(f"Request Error: {e}")
+            raise
+
+    async def _send_async(self, request: Callable[[Dict[str, str]], Any], bucket: str = GENERATE) -> Any:
+        """Async counterpart of _send for requests that raise HTTPStatusError on error responses."""
+        generation = self._auth_generation
+        try:
+            return await request(self._auth_headers)
+        except httpx.HTTPStatusError as e:
+            # The refresh is a blocking session fetch; keep it off the loop
+            if e.response.status_code != 401 or not await asyncio.to_thread(self.refresh_token, generation):
+                raise
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async(bucket)
+        return await request(self._auth_headers)
+
+    async def aclose(self):
+        """Closes the AsyncClient if it belongs to the running loop."""
+        if self._async_client is not None and self._async_loop is asyncio.get_running_loop():
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+
     def close(self):
+        self.stop_auto_refresh()
         self.client.close()
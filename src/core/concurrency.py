@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+# Upper bound for the user-facing "Max Parallel" setting
+MAX_PARALLEL = 64
+
+# Status codes that mean the service wants us to slow down
+BACKOFF_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def clamp_parallel(n) -> int:
+    """Clamps a requested parallelism ceiling to the supported range."""
+    return max(1, min(MAX_PARALLEL, int(n)))
+
+def is_backoff_status(status_code: Optional[int]) -> bool:
+    """True for responses that signal overload (429/5xx). None means a transport error."""
+    return status_code is None or status_code in BACKOFF_STATUS_CODES
+
+class AIMDController:
+    """
+    Adaptive limit on in-flight requests (additive increase, multiplicative decrease).
+
+    The limit starts low and doubles per round-trip (slow start) until the first sign of
+    congestion, then grows by roughly one slot per round-trip while latency stays near the
+    best observed value. A 429/5xx or transport error cuts it by `backoff_factor`, at most
+    once per cooldown so a burst of errors from the same window only counts once.
+    Thread-safe; `acquire` is awaited from the engine loop.
+    """
+
+    def __init__(self,
+                 initial_limit: int = 2,
+                 min_limit: int = 1,
+                 max_limit: int = MAX_PARALLEL,
+                 backoff_factor: float = 0.5,
+                 latency_tolerance: float = 2.0,
+                 smoothing: float = 0.2):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.backoff_factor = backoff_factor
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.in_flight = 0
+        self.smoothed_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+
+        self._slow_start = True
+        self._last_backoff = 0.0
+        self._lock = threading.Lock()
+        self._released: Optional[asyncio.Event] = None
+        self._released_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def set_max_limit(self, max_limit: int):
+        with self._lock:
+            self.max_limit = max(self.min_limit, max_limit)
+            self.limit = min(self.limit, float(self.max_limit))
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight < self.current_limit:
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+        if self._released is not None:
+            self._released.set()
+
+    async def acquire(self):
+        """Waits until a slot is free under the current limit and takes it."""
+        loop = asyncio.get_running_loop()
+        if self._released is None or self._released_loop is not loop:
+            self._released = asyncio.Event()
+            self._released_loop = loop
+        while not self.try_acquire():
+            self._released.clear()
+            try:
+                # Timeout covers limit changes that happen without a release
+                await asyncio.wait_for(self._released.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                pass
+
+    def record_success(self, latency: float):
+        with self._lock:
+            if self.smoothed_latency is None:
+                self.smoothed_latency = latency
+            else:
+                self.smoothed_latency += self.smoothing * (latency - self.smoothed_latency)
+
+            if self.baseline_latency is None or self.smoothed_latency < self.baseline_latency:
+                self.baseline_latency = self.smoothed_latency
+            else:
+                # Let the baseline drift up slowly so a permanently slower service isn't read as congestion forever
+                self.baseline_latency += 0.01 * (self.smoothed_latency - self.baseline_latency)
+
+            if self.smoothed_latency > self.baseline_latency * self.latency_tolerance:
+                # Requests are queueing server-side: hold the limit and leave slow start
+                self._slow_start = False
+                return
+
+            if self._slow_start:
+                self.limit += 1.0
+            else:
+                self.limit += 1.0 / max(self.limit, 1.0)
+            self.limit = min(self.limit, float(self.max_limit))
+
+    def record_failure(self, status_code: Optional[int] = None):
+        """Backs off on overload signals. Other errors (e.g. 400 for a rejected prompt) are ignored."""
+        if not is_backoff_status(status_code):
+            return
+        with self._lock:
+            now = time.monotonic()
+            cooldown = self.smoothed_latency or 1.0
+            if now - self._last_backoff < cooldown:
+                return
+            self._last_backoff = now
+            self._slow_start = False
+            self.limit = max(float(self.min_limit), self.limit * self.backoff_factor)
@@ -0,0 +1,218 @@
+import base64
+import codecs
+import os
+import tempfile
+from typing import Callable, Iterable, List, Optional, Union
+
+# Base64 text decoded per write; a multiple of 4 so blocks never split a quantum
+DECODE_BLOCK_CHARS = 64 * 1024
+
+JSON_ESCAPES = {'/': '/', '\\': '\\', '"': '"', 'b': '', 'f': '', 'n': '', 'r': '', 't': ''}
+
+class Base64FileWriter:
+    """
+    Decodes base64 text fed in arbitrary pieces straight into a temp file next to
+    `output_path`, then renames it into place on commit(). Readers of `output_path`
+    only ever see a missing file or a complete one.
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        directory = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".part", dir=directory)
+        self._file = os.fdopen(fd, "wb")
+        self._pending = ""
+        self.bytes_written = 0
+
+    def write(self, text: str):
+        self._pending += text
+        if len(self._pending) >= DECODE_BLOCK_CHARS:
+            cut = len(self._pending) - len(self._pending) % 4
+            self._decode(self._pending[:cut])
+            self._pending = self._pending[cut:]
+
+    def _decode(self, text: str):
+        data = base64.b64decode(text)
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def commit(self) -> str:
+        try:
+            if self._pending:
+                # Tolerate missing padding on the final quantum
+                self._decode(self._pending + "=" * (-len(self._pending) % 4))
+                self._pending = ""
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            if self.bytes_written == 0:
+                raise ValueError(f"Empty image for {self.output_path}")
+            os.replace(self.temp_path, self.output_path)
+        except Exception:
+            self.abort()
+            raise
+        return self.output_path
+
+    def abort(self):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+class EncodedImageExtractor:
+    """
+    Incremental scanner for a generateImage response body. Pulls every
+    "encodedImage" string value out of the JSON as it streams in and hands it to a
+    Base64FileWriter, so the full body, the base64 string and the decoded image are
+    never held in memory at once.
+
+    `path_for_image(n)` gives the output path for the n-th image (0-based), or None
+    to skip it.
+    """
+
+    KEY = '"encodedImage"'
+    DATA_URL_MAX = 100  # "data:image/jpeg;base64," prefixes are far shorter
+
+    def __init__(self, path_for_image: Callable[[int], Optional[str]]):
+        self.path_for_image = path_for_image
+        self.saved_paths: List[str] = []
+        self.images_seen = 0
+
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._state = "search"   # search -> colon -> quote -> value
+        self._tail = ""          # unmatched end of the previous chunk while searching
+        self._escape = None      # partial escape sequence inside a value
+        self._prefix = ""        # start of a value, held until we know if it's a data URL
+        self._writer: Optional[Base64FileWriter] = None
+
+    def feed(self, chunk: Union[bytes, str]):
+        text = self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        pos = 0
+        while pos < len(text):
+            if self._state == "search":
+                buf = self._tail + text[pos:]
+                idx = buf.find(self.KEY)
+                if idx < 0:
+                    self._tail = buf[-(len(self.KEY) - 1):]
+                    return
+                pos += idx + len(self.KEY) - len(self._tail)
+                self._tail = ""
+                self._state = "colon"
+            elif self._state in ("colon", "quote"):
+                ch = text[pos]
+                pos += 1
+                if ch.isspace():
+                    continue
+                expected = ":" if self._state == "colon" else '"'
+                if ch != expected:
+                    # Not a key after all
+                    self._state = "search"
+                    pos -= 1
+                elif self._state == "colon":
+                    self._state = "quote"
+                else:
+                    self._start_value()
+            else:
+                pos = self._consume_value(text, pos)
+
+    def _start_value(self):
+        self._state = "value"
+        self._prefix = ""
+        path = self.path_for_image(self.images_seen)
+        self.images_seen += 1
+        self._writer = Base64FileWriter(path) if path else None
+
+    def _consume_value(self, text: str, pos: int) -> int:
+        out = []
+        while pos < len(text):
+            if self._escape is not None:
+                self._escape += text[pos]
+                pos += 1
+                if self._escape[0] == "u":
+                    if len(self._escape) == 5:
+                        out.append(chr(int(self._escape[1:], 16)))
+                        self._escape = None
+                else:
+                    out.append(JSON_ESCAPES.get(self._escape, ""))
+                    self._escape = None
+                continue
+
+            # Fast path: copy everything up to the next quote or backslash
+            quote = text.find('"', pos)
+            backslash = text.find("\\", pos)
+            stop = min(i for i in (quote, backslash, len(text)) if i >= 0)
+            out.append(text[pos:stop])
+            pos = stop
+            if pos == len(text):
+                break
+            pos += 1
+            if text[pos - 1] == "\\":
+                self._escape = ""
+            else:
+                self._write_value("".join(out))
+                self._finish_value()
+                return pos
+
+        self._write_value("".join(out))
+        return pos
+
+    def _write_value(self, text: str):
+        if not text or self._writer is None:
+            return
+        if self._prefix is not None:
+            self._prefix += text
+            if len(self._prefix) < self.DATA_URL_MAX and "," not in self._prefix and self._prefix.startswith("data:"[:len(self._prefix)]):
+                return
+            text = self._prefix
+            self._prefix = None
+            if text.startswith("data:") and "," in text:
+                # Remove header (e.g. data:image/jpeg;base64,...)
+                text = text.split(",", 1)[1]
+        self._writer.write(text)
+
+    def _finish_value(self):
+        self._state = "search"
+        if self._writer is None:
+            return
+        if self._prefix:
+            prefix, self._prefix = self._prefix, None
+            self._writer.write(prefix.split(",", 1)[1] if prefix.startswith("data:") and "," in prefix else prefix)
+        writer, self._writer = self._writer, None
+        try:
+            self.saved_paths.append(writer.commit())
+        except Exception as e:
+            print(f"Error saving image to {writer.output_path}: {e}")
+
+    def close(self):
+        """Discards a value cut off by a truncated body."""
+        if self._writer is not None:
+            self._writer.abort()
+            self._writer = None
+
+def write_base64_file(encoded: str, output_path: str) -> int:
+    """Decodes an in-memory base64 string (data URL header allowed) in blocks and atomically writes it. Returns the byte count."""
+    start = encoded.find(",", 0, EncodedImageExtractor.DATA_URL_MAX) + 1
+    writer = Base64FileWriter(output_path)
+    try:
+        for pos in range(start, len(encoded), DECODE_BLOCK_CHARS):
+            writer.write(encoded[pos:pos + DECODE_BLOCK_CHARS])
+    except Exception:
+        writer.abort()
+        raise
+    writer.commit()
+    return writer.bytes_written
+
+def first_image_path(path: str, n: int) -> Optional[str]:
+    """path_for_image that keeps only the first image. Picklable via functools.partial."""
+    return path if n == 0 else None
+
+def save_images_from_chunks(chunks: Iterable[Union[bytes, str]], path_for_image: Callable[[int], Optional[str]]) -> List[str]:
+    """Runs an EncodedImageExtractor over an iterable of body chunks. Returns the saved paths."""
+    extractor = EncodedImageExtractor(path_for_image)
+    try:
+        for chunk in chunks:
+            extractor.feed(chunk)
+    finally:
+        extractor.close()
+    return extractor.saved_paths
@@ -0,0 +1,113 @@
+import asyncio
+import queue
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional, Set, Union
+
+class IOPipeline:
+    """
+    Bounded hand-off from network coroutines to disk work.
+
+    Decode/write/verify jobs run on a small thread pool (or, for CPU-heavy decode, an
+    optional process pool) instead of on the event loop. At most `max_pending` jobs may
+    be queued or running; `submit` waits for room, so when the disk falls behind the
+    network stage stalls instead of piling up payloads in memory.
+
+    Bound to the event loop it is first used on; create one per engine run.
+    """
+
+    def __init__(self, io_workers: int = 4, max_pending: int = 32, use_process_pool: bool = False):
+        self.max_pending = max_pending
+        self._threads = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="WhiskIO")
+        self._processes: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(max_workers=io_workers) if use_process_pool else None
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pending: Set[asyncio.Future] = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, fn: Callable[..., Any], *args, cpu_bound: bool = False) -> asyncio.Future:
+        """
+        Waits for a free slot, then schedules fn(*args) and returns its future without
+        waiting for it. `cpu_bound` work goes to the process pool when one is enabled,
+        in which case fn and args must be picklable.
+        """
+        await self._slots.acquire()
+        executor: Executor = self._processes if cpu_bound and self._processes else self._threads
+        try:
+            future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        self._pending.add(future)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: asyncio.Future):
+        self._pending.discard(future)
+        self._slots.release()
+
+    async def drain(self):
+        """Waits until every submitted job has finished."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def shutdown(self, wait: bool = True):
+        """With wait=False, returns at once; queued jobs are dropped and running ones finish in the background."""
+        self._threads.shutdown(wait=wait, cancel_futures=not wait)
+        if self._processes:
+            self._processes.shutdown(wait=wait, cancel_futures=not wait)
+
+class ChunkChannel:
+    """
+    Bounded stream of body chunks from a coroutine to one consumer on an I/O thread.
+
+    The producer awaits `put` for each chunk, which waits while `max_chunks` are unread,
+    and calls `close` when the body ends or is cut off. The consumer (e.g.
+    save_images_from_chunks submitted to the IOPipeline) iterates the channel, so
+    decoding and writing run while the rest of the body is still downloading.
+    If the consumer stops early, further puts are dropped instead of blocking.
+
+    Create it on the event loop the producer runs on.
+    """
+
+    _END = object()
+
+    def __init__(self, max_chunks: int = 8):
+        self._loop = asyncio.get_running_loop()
+        self._space = asyncio.Semaphore(max_chunks)
+        self._items: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._abandoned = False
+
+    async def put(self, chunk: Union[bytes, str]):
+        if self._abandoned:
+            return
+        await self._space.acquire()
+        if not self._abandoned:
+            self._items.put(chunk)
+
+    def close(self):
+        """Ends the stream; the consumer sees the chunks put so far, then stops."""
+        self._items.put(self._END)
+
+    def _free_one(self):
+        try:
+            self._loop.call_soon_threadsafe(self._space.release)
+        except RuntimeError:
+            pass  # the loop is gone; nobody is waiting to put
+
+    def __iter__(self) -> Iterator[Union[bytes, str]]:
+        ended = False
+        try:
+            while True:
+                chunk = self._items.get()
+                if chunk is self._END:
+                    ended = True
+                    return
+                self._free_one()
+                yield chunk
+        finally:
+            if not ended:
+                # Consumer gave up: wake a producer blocked in put, later puts return at once
+                self._abandoned = True
+                self._free_one()
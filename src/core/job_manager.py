@@ -1,22 +1,99 @@
+import asyncio
+import heapq
+import random
 import threading
 import queue
-import sqlite3
 import time
 import os
+import uuid
 import json
-from typing import Callable, Optional, Dict, Any
-from .api_client import WhiskClient
-from .utils import save_image, save_metadata, sanitize_filename
+import sqlite3
+import httpx
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from .api_client import DEFAULT_IMAGE_MODEL, WhiskClient
+from .concurrency import AIMDController, clamp_parallel
+from .job_store import JobStore
+from .io_pipeline import ChunkChannel, IOPipeline
+from .rate_limit import GENERATE, RateLimiter
+from .result_cache import ResultCache, link_or_copy, make_cache_key
+from .retry import RetryPolicy, parse_retry_after
+from .scheduler import RETRY_PRIORITY_BOOST, JobScheduler
+from .session_pool import ACCOUNT_FAILURE_CODES, PooledSession, SessionPool
+from .image_stream import save_images_from_chunks, first_image_path
+from .utils import save_metadata, sanitize_filename, variation_filename
+
+# Default result cache folder, created inside the output folder (see enable_result_cache)
+RESULT_CACHE_DIRNAME = ".whisk_cache"
+
+# Statuses a previous session may have left behind unfinished
+RESUMABLE_STATUSES = ("PENDING", "RUNNING", "INTERRUPTED")
+
+def _ordered(landed: Dict[int, str]) -> List[str]:
+    return [landed[v] for v in sorted(landed)]
+
+def _release_once(release: Callable[[], None]) -> Callable[[], None]:
+    released = False
+    def _release():
+        nonlocal released
+        if not released:
+            released = True
+            release()
+    return _release
 
 class JobManager:
+    # Recovered jobs are read back from the DB this many at a time, when the queue runs low
+    RECOVERY_PAGE_SIZE = 500
+
     def __init__(self, db_path: str = "jobs.db"):
         self.db_path = db_path
-        self.queue = queue.Queue()
+        # Priority / fair-share / deadline ordering of queued jobs (see scheduler.JobScheduler)
+        self.queue = JobScheduler()
         self.running = False
         self.pause_event = threading.Event()
         self.pause_event.set() # Start unpaused
-        self.worker_threads: list[threading.Thread] = []
-        self.client: Optional[WhiskClient] = None
+        self.engine_thread: Optional[threading.Thread] = None
+        # Learned limit is kept across runs so a restart doesn't re-probe from scratch
+        self.concurrency = AIMDController()
+        # Disk stage: decode/write threads and how many payloads may wait for them
+        self.io_workers = 4
+        self.io_max_pending = 32
+        # Body chunks buffered between a download and the thread decoding it
+        self.stream_buffer_chunks = 8
+        self.io: Optional[IOPipeline] = None
+        # Upper bound for stop: waiting on aborted jobs, then on queued disk writes
+        self.shutdown_timeout = 0.5
+        # How long the first dispatch waits for connections to be opened
+        self.warmup_timeout = 5.0
+        self._engine_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._engine_task: Optional[asyncio.Task] = None
+        # Clients taken out of the pool during a run; the engine closes their AsyncClients when it ends
+        self._retired_clients: List[WhiskClient] = []
+        self.retry_policy = RetryPolicy()
+        # Paces requests per endpoint across every job and client; see rate_limiter.configure()
+        self.rate_limiter = RateLimiter()
+        # Jobs waiting out a retry backoff: heap of (ready_at, seq, job)
+        self._delayed: List[tuple] = []
+        self._delayed_seq = 0
+        self._delayed_lock = threading.Lock()
+        self._run_id = 0
+        # Unfinished jobs from a previous session found by recover_jobs, up to this id; queued only on resume
+        self._recoverable_max_id: Optional[int] = None
+        # Keyset cursor over the recovered jobs being resumed (None when not resuming)
+        self._recovery_after_id = 0
+        self._recovery_max_id: Optional[int] = None
+        self.recovered_image_count = 0
+        # Optional cache of past results (see enable_result_cache); reused only when reuse_cached is set
+        self.result_cache: Optional[ResultCache] = None
+        self.reuse_cached = False
+        # Identical requests in one run share a single generation (see _process_job)
+        self.coalesce_duplicates = True
+        # Give every unseeded request its own seed so duplicate prompts yield different images
+        self.force_distinct_seeds = False
+        # cache key -> future of the path the leading request writes; engine loop only
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # Accounts requests are spread over; `client` is the first one
+        self.sessions = SessionPool()
         self.output_dir = "output"
         
         # Callbacks
@@ -28,82 +105,222 @@ class JobManager:
         self._init_db()
 
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        # Add new columns if they don't exist (simple migration for dev)
-        try:
-            c.execute("ALTER TABLE jobs ADD COLUMN aspect_ratio TEXT")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("ALTER TABLE jobs ADD COLUMN count INTEGER DEFAULT 1")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("ALTER TABLE jobs ADD COLUMN prompt_index INTEGER DEFAULT 0")
-        except sqlite3.OperationalError:
-            pass
-            
-        c.execute('''CREATE TABLE IF NOT EXISTS jobs
-                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                       prompt TEXT,
-                       status TEXT,
-                       result_path TEXT,
-                       aspect_ratio TEXT,
-                       count INTEGER DEFAULT 1,
-                       prompt_index INTEGER DEFAULT 0,
-                       created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-        conn.commit()
-        conn.close()
+        self.store = JobStore(self.db_path)
+
+    def close(self):
+        """Flushes pending database writes and closes the connection."""
+        self._stop_refreshers()
+        if self.result_cache:
+            self.result_cache.close()
+        self.store.close()
+
+    def enable_result_cache(self, cache_dir: Optional[str] = None, max_bytes: int = 2 * 1024 ** 3,
+                            reuse: bool = True) -> ResultCache:
+        """
+        Starts recording generated images in a content-addressed cache, by default in
+        RESULT_CACHE_DIRNAME inside the output folder so links to it stay on the same disk.
+        With `reuse`, variations whose prompt/settings were rendered before are linked or
+        copied from the cache instead of generated. Off until called.
+        """
+        if self.result_cache is None:
+            if cache_dir is None:
+                cache_dir = os.path.join(os.path.abspath(self.output_dir), RESULT_CACHE_DIRNAME)
+            self.result_cache = ResultCache(cache_dir, max_bytes)
+        self.reuse_cached = reuse
+        return self.result_cache
+
+    def disable_result_cache(self):
+        """Stops recording and reusing results. The cache's files stay on disk."""
+        self.reuse_cached = False
+        cache, self.result_cache = self.result_cache, None
+        if cache:
+            cache.close()
+
+    def recover_jobs(self) -> int:
+        """
+        Finds jobs a previous session left PENDING or RUNNING and returns how many there
+        are. Nothing is queued until resume_recovered_jobs is called.
+        """
+        placeholders = ",".join("?" * len(RESUMABLE_STATUSES))
+        count, max_id, images = self.store.fetch_one(
+            f"SELECT COUNT(*), MAX(id), SUM(COALESCE(count, 1)) FROM jobs WHERE status IN ({placeholders})", RESUMABLE_STATUSES)
+        self.recovered_image_count = images or 0
+        if count:
+            # Jobs added after this point are enqueued directly and must not be picked up twice
+            self._recoverable_max_id = max_id
+            if self.on_status_change:
+                self.on_status_change(f"Found {count} unfinished jobs from a previous session.")
+        return count
+
+    def resume_recovered_jobs(self) -> bool:
+        """
+        Queues the jobs found by recover_jobs. They are streamed back a page at a time while
+        processing runs, each into the output folder it was created for, and variations
+        whose output file already exists are not generated again. False if there are none.
+        """
+        if self._recoverable_max_id is None:
+            return False
+        batches = self.store.submit(lambda c: c.execute("SELECT batch_id, priority FROM batches").fetchall()).result()
+        for batch_id, priority in batches:
+            self.queue.set_batch_priority(batch_id, priority)
+        self._recovery_after_id = 0
+        self._recovery_max_id, self._recoverable_max_id = self._recoverable_max_id, None
+        return True
+
+    @property
+    def has_recovered_jobs(self) -> bool:
+        """True while jobs found by recover_jobs are waiting for resume_recovered_jobs."""
+        return self._recoverable_max_id is not None
+
+    async def _refill_from_db(self):
+        if self._recovery_max_id is None or self.queue.qsize() >= self.RECOVERY_PAGE_SIZE // 2:
+            return
+
+        after_id, max_id = self._recovery_after_id, self._recovery_max_id
+        placeholders = ",".join("?" * len(RESUMABLE_STATUSES))
+        sql = (f"SELECT id, prompt, aspect_ratio, count, prompt_index, attempts, priority, batch_id, deadline, output_dir FROM jobs "
+               f"WHERE status IN ({placeholders}) AND id > ? AND id <= ? ORDER BY id LIMIT ?")
+        params = RESUMABLE_STATUSES + (after_id, max_id, self.RECOVERY_PAGE_SIZE)
+        rows = await asyncio.wrap_future(self.store.submit(lambda c: c.execute(sql, params).fetchall()))
+
+        if not rows:
+            self._recovery_max_id = None
+            return
+        self._recovery_after_id = rows[-1][0]
+        done = await asyncio.to_thread(self.store.fetch_images, [row[0] for row in rows])
+        self._put_many([{"id": job_id, "prompt": prompt, "aspect_ratio": aspect_ratio or "IMAGE_ASPECT_RATIO_LANDSCAPE",
+                         "count": count or 1, "prompt_index": prompt_index or 0, "resume": True,
+                         "attempts": attempts or 0, "priority": priority or 0, "batch_id": batch_id,
+                         "deadline": deadline, "output_dir": output_dir, "done_images": done.get(job_id, {})}
+                        for job_id, prompt, aspect_ratio, count, prompt_index, attempts, priority, batch_id, deadline, output_dir
+                        in rows])
+
+    @property
+    def client(self) -> Optional[WhiskClient]:
+        """The primary account's client (the only one unless add_client was used)."""
+        primary = self.sessions.primary
+        return primary.client if primary else None
+
+    @client.setter
+    def client(self, client: Optional[WhiskClient]):
+        self._retire_clients(keep=client)
+        if client is not None:
+            self.sessions.add(PooledSession(client))
 
     def set_client(self, token: str, cookies: Optional[Dict[str, str]] = None):
-        self.client = WhiskClient(token, cookies)
+        """Replaces the session pool with a single account."""
+        self._retire_clients()
+        self.add_client(token, cookies)
+
+    def add_client(self, token: str, cookies: Optional[Dict[str, str]] = None, name: Optional[str] = None,
+                   weight: int = 1, rate_per_minute: Optional[float] = None, burst: int = 1) -> PooledSession:
+        """
+        Adds another account to the pool. `weight` biases how much of the load it gets;
+        `rate_per_minute`/`burst` cap its own request rate (its quota).
+        """
+        client = WhiskClient(token, cookies, rate_limiter=self.rate_limiter)
+        session = self.sessions.add(PooledSession(client, name, weight, rate_per_minute, burst))
+        # Long runs outlive the access token; renew it ahead of expiry
+        client.start_auto_refresh()
+        return session
+
+    def _retire_clients(self, keep: Optional[WhiskClient] = None):
+        """Empties the pool, closing each client's connections and stopping its token refresher."""
+        for session in self.sessions.sessions:
+            if session.client is not keep:
+                session.client.stop_auto_refresh()
+                session.client.close()
+                if self._engine_loop is not None:
+                    self._retired_clients.append(session.client)
+        self.sessions.clear()
+
+    def _stop_refreshers(self):
+        for session in self.sessions.sessions:
+            session.client.stop_auto_refresh()
 
     def set_output_dir(self, path: str):
         self.output_dir = path
         if not os.path.exists(path):
             os.makedirs(path)
 
-    def add_job(self, prompt: str, aspect_ratio: str = "IMAGE_ASPECT_RATIO_LANDSCAPE", count: int = 1, prompt_index: int = 0):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
+    def add_job(self, prompt: str, aspect_ratio: str = "IMAGE_ASPECT_RATIO_LANDSCAPE", count: int = 1, prompt_index: int = 0,
+                priority: int = 0, batch_id: Optional[str] = None, deadline: Optional[float] = None):
         # Add single entry with count
-        c.execute("INSERT INTO jobs (prompt, status, aspect_ratio, count, prompt_index) VALUES (?, ?, ?, ?, ?)", (prompt, "PENDING", aspect_ratio, count, prompt_index))
-        job_id = c.lastrowid
-        self.queue.put({"id": job_id, "prompt": prompt, "aspect_ratio": aspect_ratio, "count": count, "prompt_index": prompt_index})
-            
-        conn.commit()
-        conn.close()
+        job_id = self.store.insert_job(prompt, "PENDING", aspect_ratio, count, prompt_index, priority, batch_id, deadline,
+                                       self.output_dir)
+        self.queue.put({"id": job_id, "prompt": prompt, "aspect_ratio": aspect_ratio, "count": count, "prompt_index": prompt_index,
+                        "priority": priority, "batch_id": batch_id, "deadline": deadline, "output_dir": self.output_dir})
         
         if self.on_status_change:
             self.on_status_change(f"Added job for: {prompt[:30]}... (Count: {count})")
         return job_id
 
+    def add_jobs_bulk(self, prompts: List[str], aspect_ratio: str = "IMAGE_ASPECT_RATIO_LANDSCAPE", count: int = 1, start_index: int = 1,
+                      priority: int = 0, batch_id: Optional[str] = None, deadline: Optional[float] = None) -> List[int]:
+        """
+        Adds many prompts in one transaction and enqueues them together as one batch
+        (a fresh batch id unless given), which shares the engine fairly with other batches.
+        Prompt indices run from `start_index` in list order. Returns the job ids.
+        """
+        rows = [(prompt, "PENDING", aspect_ratio, count, idx) for idx, prompt in enumerate(prompts, start_index)]
+        if batch_id is None:
+            batch_id = uuid.uuid4().hex[:12]
+        job_ids = self.store.insert_jobs(rows, priority, batch_id, deadline, self.output_dir)
+        jobs = [{"id": job_id, "prompt": prompt, "aspect_ratio": aspect_ratio, "count": count, "prompt_index": idx,
+                 "priority": priority, "batch_id": batch_id, "deadline": deadline, "output_dir": self.output_dir}
+                for job_id, (prompt, _, _, _, idx) in zip(job_ids, rows)]
+        self._put_many(jobs)
+
+        if self.on_status_change and job_ids:
+            self.on_status_change(f"Added {len(job_ids)} jobs (Count: {count})")
+        return job_ids
+
+    def _put_many(self, jobs: List[Dict[str, Any]]):
+        self.queue.put_many(jobs)
+
+    def reprioritize_job(self, job_id: int, priority: int):
+        """Changes a job's priority, in the queue (if it is waiting) and in the database."""
+        self.queue.reprioritize(job_id, priority)
+        self.store.submit(lambda c: c.execute("UPDATE jobs SET priority = ? WHERE id = ?", (priority, job_id)))
+
+    def set_batch_priority(self, batch_id: str, priority: int):
+        """
+        Raises or lowers every queued job of a batch at once. Saved in the database, so
+        the batch keeps it when its jobs are resumed in a later session.
+        """
+        self.queue.set_batch_priority(batch_id, priority)
+        self.store.submit(lambda c: c.execute(
+            "INSERT OR REPLACE INTO batches (batch_id, priority) VALUES (?, ?)", (batch_id, priority)))
+
     def retry_job(self, job_id):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
         # Get job details
-        c.execute("SELECT prompt, aspect_ratio, count, prompt_index FROM jobs WHERE id=?", (job_id,))
-        row = c.fetchone()
+        row = self.store.fetch_one("SELECT prompt, aspect_ratio, count, prompt_index, priority, batch_id, deadline, output_dir "
+                                   "FROM jobs WHERE id=?", (job_id,))
         if row:
-            prompt, aspect_ratio, count, prompt_index = row
+            prompt, aspect_ratio, count, prompt_index, priority, batch_id, deadline, output_dir = row
             if not count: count = 1
             if prompt_index is None: prompt_index = 0
             
-            # Reset status
-            c.execute("UPDATE jobs SET status='PENDING', result_path=NULL WHERE id=?", (job_id,))
-            conn.commit()
+            # Reset status; a manual retry also gets a fresh retry budget
+            self.store.submit(lambda c: c.execute("UPDATE jobs SET status='PENDING', result_path=NULL, attempts=0 WHERE id=?", (job_id,)))
             
-            self.queue.put({"id": job_id, "prompt": prompt, "aspect_ratio": aspect_ratio, "count": count, "prompt_index": prompt_index})
+            # Variations that already landed are reused, only the missing ones are requested
+            done_images = self.store.fetch_images([job_id]).get(job_id, {})
+            # Retries go ahead of fresh work instead of to the back of the line
+            self.queue.put({"id": job_id, "prompt": prompt, "aspect_ratio": aspect_ratio, "count": count,
+                            "prompt_index": prompt_index, "done_images": done_images,
+                            "priority": (priority or 0) + RETRY_PRIORITY_BOOST, "batch_id": batch_id, "deadline": deadline,
+                            "output_dir": output_dir})
             
             if self.on_status_change:
                 self.on_status_change(f"Retrying job {job_id}...")
-        
-        conn.close()
 
-    def start_processing(self, max_workers: int = 1):
+    def start_processing(self, max_workers: Optional[int] = None):
+        """
+        Starts the generation engine: a single background thread running an asyncio
+        loop. The number of requests in flight is chosen by `self.concurrency`;
+        `max_workers`, if given, only caps it.
+        """
         if self.running:
             return
         
@@ -114,21 +331,39 @@ class JobManager:
 
         self.running = True
         self.pause_event.set() # Ensure we start unpaused
-        self.worker_threads = []
+        if max_workers is not None:
+            self.concurrency.set_max_limit(clamp_parallel(max_workers))
+        # A previous run may still be finishing its in-flight requests; it exits once it sees a newer run id
+        self._run_id += 1
         
-        for _ in range(max_workers):
-            t = threading.Thread(target=self._process_queue, daemon=True)
-            t.start()
-            self.worker_threads.append(t)
+        self.engine_thread = threading.Thread(target=self._run_engine, args=(self._run_id,), daemon=True)
+        self.engine_thread.start()
             
         if self.on_status_change:
-            self.on_status_change(f"Processing started with {max_workers} workers.")
+            self.on_status_change(f"Processing started (adaptive, up to {self.concurrency.max_limit} parallel requests).")
 
-    def stop_processing(self):
+    def stop_processing(self, timeout: Optional[float] = 1.0):
+        """
+        Stops the engine: in-flight requests are aborted, their jobs marked INTERRUPTED
+        (resumable) and put back in the queue, and images already received are still
+        written. Waits up to `timeout` seconds for the engine thread (None: don't wait).
+        GUI threads should pass None and poll engine_thread.is_alive() instead: the
+        engine may be blocked on a callback that needs the GUI thread.
+        """
         self.running = False
         self.pause_event.set() # Unblock any waiting threads so they can exit
         if self.on_status_change:
             self.on_status_change("Processing stopping...")
+
+        loop, task = self._engine_loop, self._engine_task
+        if loop is not None and task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # Loop already closed
+        thread = self.engine_thread
+        if timeout is not None and thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
             
     def pause_processing(self):
         self.pause_event.clear()
@@ -140,103 +375,405 @@ class JobManager:
         if self.on_status_change:
             self.on_status_change("Processing resumed.")
 
-    def _process_queue(self):
-        while self.running:
-            self.pause_event.wait() # Wait if paused
-            if not self.running: break
+    def _is_active(self, run_id: int) -> bool:
+        return self.running and run_id == self._run_id
+
+    def _run_engine(self, run_id: int):
+        asyncio.run(self._dispatch(run_id))
+
+    async def _wait_if_paused(self, run_id: int) -> bool:
+        """Waits while paused without blocking the loop. Returns False if processing was stopped."""
+        while self._is_active(run_id) and not self.pause_event.is_set():
+            await asyncio.sleep(0.1)
+        return self._is_active(run_id)
 
+    async def _dispatch(self, run_id: int):
+        clients = [session.client for session in self.sessions.sessions]
+        tasks: set[asyncio.Task] = set()
+        self._in_flight = {}
+        self._engine_loop, self._engine_task = asyncio.get_running_loop(), asyncio.current_task()
+        self.io = IOPipeline(self.io_workers, self.io_max_pending)
+
+        try:
             try:
-                job = self.queue.get(timeout=1)
+                # Pay the TCP/TLS handshakes of this loop's AsyncClients before the first generation
+                try:
+                    await asyncio.wait_for(asyncio.gather(*(client.warmup_async() for client in clients)),
+                                           timeout=self.warmup_timeout)
+                except asyncio.TimeoutError:
+                    print("Connection warm-up is slow; dispatching anyway")
+                await self._dispatch_loop(run_id, tasks)
+            except asyncio.CancelledError:
+                current = asyncio.current_task()
+                if hasattr(current, "uncancel"):
+                    # The stop is handled here; the shutdown awaits below must not be cancelled again
+                    current.uncancel()
+                # stop_processing: abort every in-flight request too
+                for task in tasks:
+                    task.cancel()
+            if tasks:
+                # Normally returns at once; bounded in case a job ignores cancellation
+                await asyncio.wait(list(tasks), timeout=self.shutdown_timeout)
+        finally:
+            if self._engine_task is asyncio.current_task():
+                self._engine_loop, self._engine_task = None, None
+            try:
+                # Images already received are still written (atomically), within the deadline
+                await asyncio.wait_for(self.io.drain(), timeout=self.shutdown_timeout)
+                self.io.shutdown()
+            except asyncio.TimeoutError:
+                print("I/O still busy at shutdown; unfinished writes continue in the background")
+                self.io.shutdown(wait=False)
+            # Accounts added or replaced during the run opened AsyncClients on this loop too
+            retired, self._retired_clients = self._retired_clients, []
+            seen = set()
+            for client in clients + [session.client for session in self.sessions.sessions] + retired:
+                if id(client) not in seen:
+                    seen.add(id(client))
+                    await client.aclose()
+
+    async def _dispatch_loop(self, run_id: int, tasks: set):
+        slots = self.concurrency
+        while await self._wait_if_paused(run_id):
+            self._release_due_retries()
+            await self._refill_from_db()
+            if self.queue.empty():
+                await asyncio.sleep(0.05)
+                continue
+            # Wait for the rate limiter before taking a slot, so paced jobs don't sit on one
+            await self.rate_limiter.acquire_async(GENERATE)
+            await slots.acquire()
+            try:
+                job = self.queue.get_nowait()
             except queue.Empty:
+                slots.release()
+                self.rate_limiter.bucket(GENERATE).refund()
                 continue
 
-            job_id = job["id"]
-            prompt = job["prompt"]
-            aspect_ratio = job.get("aspect_ratio", "IMAGE_ASPECT_RATIO_LANDSCAPE")
-            count = job.get("count", 1)
-            prompt_index = job.get("prompt_index", 0)
+            # The job gives its slot back as soon as its last request is done, before its disk writes finish
+            release = _release_once(slots.release)
+            task = asyncio.create_task(self._process_job(job, run_id, release))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(lambda _t, r=release: r())
 
-            if self.on_status_change:
-                self.on_status_change(f"Processing: {prompt[:30]}...")
+        # Stopped without cancellation (e.g. a newer run took over): let in-flight requests finish
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-            try:
-                # Update DB to RUNNING
-                self._update_job_status(job_id, "RUNNING")
+    async def _process_job(self, job: Dict[str, Any], run_id: int, release_slot: Callable[[], None]):
+        job_id = job["id"]
+        prompt = job["prompt"]
+        aspect_ratio = job.get("aspect_ratio", "IMAGE_ASPECT_RATIO_LANDSCAPE")
+        count = job.get("count", 1)
+        prompt_index = job.get("prompt_index", 0)
+        image_model = job.get("image_model", DEFAULT_IMAGE_MODEL)
+        seed = job.get("seed")
+        # Where the job was meant to go when it was added, even if the folder has changed since
+        output_dir = job.get("output_dir") or self.output_dir
+
+        if self.on_status_change:
+            self.on_status_change(f"Processing: {prompt[:30]}...")
+
+        # variation -> path of every image this job has so far
+        landed: Dict[int, str] = {}
+        # Disk stage of each requested variation, finished by the I/O pipeline
+        saving: List[asyncio.Future] = []
+        # The dispatcher already took a rate-limit token and a concurrency slot for this job's first request
+        prepaid = True
+        holding_slot = True
+        try:
+            # Update DB to RUNNING
+            self._update_job_status(job_id, "RUNNING")
+            
+            # variation -> path of images that already landed (checkpointed in job_images)
+            done_images = job.get("done_images") or {}
+            stopped = False
+
+            for i in range(count):
+                variation = i + 1
+                # Wait if paused between images
+                if not await self._wait_if_paused(run_id):
+                    stopped = True
+                    break
+                
+                status_msg = f"Creating {variation}/{count}"
+                # Strict Sequential Naming, 1-based variation index
+                file_path = os.path.join(output_dir, variation_filename(prompt_index, count, variation))
+
+                existing = done_images.get(variation)
+                if existing and os.path.exists(existing):
+                    landed[variation] = existing
+                    continue
+                if job.get("resume") and os.path.exists(file_path):
+                    # Written before the previous session ended, but not checkpointed
+                    landed[variation] = file_path
+                    self.store.record_image(job_id, variation, file_path)
+                    continue
+
+                request_seed = seed
+                if request_seed is None and self.force_distinct_seeds:
+                    # Duplicates are meant to differ: give each request its own seed so none are merged
+                    request_seed = random.randrange(1, 2 ** 31)
+                cache_key = make_cache_key(prompt, aspect_ratio, image_model, request_seed, variation)
+                if self.reuse_cached and await self._materialize_cached(cache_key, file_path):
+                    # Rendered before with identical settings: link it in instead of paying for it again
+                    landed[variation] = file_path
+                    self.store.record_image(job_id, variation, file_path)
+                    continue
+
+                flight = None
+                if self.coalesce_duplicates:
+                    leader = self._in_flight.get(cache_key)
+                    if leader is not None:
+                        # An identical request is already running: wait for its image instead of sending another,
+                        # without sitting on a slot or a token other jobs could use meanwhile
+                        release_slot()
+                        holding_slot = False
+                        if prepaid:
+                            prepaid = False
+                            self.rate_limiter.bucket(GENERATE).refund()
+                        source = await asyncio.shield(leader)
+                        if source and await self._copy_result(source, file_path):
+                            landed[variation] = file_path
+                            self.store.record_image(job_id, variation, file_path)
+                            if self.on_job_complete:
+                                self.on_job_complete({"id": job_id, "prompt": prompt, "images": _ordered(landed), "status": status_msg})
+                            continue
+                        # The other request failed; make our own
+                    if cache_key not in self._in_flight:
+                        flight = self._in_flight[cache_key] = asyncio.get_running_loop().create_future()
+
+                if self.on_job_complete: # Use this to update status in UI row
+                     self.on_job_complete({"id": job_id, "prompt": prompt, "images": _ordered(landed), "status": status_msg})
+
+                # Call API
+                if not self.client:
+                    raise Exception("Client not initialized")
                 
-                all_images = []
-
-                for i in range(count):
-                    self.pause_event.wait() # Wait if paused between images
-                    if not self.running: break
-                    
-                    status_msg = f"Creating {i+1}/{count}"
-                    if self.on_job_complete: # Use this to update status in UI row
-                         self.on_job_complete({"id": job_id, "prompt": prompt, "images": all_images, "status": status_msg})
-
-                    # Call API
-                    if not self.client:
-                        raise Exception("Client not initialized")
-                    
-                    response = self.client.generate_image(prompt, aspect_ratio=aspect_ratio)
-                    
-                    # Process Response
-                    if "imagePanels" in response:
-                        for panel in response["imagePanels"]:
-                            for img in panel.get("generatedImages", []):
-                                encoded = img.get("encodedImage")
-                                if encoded:
-                                    # Strict Sequential Naming
-                                    if count == 1:
-                                        filename = f"image_{prompt_index}.jpg"
-                                    else:
-                                        # 1-based variation index
-                                        filename = f"image_{prompt_index}_{i+1}.jpg"
-                                    
-                                    file_path = os.path.join(self.output_dir, filename)
-                                    
-                                    if save_image(encoded, file_path):
-                                        all_images.append(file_path)
-                                        # Update UI with new image immediately
-                                        if self.on_job_complete:
-                                             self.on_job_complete({"id": job_id, "prompt": prompt, "images": all_images, "status": status_msg})
-
-                if all_images:
-                    self._update_job_status(job_id, "COMPLETED", result_path=json.dumps(all_images))
-                    if self.on_job_complete:
-                        self.on_job_complete({"id": job_id, "prompt": prompt, "images": all_images, "status": "COMPLETED"})
-                    if self.on_status_change:
-                        self.on_status_change(f"Completed: {prompt[:30]}")
-                else:
-                    self._update_job_status(job_id, "FAILED", result_path="No images returned")
-                    if self.on_job_error:
-                        self.on_job_error(f"No images returned for: {prompt}")
-                    if self.on_job_complete:
-                         self.on_job_complete({"id": job_id, "prompt": prompt, "images": [], "status": "FAILED", "error": "No images returned"})
-
-            except Exception as e:
-                print(f"Job failed: {e}")
-                self._update_job_status(job_id, "FAILED", result_path=str(e))
+                try:
+                    if prepaid:
+                        prepaid = False
+                    else:
+                        await self.rate_limiter.acquire_async(GENERATE)
+                    if not holding_slot:
+                        # Gave it up while following another request; take one again, token first as in dispatch
+                        await self.concurrency.acquire()
+                        release_slot = _release_once(self.concurrency.release)
+                        holding_slot = True
+                    # The body is decoded to disk on the I/O stage while it downloads
+                    write = await self._generate(prompt, partial(self._stream_to_disk, file_path=file_path),
+                                                 aspect_ratio, image_model, request_seed)
+                except BaseException:
+                    self._land_flight(cache_key, flight, None)
+                    raise
+                saving.append(asyncio.ensure_future(
+                    self._finish_variation(write, job_id, prompt, variation, file_path, landed, status_msg,
+                                           cache_key, flight)))
+
+            # No more requests for this job: free the network slot while the writes complete
+            release_slot()
+            if prepaid:
+                self.rate_limiter.bucket(GENERATE).refund()
+            await asyncio.gather(*saving)
+            all_images = _ordered(landed)
+
+            if stopped:
+                # Stopped between variations: leave it resumable, checkpointed images are kept
+                self._update_job_status(job_id, "PENDING")
+                self._put_many([dict(job, done_images=dict(landed))])
+                if self.on_job_complete:
+                    self.on_job_complete({"id": job_id, "prompt": prompt, "images": all_images, "status": "PENDING"})
+            elif all_images:
+                self._update_job_status(job_id, "COMPLETED", result_path=json.dumps(all_images))
+                if self.on_job_complete:
+                    self.on_job_complete({"id": job_id, "prompt": prompt, "images": all_images, "status": "COMPLETED"})
+                if self.on_status_change:
+                    self.on_status_change(f"Completed: {prompt[:30]}")
+            else:
+                self._update_job_status(job_id, "FAILED", result_path="No images returned")
                 if self.on_job_error:
-                    self.on_job_error(f"Error processing {prompt}: {str(e)}")
+                    self.on_job_error(f"No images returned for: {prompt}")
                 if self.on_job_complete:
-                     self.on_job_complete({"id": job_id, "prompt": prompt, "images": [], "status": "FAILED", "error": str(e)})
-            finally:
-                self.queue.task_done()
+                     self.on_job_complete({"id": job_id, "prompt": prompt, "images": [], "status": "FAILED", "error": "No images returned"})
+
+        except asyncio.CancelledError:
+            release_slot()
+            # Aborted mid-request. Images already received still land; the rest is requested on resume
+            if saving:
+                await asyncio.wait(saving, timeout=self.shutdown_timeout)
+            self._update_job_status(job_id, "INTERRUPTED")
+            self._put_many([dict(job, done_images=dict(landed))])
+            if self.on_job_complete:
+                self.on_job_complete({"id": job_id, "prompt": prompt, "images": _ordered(landed), "status": "INTERRUPTED"})
+            raise
+        except Exception as e:
+            release_slot()
+            # Writes already handed off still land (and are checkpointed) so a retry can skip them
+            await asyncio.gather(*saving, return_exceptions=True)
+
+            attempts = job.get("attempts", 0) + 1
+            if self.retry_policy.should_retry(e, attempts):
+                self._schedule_retry(job, landed, attempts, e)
+                return
+
+            print(f"Job failed: {e}")
+            self.store.submit(lambda c: c.execute("UPDATE jobs SET attempts = ? WHERE id = ?", (attempts, job_id)))
+            self._update_job_status(job_id, "FAILED", result_path=str(e))
+            if self.on_job_error:
+                self.on_job_error(f"Error processing {prompt}: {str(e)}")
+            if self.on_job_complete:
+                 self.on_job_complete({"id": job_id, "prompt": prompt, "images": [], "status": "FAILED", "error": str(e)})
+        finally:
+            release_slot()
+            self.queue.task_done()
+
+    async def _finish_variation(self, write: asyncio.Future, job_id: int, prompt: str, variation: int,
+                                file_path: str, landed: Dict[int, str], status_msg: str, cache_key: Optional[str] = None,
+                                flight: Optional[asyncio.Future] = None):
+        try:
+            written = await write
+        except BaseException:
+            self._land_flight(cache_key, flight, None)
+            raise
+        self._land_flight(cache_key, flight, file_path if written else None)
+        if written:
+            landed[variation] = file_path
+            self.store.record_image(job_id, variation, file_path)
+            cache = self.result_cache
+            if cache_key and cache:
+                try:
+                    await asyncio.to_thread(cache.put, cache_key, file_path)
+                except (OSError, sqlite3.Error) as e:
+                    # Also covers the cache being switched off meanwhile
+                    print(f"Could not cache {file_path}: {e}")
+            # Update UI with new image immediately
+            if self.on_job_complete:
+                 self.on_job_complete({"id": job_id, "prompt": prompt, "images": _ordered(landed), "status": status_msg})
+
+    async def _materialize_cached(self, cache_key: str, file_path: str) -> bool:
+        cache = self.result_cache
+        if cache is None:
+            return False
+        try:
+            return await asyncio.to_thread(cache.materialize, cache_key, file_path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Could not reuse cached result for {file_path}: {e}")
+            return False
+
+    def _land_flight(self, cache_key: Optional[str], flight: Optional[asyncio.Future], path: Optional[str]):
+        """Hands the leader's result (None on failure) to requests coalesced onto it."""
+        if flight is None:
+            return
+        if self._in_flight.get(cache_key) is flight:
+            del self._in_flight[cache_key]
+        if not flight.done():
+            flight.set_result(path)
+
+    async def _copy_result(self, source: str, dest: str) -> bool:
+        if os.path.abspath(source) == os.path.abspath(dest):
+            return True
+        try:
+            await asyncio.to_thread(link_or_copy, source, dest)
+            return True
+        except OSError as e:
+            print(f"Could not reuse {source} for {dest}: {e}")
+            return False
+
+    def _schedule_retry(self, job: Dict[str, Any], landed: Dict[int, str], attempts: int, error: Exception):
+        """Puts a transiently failed job back after a backoff. Its attempt count is persisted first."""
+        job_id = job["id"]
+        delay = self.retry_policy.backoff(attempts, error)
+        self.store.submit(lambda c: c.execute(
+            "UPDATE jobs SET status = 'PENDING', attempts = ? WHERE id = ?", (attempts, job_id)))
+
+        retry = dict(job, attempts=attempts, done_images=dict(landed))
+        with self._delayed_lock:
+            self._delayed_seq += 1
+            heapq.heappush(self._delayed, (time.monotonic() + delay, self._delayed_seq, retry))
+
+        print(f"Retrying job {job_id} in {delay:.1f}s (attempt {attempts + 1}/{self.retry_policy.max_attempts}): {error}")
+        if self.on_job_complete:
+            self.on_job_complete({"id": job_id, "prompt": job["prompt"], "images": _ordered(landed),
+                                  "status": f"Retrying in {delay:.0f}s"})
+
+    def _release_due_retries(self):
+        now = time.monotonic()
+        due = []
+        with self._delayed_lock:
+            while self._delayed and self._delayed[0][0] <= now:
+                due.append(heapq.heappop(self._delayed)[2])
+        if due:
+            self._put_many(due)
+
+    async def _stream_to_disk(self, chunks: AsyncIterator[bytes], file_path: str) -> asyncio.Future:
+        """
+        Hands a response body to the I/O stage chunk by chunk (waiting first if the disk is
+        behind) and returns the future of the write, which saves the first image to file_path.
+        """
+        channel = ChunkChannel(self.stream_buffer_chunks)
+        # A thread, not the process pool: the channel is fed from this loop
+        write = await self.io.submit(save_images_from_chunks, channel, partial(first_image_path, file_path))
+        try:
+            async for chunk in chunks:
+                await channel.put(chunk)
+        finally:
+            # A body cut off midway ends the stream early; the writer then discards the partial image
+            channel.close()
+        return write
+
+    async def _generate(self, prompt: str, consume: Callable[[AsyncIterator[bytes]], Awaitable[Any]],
+                        aspect_ratio: str, image_model: str = DEFAULT_IMAGE_MODEL, seed: Optional[int] = None) -> Any:
+        """
+        Calls the API on an account from the session pool and feeds the outcome into the
+        concurrency controller and the pool. An account-level rejection (401/403/429) is
+        tried again on another account while one is available. The response body is
+        streamed into `consume` (see WhiskClient.generate_image_body); returns its result.
+        """
+        while True:
+            session = await self.sessions.acquire_async()
+            started = time.monotonic()
+            try:
+                result = await session.client.generate_image_body(prompt, consume, aspect_ratio=aspect_ratio,
+                                                                  image_model=image_model, seed=seed)
+            except httpx.HTTPStatusError as e:
+                code = e.response.status_code
+                self.sessions.record_failure(session, code, parse_retry_after(e.response.headers.get("Retry-After")))
+                if code in ACCOUNT_FAILURE_CODES and self.sessions.has_available(exclude=session):
+                    # Another account takes it, but that is still another request to pace
+                    await self.rate_limiter.acquire_async(GENERATE)
+                    continue
+                self.concurrency.record_failure(code)
+                raise
+            except httpx.TransportError:
+                self.sessions.record_failure(session)
+                self.concurrency.record_failure(None)
+                raise
+            except BaseException:
+                self.sessions.record_failure(session)
+                raise
+            self.sessions.record_success(session)
+            self.concurrency.record_success(time.monotonic() - started)
+            return result
 
     def _update_job_status(self, job_id, status, result_path=None):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        if result_path:
-            c.execute("UPDATE jobs SET status = ?, result_path = ? WHERE id = ?", (status, result_path, job_id))
-        else:
-            c.execute("UPDATE jobs SET status = ? WHERE id = ?", (status, job_id))
-        conn.commit()
-        conn.close()
+        # Coalesced and group-committed by the store's writer thread
+        self.store.update_status(job_id, status, result_path)
 
     def clear_queue(self):
-        """Clears the internal queue and resets running state."""
-        with self.queue.mutex:
-            self.queue.queue.clear()
+        """
+        Clears the internal queue and resets running state. Unfinished jobs in the database
+        (including ones a stop left INTERRUPTED) are marked CANCELLED, so the next launch
+        does not offer to resume them.
+        """
+        self.queue.clear()
+        placeholders = ",".join("?" * len(RESUMABLE_STATUSES))
+        self.store.submit(lambda c: c.execute(
+            f"UPDATE jobs SET status = 'CANCELLED' WHERE status IN ({placeholders})", RESUMABLE_STATUSES))
+        with self._delayed_lock:
+            self._delayed.clear()
+        self._recovery_max_id = None
+        self._recoverable_max_id = None
         self.running = False
         self.pause_event.set()
         if self.on_status_change:
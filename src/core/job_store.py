@@ -0,0 +1,272 @@
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class JobStore:
+    """
+    Owns jobs.db through one long-lived connection on a dedicated writer thread.
+
+    Writes are queued and applied in group commits: whatever is queued when the writer
+    wakes up goes into a single transaction. Status updates are fire-and-forget and
+    coalesced per job (the last status wins) until the next ordered operation.
+    """
+
+    def __init__(self, db_path: str, commit_interval: float = 0.05):
+        self.db_path = db_path
+        self.commit_interval = commit_interval
+
+        self._ops: List[Tuple] = []
+        self._status_slot: Dict[int, int] = {}  # job_id -> index of its pending status op
+        self._cond = threading.Condition()
+        self._closed = False
+        self._next_id = 0
+
+        ready: Future = Future()
+        self._thread = threading.Thread(target=self._writer_loop, args=(ready,), name="JobStoreWriter", daemon=True)
+        self._thread.start()
+        ready.result()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL only fsyncs at checkpoints; a crash can lose the last group commit, never corrupt the file
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _init_schema(self, conn: sqlite3.Connection):
+        c = conn.cursor()
+        # Add new columns if they don't exist (simple migration for dev)
+        try:
+            c.execute("ALTER TABLE jobs ADD COLUMN aspect_ratio TEXT")
+        except sqlite3.OperationalError:
+            pass
+        try:
+            c.execute("ALTER TABLE jobs ADD COLUMN count INTEGER DEFAULT 1")
+        except sqlite3.OperationalError:
+            pass
+        try:
+            c.execute("ALTER TABLE jobs ADD COLUMN prompt_index INTEGER DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+        try:
+            c.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+        try:
+            c.execute("ALTER TABLE jobs ADD COLUMN priority INTEGER DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+        try:
+            c.execute("ALTER TABLE jobs ADD COLUMN batch_id TEXT")
+        except sqlite3.OperationalError:
+            pass
+        try:
+            c.execute("ALTER TABLE jobs ADD COLUMN deadline REAL")
+        except sqlite3.OperationalError:
+            pass
+        try:
+            c.execute("ALTER TABLE jobs ADD COLUMN output_dir TEXT")
+        except sqlite3.OperationalError:
+            pass
+
+        c.execute('''CREATE TABLE IF NOT EXISTS jobs
+                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                       prompt TEXT,
+                       status TEXT,
+                       result_path TEXT,
+                       aspect_ratio TEXT,
+                       count INTEGER DEFAULT 1,
+                       prompt_index INTEGER DEFAULT 0,
+                       attempts INTEGER DEFAULT 0,
+                       priority INTEGER DEFAULT 0,
+                       batch_id TEXT,
+                       deadline REAL,
+                       output_dir TEXT,
+                       created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        # One row per variation as it lands, so retry/resume only request the missing ones
+        c.execute('''CREATE TABLE IF NOT EXISTS job_images
+                      (job_id INTEGER NOT NULL,
+                       variation INTEGER NOT NULL,
+                       path TEXT NOT NULL,
+                       created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                       PRIMARY KEY (job_id, variation))''')
+        # Batch-wide priority bonus set with JobManager.set_batch_priority
+        c.execute('''CREATE TABLE IF NOT EXISTS batches
+                      (batch_id TEXT PRIMARY KEY,
+                       priority INTEGER NOT NULL DEFAULT 0)''')
+        # Startup recovery pages through unfinished jobs by status, in id order
+        c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+        conn.commit()
+
+        # Ids are handed out here so inserts don't have to wait for the writer
+        c.execute("SELECT MAX(id) FROM jobs")
+        max_id = c.fetchone()[0] or 0
+        c.execute("SELECT seq FROM sqlite_sequence WHERE name='jobs'")
+        row = c.fetchone()
+        self._next_id = max(max_id, row[0] if row else 0)
+
+    # --- Writer thread ---
+
+    def _writer_loop(self, ready: Future):
+        try:
+            conn = self._connect()
+            self._init_schema(conn)
+        except Exception as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+
+        while True:
+            with self._cond:
+                while not self._ops and not self._closed:
+                    self._cond.wait()
+                if not self._ops and self._closed:
+                    break
+                # Nobody is waiting on a batch of plain status updates, so linger briefly to coalesce more
+                if not self._closed and all(op[0] == "status" for op in self._ops):
+                    self._cond.wait(timeout=self.commit_interval)
+                ops, self._ops = self._ops, []
+                self._status_slot = {}
+
+            self._apply(conn, ops)
+
+        conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, ops: List[Tuple]):
+        results = []
+        c = conn.cursor()
+        try:
+            if not conn.in_transaction:
+                c.execute("BEGIN")
+            for op in ops:
+                # Each op gets its own savepoint, so one bad write drops only itself from the group commit
+                c.execute("SAVEPOINT op")
+                try:
+                    if op[0] == "status":
+                        _, job_id, status, result_path = op
+                        if result_path:
+                            c.execute("UPDATE jobs SET status = ?, result_path = ? WHERE id = ?", (status, result_path, job_id))
+                        else:
+                            c.execute("UPDATE jobs SET status = ? WHERE id = ?", (status, job_id))
+                    else:
+                        results.append((op[2], op[1](c), None))
+                except Exception as e:
+                    c.execute("ROLLBACK TO op")
+                    if op[0] == "status":
+                        # Fire-and-forget: nobody holds a future for a status update
+                        print(f"Job store status update for job {op[1]} failed: {e}")
+                    else:
+                        results.append((op[2], None, e))
+                c.execute("RELEASE op")
+            conn.commit()
+        except Exception as e:
+            print(f"Job store write failed: {e}")
+            conn.rollback()
+            for op in ops:
+                if op[0] == "call" and not op[2].done():
+                    op[2].set_exception(e)
+            return
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    # --- Public API ---
+
+    def submit(self, fn: Callable[[sqlite3.Cursor], Any]) -> Future:
+        """Runs fn(cursor) on the writer thread in the next group commit. Ordered with all other writes."""
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("JobStore is closed")
+            self._ops.append(("call", fn, future))
+            # Later status updates must not be merged into ones queued before this operation
+            self._status_slot = {}
+            self._cond.notify()
+        return future
+
+    def update_status(self, job_id: int, status: str, result_path: Optional[str] = None):
+        with self._cond:
+            if self._closed:
+                return
+            op = ("status", job_id, status, result_path)
+            idx = self._status_slot.get(job_id)
+            if idx is not None:
+                self._ops[idx] = op
+            else:
+                self._status_slot[job_id] = len(self._ops)
+                self._ops.append(op)
+            self._cond.notify()
+
+    def insert_job(self, prompt: str, status: str, aspect_ratio: str, count: int, prompt_index: int,
+                   priority: int = 0, batch_id: Optional[str] = None, deadline: Optional[float] = None,
+                   output_dir: Optional[str] = None) -> int:
+        """Queues an insert and returns the job id straight away."""
+        with self._cond:
+            self._next_id += 1
+            job_id = self._next_id
+        self.submit(lambda c: c.execute(
+            "INSERT INTO jobs (id, prompt, status, aspect_ratio, count, prompt_index, priority, batch_id, deadline, output_dir) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, prompt, status, aspect_ratio, count, prompt_index, priority, batch_id, deadline, output_dir)))
+        return job_id
+
+    def insert_jobs(self, rows: List[Tuple[str, str, str, int, int]], priority: int = 0,
+                    batch_id: Optional[str] = None, deadline: Optional[float] = None,
+                    output_dir: Optional[str] = None) -> List[int]:
+        """
+        Queues one executemany insert for (prompt, status, aspect_ratio, count, prompt_index)
+        rows sharing one priority/batch/deadline/output_dir and returns their ids, which are contiguous.
+        """
+        if not rows:
+            return []
+        with self._cond:
+            first_id = self._next_id + 1
+            self._next_id += len(rows)
+        ids = list(range(first_id, first_id + len(rows)))
+        params = [(job_id,) + tuple(row) + (priority, batch_id, deadline, output_dir) for job_id, row in zip(ids, rows)]
+        self.submit(lambda c: c.executemany(
+            "INSERT INTO jobs (id, prompt, status, aspect_ratio, count, prompt_index, priority, batch_id, deadline, output_dir) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            params))
+        return ids
+
+    def record_image(self, job_id: int, variation: int, path: str):
+        """Checkpoints one finished variation. Fire-and-forget, lands in the next group commit."""
+        self.submit(lambda c: c.execute(
+            "INSERT OR REPLACE INTO job_images (job_id, variation, path) VALUES (?, ?, ?)",
+            (job_id, variation, path)))
+
+    def fetch_images(self, job_ids: List[int]) -> Dict[int, Dict[int, str]]:
+        """Returns {job_id: {variation: path}} for the checkpointed images of the given jobs."""
+        if not job_ids:
+            return {}
+        placeholders = ",".join("?" * len(job_ids))
+        rows = self.submit(lambda c: c.execute(
+            f"SELECT job_id, variation, path FROM job_images WHERE job_id IN ({placeholders})",
+            tuple(job_ids)).fetchall()).result()
+        images: Dict[int, Dict[int, str]] = {}
+        for job_id, variation, path in rows:
+            images.setdefault(job_id, {})[variation] = path
+        return images
+
+    def fetch_one(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        """Reads through the writer connection, so queued writes are visible."""
+        return self.submit(lambda c: c.execute(sql, params).fetchone()).result()
+
+    def flush(self):
+        """Blocks until everything queued so far is committed."""
+        self.submit(lambda c: None).result()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+class LRUFileIndex:
+    """
+    SQLite index of the files in a size-bounded on-disk cache.
+
+    One row per entry in `table` (key, path, size, last_used, plus any `columns`, each
+    indexed), held in db_path through a WAL connection. Tracks the total size, marks
+    entries used on lookup, forgets entries whose file disappeared, and deletes the least
+    recently used files once the total exceeds `max_bytes`. Thread-safe.
+    Shared by ResultCache and ThumbnailCache, which decide what the entries are.
+    """
+
+    def __init__(self, db_path: str, table: str, max_bytes: int, columns: Sequence[str] = ()):
+        self.table = table
+        self.max_bytes = max_bytes
+        self.columns = tuple(columns)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        extra = "".join(f"{column} TEXT NOT NULL, " for column in self.columns)
+        self._conn.execute(f'''CREATE TABLE IF NOT EXISTS {table}
+                               (key TEXT PRIMARY KEY,
+                                {extra}path TEXT NOT NULL,
+                                size INTEGER NOT NULL,
+                                last_used REAL NOT NULL)''')
+        for column in self.columns:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_last_used ON {table} (last_used)")
+        self._conn.commit()
+        self._total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Returns the file indexed under key (marking it recently used), or None."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT path, size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            path, size = row
+            if not os.path.exists(path):
+                # Removed behind our back
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._total -= size
+                self._conn.commit()
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return path
+
+    def add(self, key: str, path: str, size: int, values: Optional[Dict[str, str]] = None,
+            supersede: Optional[str] = None):
+        """
+        Indexes path under key, replacing any previous entry for key, then evicts over budget.
+        With `supersede` naming one of the columns, other entries sharing its value are
+        deleted along with their files (e.g. thumbnails of a source's earlier content).
+        """
+        values = values or {}
+        with self._lock:
+            if supersede is not None:
+                for old_key, old_path in self._conn.execute(
+                        f"SELECT key, path FROM {self.table} WHERE {supersede} = ? AND key != ?",
+                        (values[supersede], key)).fetchall():
+                    self._delete(old_key, old_path)
+            row = self._conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._total -= row[0]
+            names = ("key",) + self.columns + ("path", "size", "last_used")
+            params = (key,) + tuple(values[column] for column in self.columns) + (path, size, time.time())
+            self._conn.execute(f"INSERT OR REPLACE INTO {self.table} ({', '.join(names)}) "
+                               f"VALUES ({', '.join('?' * len(names))})", params)
+            self._total += size
+            self._evict(keep=key)
+            self._conn.commit()
+
+    def _evict(self, keep: str):
+        if self._total <= self.max_bytes:
+            return
+        for key, path in self._conn.execute(f"SELECT key, path FROM {self.table} ORDER BY last_used").fetchall():
+            if self._total <= self.max_bytes:
+                break
+            if key != keep:
+                self._delete(key, path)
+
+    def _delete(self, key: str, path: str):
+        row = self._conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._total -= row[0]
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Endpoint names used as bucket keys
+GENERATE = "generate"
+SESSION = "session"
+
+# (requests per minute, burst) per endpoint; None disables pacing for that endpoint
+DEFAULT_LIMITS: Dict[str, Tuple[Optional[float], int]] = {
+    GENERATE: (120.0, 10),
+    SESSION: (6.0, 2),
+}
+
+class TokenBucket:
+    """
+    Token bucket holding up to `burst` tokens, refilled at `rate_per_minute`.
+    Each request takes one token; when the bucket is empty callers wait for the next
+    one instead of sending and collecting a 429. Thread-safe; `acquire` blocks the
+    calling thread, `acquire_async` only suspends the calling coroutine.
+    """
+
+    def __init__(self, rate_per_minute: Optional[float], burst: int = 1):
+        self._lock = threading.Lock()
+        self.configure(rate_per_minute, burst)
+
+    def configure(self, rate_per_minute: Optional[float], burst: int = 1):
+        with self._lock:
+            self.rate_per_minute = rate_per_minute if rate_per_minute and rate_per_minute > 0 else None
+            self.burst = max(1, int(burst))
+            # A reconfigured bucket starts full, as a new one would
+            self._tokens = float(self.burst)
+            self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate_per_minute is None
+
+    def _take(self) -> float:
+        """Takes a token if one is available and returns 0, else returns the seconds until one will be."""
+        if self.rate_per_minute is None:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            rate = self.rate_per_minute / 60.0
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / rate
+
+    def try_acquire(self) -> bool:
+        return self._take() == 0.0
+
+    def acquire(self):
+        while True:
+            wait = self._take()
+            if wait == 0.0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while True:
+            wait = self._take()
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+    def refund(self):
+        """Returns a token that was taken but not used."""
+        if self.rate_per_minute is None:
+            return
+        with self._lock:
+            self._tokens = min(float(self.burst), self._tokens + 1.0)
+
+class RateLimiter:
+    """
+    One TokenBucket per endpoint, shared by every worker and client so the combined
+    request rate stays under the configured pace.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[Optional[float], int]]] = None):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        for endpoint, (rate, burst) in (limits or DEFAULT_LIMITS).items():
+            self._buckets[endpoint] = TokenBucket(rate, burst)
+
+    def bucket(self, endpoint: str) -> TokenBucket:
+        """Returns the endpoint's bucket, creating an unlimited one for unknown endpoints."""
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                bucket = self._buckets[endpoint] = TokenBucket(None)
+            return bucket
+
+    def configure(self, endpoint: str, rate_per_minute: Optional[float], burst: int = 1):
+        self.bucket(endpoint).configure(rate_per_minute, burst)
+
+    def acquire(self, endpoint: str):
+        self.bucket(endpoint).acquire()
+
+    async def acquire_async(self, endpoint: str):
+        await self.bucket(endpoint).acquire_async()
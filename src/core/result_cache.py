@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+from .lru_index import LRUFileIndex
+
+def make_cache_key(prompt: str, aspect_ratio: str, image_model: str, seed: Optional[int],
+                   variation: Optional[int] = None) -> str:
+    """
+    Content address of one generated image. Without a seed every call is a new random
+    draw, so the variation number is part of the key (variation 2 of a prompt only
+    matches an earlier variation 2); with a seed it is ignored.
+    """
+    material = [prompt, aspect_ratio, image_model, seed, variation if seed is None else None]
+    return hashlib.sha256(json.dumps(material, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def link_or_copy(source: str, dest: str):
+    """Hard-links source to dest (copies across filesystems), replacing dest atomically."""
+    directory = os.path.dirname(os.path.abspath(dest))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".part", dir=directory)
+    os.close(fd)
+    os.remove(temp_path)
+    try:
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, dest)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class ResultCache:
+    """
+    On-disk cache of generated images, addressed by make_cache_key.
+
+    Each entry is a file in `cache_dir` (a hard link to the output it came from when
+    possible, so caching costs no extra space until the output is deleted) indexed in
+    cache_dir/index.db with its size and last use. Once the total exceeds `max_bytes`
+    the least recently used entries are dropped. Thread-safe.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = LRUFileIndex(os.path.join(cache_dir, "index.db"), "entries", max_bytes)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._index.total_bytes
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Returns the cached file for key (marking it recently used), or None."""
+        return self._index.lookup(key)
+
+    def put(self, key: str, source_path: str):
+        """Adds source_path under key, then evicts least recently used entries over budget."""
+        entry_path = os.path.join(self.cache_dir, key[:2], key + os.path.splitext(source_path)[1])
+        link_or_copy(source_path, entry_path)
+        self._index.add(key, entry_path, os.path.getsize(entry_path))
+
+    def materialize(self, key: str, dest: str) -> bool:
+        """Links or copies the cached image for key to dest. Returns False on a miss."""
+        path = self.lookup(key)
+        if path is None:
+            return False
+        if os.path.abspath(path) != os.path.abspath(dest):
+            link_or_copy(path, dest)
+        return True
+
+    def close(self):
+        self._index.close()
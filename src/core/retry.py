@@ -0,0 +1,65 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+from .concurrency import BACKOFF_STATUS_CODES
+from .session_pool import NoSessionAvailable
+
+# Overload signals plus request timeouts; everything else (400, 401, 403, ...) is permanent
+RETRYABLE_STATUS_CODES = BACKOFF_STATUS_CODES | {408}
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header (delta-seconds or HTTP-date) into seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """
+    Decides whether a failed generation is worth retrying and how long to wait.
+
+    Retryable: 408/429/5xx responses, timeouts, connection-level errors and a pool whose
+    accounts are all parked for a while (NoSessionAvailable with a retry_after). Delays use
+    exponential backoff with full jitter (uniform between 0 and base * 2^(attempt-1),
+    capped at max_delay), and never less than a server-sent Retry-After.
+    `max_attempts` is the per-job budget, counted across restarts via jobs.attempts.
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 2.0, max_delay: float = 300.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def is_retryable(self, error: BaseException) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        if isinstance(error, NoSessionAvailable):
+            return error.retry_after is not None
+        # Timeouts, connection resets, protocol errors
+        return isinstance(error, httpx.TransportError)
+
+    def should_retry(self, error: BaseException, attempts: int) -> bool:
+        """`attempts` is how many tries have failed so far, including this one."""
+        return attempts < self.max_attempts and self.is_retryable(error)
+
+    def backoff(self, attempts: int, error: Optional[BaseException] = None) -> float:
+        ceiling = min(self.max_delay, self.base_delay * (2 ** max(0, attempts - 1)))
+        delay = random.uniform(0, ceiling)
+        if isinstance(error, httpx.HTTPStatusError):
+            retry_after = parse_retry_after(error.response.headers.get("Retry-After"))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_delay))
+        elif isinstance(error, NoSessionAvailable) and error.retry_after is not None:
+            delay = max(delay, min(error.retry_after, self.max_delay))
+        return delay
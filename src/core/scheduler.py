@@ -0,0 +1,180 @@
+import heapq
+import itertools
+import math
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+DEFAULT_BATCH = "default"
+# Added to a job's priority when the user retries it by hand
+RETRY_PRIORITY_BOOST = 10
+
+class _Batch:
+    __slots__ = ("batch_id", "heap", "live", "priority", "weight", "served")
+
+    def __init__(self, batch_id: str):
+        self.batch_id = batch_id
+        self.heap: List[list] = []   # [-priority, deadline, seq, job]; job is None once superseded
+        self.live = 0
+        self.priority = 0            # added to every job of the batch
+        self.weight = 1.0            # share of dispatches relative to other batches
+        self.served = 0.0            # virtual time: dispatches / weight
+
+    def head(self) -> Optional[list]:
+        while self.heap and self.heap[0][-1] is None:
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+class JobScheduler:
+    """
+    Drop-in replacement for the engine's queue.Queue that decides which job runs next.
+
+    Order: highest priority first (job priority plus its batch's priority), then the
+    earliest deadline, then fair share between batches (the batch with the least
+    dispatches per unit of weight, so a small batch is not stuck behind a huge one),
+    then submission order. Each batch keeps its own heap, so picking a job costs
+    O(batches + log jobs). Reprioritising a job pushes a fresh entry and leaves the old
+    one to be skipped when it surfaces; changing a batch's priority or weight is O(1).
+
+    Keeps the Queue calls the engine relies on (put, get_nowait, empty, qsize,
+    task_done). Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._batches: Dict[str, _Batch] = {}
+        self._entries: Dict[Any, list] = {}   # job id -> its live heap entry
+        self._seq = itertools.count()
+        self._size = 0
+        self.unfinished_tasks = 0
+
+    # --- Queue-compatible API ---
+
+    def put(self, job: Dict[str, Any], block: bool = True, timeout: Optional[float] = None):
+        self.put_many([job])
+
+    def put_many(self, jobs: List[Dict[str, Any]]):
+        """Adds jobs under one lock, so the dispatcher never sees part of a batch."""
+        with self._lock:
+            for job in jobs:
+                self._push(job, next(self._seq))
+            self.unfinished_tasks += len(jobs)
+            self._not_empty.notify_all()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Dict[str, Any]:
+        with self._not_empty:
+            if block and not self._not_empty.wait_for(lambda: self._size > 0, timeout):
+                raise queue.Empty
+            return self._pop()
+
+    def get_nowait(self) -> Dict[str, Any]:
+        return self.get(block=False)
+
+    def task_done(self):
+        with self._lock:
+            self.unfinished_tasks = max(0, self.unfinished_tasks - 1)
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def clear(self):
+        with self._lock:
+            self.unfinished_tasks = max(0, self.unfinished_tasks - self._size)
+            self._batches.clear()
+            self._entries.clear()
+            self._size = 0
+
+    # --- Scheduling controls ---
+
+    def reprioritize(self, job_id: Any, priority: int) -> bool:
+        """Changes a queued job's priority. Returns False if it is not queued."""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return False
+            job, seq = entry[-1], entry[2]
+            self._discard(entry)
+            job["priority"] = priority
+            # Same sequence number: it keeps its place among jobs of equal priority
+            self._push(job, seq)
+            return True
+
+    def remove(self, job_id: Any) -> Optional[Dict[str, Any]]:
+        """Takes a queued job out without running it."""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return None
+            job = entry[-1]
+            self._discard(entry)
+            self.unfinished_tasks = max(0, self.unfinished_tasks - 1)
+            return job
+
+    def set_batch_priority(self, batch_id: str, priority: int):
+        with self._lock:
+            self._batch(batch_id).priority = priority
+
+    def set_batch_weight(self, batch_id: str, weight: float):
+        with self._lock:
+            self._batch(batch_id).weight = max(0.01, float(weight))
+
+    def __contains__(self, job_id: Any) -> bool:
+        return job_id in self._entries
+
+    # --- Internals (lock held) ---
+
+    def _batch(self, batch_id: str) -> _Batch:
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            batch = self._batches[batch_id] = _Batch(batch_id)
+        return batch
+
+    def _push(self, job: Dict[str, Any], seq: int):
+        batch = self._batch(job.get("batch_id") or DEFAULT_BATCH)
+        if batch.live == 0:
+            # A batch that was idle starts level with the others instead of owing them its idle time
+            active = [b.served for b in self._batches.values() if b.live]
+            if active:
+                batch.served = max(batch.served, min(active))
+        deadline = job.get("deadline")
+        entry = [-int(job.get("priority") or 0), deadline if deadline is not None else math.inf, seq, job]
+        heapq.heappush(batch.heap, entry)
+        batch.live += 1
+        self._size += 1
+        old = self._entries.get(job.get("id"))
+        if old is not None:
+            # Same job queued twice: the newer entry wins
+            self._discard(old)
+        self._entries[job.get("id")] = entry
+
+    def _discard(self, entry: list):
+        job = entry[-1]
+        entry[-1] = None
+        self._entries.pop(job.get("id"), None)
+        self._batch(job.get("batch_id") or DEFAULT_BATCH).live -= 1
+        self._size -= 1
+
+    def _pop(self) -> Dict[str, Any]:
+        best, best_key = None, None
+        for batch in self._batches.values():
+            head = batch.head()
+            if head is None:
+                continue
+            key = (head[0] - batch.priority, head[1], batch.served, head[2])
+            if best_key is None or key < best_key:
+                best, best_key = batch, key
+        if best is None:
+            raise queue.Empty
+        entry = heapq.heappop(best.heap)
+        job = entry[-1]
+        self._entries.pop(job.get("id"), None)
+        best.live -= 1
+        best.served += 1.0 / best.weight
+        self._size -= 1
+        if best.live == 0 and not best.priority and best.weight == 1.0:
+            del self._batches[best.batch_id]
+        return job
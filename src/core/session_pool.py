@@ -0,0 +1,190 @@
+import asyncio
+import itertools
+import threading
+import time
+from typing import Any, List, Optional
+
+from .rate_limit import TokenBucket
+
+# Responses that say this account (not the service) is the problem
+AUTH_FAILURE_CODES = {401, 403}
+QUOTA_FAILURE_CODES = {429}
+ACCOUNT_FAILURE_CODES = AUTH_FAILURE_CODES | QUOTA_FAILURE_CODES
+
+LEAST_LOADED = "least_loaded"
+WEIGHTED_ROUND_ROBIN = "weighted_round_robin"
+
+class NoSessionAvailable(Exception):
+    """
+    No account can take a request: none are configured, or every one is parked for
+    rejected credentials. `retry_after` is the seconds until the first parked account
+    is tried again (None when there is nothing to wait for).
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _auth_generation(client: Any) -> Optional[int]:
+    return getattr(client, "auth_generation", None)
+
+class PooledSession:
+    """One authenticated account: its client plus the pool's bookkeeping for it."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, client: Any, name: Optional[str] = None, weight: int = 1,
+                 rate_per_minute: Optional[float] = None, burst: int = 1):
+        self.client = client
+        self.name = name or f"account-{next(self._ids)}"
+        self.weight = max(1, int(weight))
+        # Per-account quota, on top of the manager-wide rate limiter
+        self.bucket = TokenBucket(rate_per_minute, burst)
+
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.disabled = False        # credentials rejected; parked until its token changes or cooldown_until
+        self.cooldown_until = 0.0    # throttled or rejected; back in rotation after this (monotonic)
+        self.cooldown = 0.0
+        self.rejected_generation: Optional[int] = None  # client's auth generation when it was rejected
+        self._current_weight = 0     # smooth weighted round-robin state
+
+    def is_available(self, now: float) -> bool:
+        if self.rejected_generation is not None and _auth_generation(self.client) != self.rejected_generation:
+            # The client has fetched a new token since the rejection: take it back straight away
+            self.disabled = False
+            self.cooldown_until = 0.0
+            self.rejected_generation = None
+        elif self.disabled and now >= self.cooldown_until:
+            # Parked long enough; the next request finds out whether the credentials work again
+            self.disabled = False
+        return not self.disabled and now >= self.cooldown_until
+
+    def __repr__(self):
+        state = "disabled" if self.disabled else f"in_flight={self.in_flight}"
+        return f"<PooledSession {self.name} {state}>"
+
+class SessionPool:
+    """
+    Spreads requests over several accounts, each with its own client, quota and health.
+
+    `acquire` picks an available account (least in-flight requests per unit of weight,
+    or smooth weighted round-robin) that also has a token in its own bucket. An account
+    answering 401/403 is parked for `auth_cooldown` seconds, or until its client gets a
+    new token; the last healthy account is never parked, only cooled down like a 429.
+    429 puts one in an exponentially growing cooldown (at least the server's
+    Retry-After) and the first success clears it.
+    Thread-safe; `acquire_async` waits on the engine loop when every account is busy.
+    """
+
+    def __init__(self, strategy: str = LEAST_LOADED, base_cooldown: float = 30.0, max_cooldown: float = 600.0,
+                 auth_cooldown: float = 300.0):
+        if strategy not in (LEAST_LOADED, WEIGHTED_ROUND_ROBIN):
+            raise ValueError(f"Unknown strategy: {strategy}")
+        self.strategy = strategy
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.auth_cooldown = auth_cooldown
+        self._sessions: List[PooledSession] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def sessions(self) -> List[PooledSession]:
+        with self._lock:
+            return list(self._sessions)
+
+    @property
+    def primary(self) -> Optional[PooledSession]:
+        with self._lock:
+            return self._sessions[0] if self._sessions else None
+
+    def add(self, session: PooledSession) -> PooledSession:
+        with self._lock:
+            self._sessions.append(session)
+        return session
+
+    def remove(self, session: PooledSession):
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+
+    def clear(self):
+        with self._lock:
+            self._sessions = []
+
+    def has_available(self, exclude: Optional[PooledSession] = None) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            return any(s is not exclude and s.is_available(now) for s in self._sessions)
+
+    def _order(self, candidates: List[PooledSession]) -> List[PooledSession]:
+        if self.strategy == LEAST_LOADED:
+            return sorted(candidates, key=lambda s: s.in_flight / s.weight)
+        return sorted(candidates, key=lambda s: s._current_weight + s.weight, reverse=True)
+
+    def try_acquire(self) -> Optional[PooledSession]:
+        """Takes an account for one request, or returns None if none can send right now."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [s for s in self._sessions if s.is_available(now)]
+            if not candidates and self._sessions and all(s.disabled for s in self._sessions):
+                retry_after = min(s.cooldown_until for s in self._sessions) - now
+                raise NoSessionAvailable("All accounts were rejected; add fresh cookies", max(0.0, retry_after))
+            for session in self._order(candidates):
+                if session.bucket.try_acquire():
+                    if self.strategy == WEIGHTED_ROUND_ROBIN:
+                        total = sum(s.weight for s in candidates)
+                        for s in candidates:
+                            s._current_weight += s.weight
+                        session._current_weight -= total
+                    session.in_flight += 1
+                    return session
+            return None
+
+    async def acquire_async(self, poll_interval: float = 0.05) -> PooledSession:
+        while True:
+            session = self.try_acquire()
+            if session is not None:
+                return session
+            if not self._sessions:
+                raise NoSessionAvailable("No accounts configured")
+            await asyncio.sleep(poll_interval)
+
+    def record_success(self, session: PooledSession):
+        with self._lock:
+            session.in_flight = max(0, session.in_flight - 1)
+            session.successes += 1
+            session.cooldown = 0.0
+            session.rejected_generation = None
+
+    def _cool_down(self, session: PooledSession, retry_after: Optional[float] = None) -> float:
+        session.cooldown = min(self.max_cooldown, max(self.base_cooldown, session.cooldown * 2))
+        wait = max(session.cooldown, min(retry_after or 0.0, self.max_cooldown))
+        session.cooldown_until = time.monotonic() + wait
+        return wait
+
+    def record_failure(self, session: PooledSession, status_code: Optional[int] = None,
+                       retry_after: Optional[float] = None):
+        """Releases the account after a failed request and benches it if the failure was its own."""
+        with self._lock:
+            session.in_flight = max(0, session.in_flight - 1)
+            session.failures += 1
+            if status_code in AUTH_FAILURE_CODES:
+                session.rejected_generation = _auth_generation(session.client)
+                now = time.monotonic()
+                others = [s for s in self._sessions if s is not session]
+                if any(s.is_available(now) or not s.disabled for s in others):
+                    session.disabled = True
+                    session.cooldown_until = now + self.auth_cooldown
+                    print(f"Parking {session.name} for {self.auth_cooldown:.0f}s: credentials rejected ({status_code})")
+                else:
+                    # Parking the last account would fail every queued job; hold them while its token is refreshed
+                    wait = self._cool_down(session, retry_after)
+                    print(f"Credentials of {session.name} rejected ({status_code}); last account, retrying in {wait:.0f}s")
+            elif status_code in QUOTA_FAILURE_CODES:
+                wait = self._cool_down(session, retry_after)
+                print(f"Cooling down {session.name} for {wait:.0f}s after 429")
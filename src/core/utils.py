@@ -1,10 +1,11 @@
+import datetime
 import json
-import base64
 import os
 import re
 import subprocess
 import platform
 from typing import Optional, Dict, Any, Tuple
+from .image_stream import write_base64_file
 
 def open_file(path: str):
     """Opens a file with the default application in a cross-platform way."""
@@ -18,6 +19,31 @@ def open_file(path: str):
     except Exception as e:
         print(f"Error opening file {path}: {e}")
 
+def parse_expiry(expires: Any) -> Optional[float]:
+    """
+    Converts a session `expires` value (epoch milliseconds or seconds, as a number or
+    digit string, or an ISO 8601 timestamp) to epoch seconds. None if unparseable.
+    """
+    if expires is None or isinstance(expires, bool):
+        return None
+    if isinstance(expires, str):
+        value = expires.strip()
+        if not value:
+            return None
+        if not value.isdigit():
+            try:
+                dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=datetime.timezone.utc)
+            return dt.timestamp()
+        expires = int(value)
+    if not isinstance(expires, (int, float)):
+        return None
+    # Milliseconds since the epoch are 13 digits for any date we will see
+    return expires / 1000 if expires > 1e11 else float(expires)
+
 def parse_cookie_json(json_str: str) -> Tuple[Optional[str], Dict[str, str]]:
     """
     Parses the Cookie Exporter JSON and extracts the Google access token and all cookies.
@@ -65,20 +91,21 @@ def parse_cookie_json(json_str: str) -> Tuple[Optional[str], Dict[str, str]]:
         return None, {}
 
 def save_image(encoded_image: str, output_path: str) -> bool:
-    """Decodes base64 image and saves to file."""
+    """Decodes base64 image in blocks and atomically moves it into place."""
     try:
-        # Remove header if present (e.g. data:image/jpeg;base64,...)
-        if ',' in encoded_image:
-            encoded_image = encoded_image.split(',', 1)[1]
-            
-        image_data = base64.b64decode(encoded_image)
-        with open(output_path, "wb") as f:
-            f.write(image_data)
+        # Header (e.g. data:image/jpeg;base64,...) is removed by the writer
+        write_base64_file(encoded_image, output_path)
         return True
     except Exception as e:
         print(f"Error saving image to {output_path}: {e}")
         return False
 
+def variation_filename(prompt_index: int, count: int, variation: int) -> str:
+    """Output filename for a 1-based variation of a prompt (strict sequential naming)."""
+    if count == 1:
+        return f"image_{prompt_index}.jpg"
+    return f"image_{prompt_index}_{variation}.jpg"
+
 def save_metadata(metadata: Dict[str, Any], output_path: str) -> bool:
     """Saves metadata to a JSON file."""
     try:
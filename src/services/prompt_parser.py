@@ -1,19 +1,67 @@
-from PySide6.QtCore import QObject, Signal, QThread
+from PySide6.QtCore import QObject, Signal
+from concurrent.futures import ProcessPoolExecutor
 import re
 import csv
+import mmap
+import multiprocessing
 import os
+import time
+
+# Leading numbers/bullets: "1. ", "001)", "- "
+INDEX_PATTERN = re.compile(r'^\s*\d+[\).\-\s]*')
+
+# Plain-text files are cut into chunks of about this size, ending on a line boundary
+CHUNK_BYTES = 4 * 1024 * 1024
+# Files at least this large are cleaned on a process pool; smaller ones are not worth the startup
+PARALLEL_THRESHOLD = 16 * 1024 * 1024
+# Seconds between batchReady emissions while ingesting a file
+EMIT_INTERVAL = 0.016
+
+def clean_prompt(line, remove_index=False):
+    prompt = line.strip()
+    if prompt and remove_index:
+        prompt = INDEX_PATTERN.sub('', prompt).strip()
+        # Also handle just "- " bullet
+        if prompt.startswith("- "):
+            prompt = prompt[2:].strip()
+    return prompt
+
+def clean_chunk(data, remove_index=False):
+    """Cleans one chunk of UTF-8 text and returns its non-empty prompts in order."""
+    prompts = []
+    for line in data.decode('utf-8').split('\n'):
+        prompt = clean_prompt(line, remove_index)
+        if prompt:
+            prompts.append(prompt)
+    return prompts
+
+def chunk_bounds(buf, chunk_bytes=None):
+    """(start, end) offsets splitting buf into pieces of about chunk_bytes that end just after a newline."""
+    chunk_bytes = chunk_bytes or CHUNK_BYTES
+    size = len(buf)
+    start = 3 if buf[:3] == b'\xef\xbb\xbf' else 0  # UTF-8 BOM
+    while start < size:
+        end = min(size, start + chunk_bytes)
+        if end < size:
+            newline = buf.find(b'\n', end)
+            end = size if newline == -1 else newline + 1
+        yield start, end
+        start = end
 
 class PromptParserWorker(QObject):
     batchReady = Signal(list)      # list of prompt strings
     finished = Signal(int)         # total count
     error = Signal(str)
 
-    def __init__(self, text_or_path, mode, remove_index=False, batch_size=50):
+    def __init__(self, text_or_path, mode, remove_index=False, batch_size=50,
+                 emit_interval=EMIT_INTERVAL, workers=None):
         super().__init__()
         self.text_or_path = text_or_path
         self.mode = mode          # "textarea", "file"
         self.remove_index = remove_index
         self.batch_size = batch_size
+        self.emit_interval = emit_interval
+        self.workers = workers or os.cpu_count() or 1
         self.alive = True
 
     def run(self):
@@ -38,17 +86,7 @@ class PromptParserWorker(QObject):
             if not self.alive:
                 break
 
-            prompt = line.strip()
-            if not prompt:
-                continue
-
-            if self.remove_index:
-                # Regex to remove leading numbers/bullets: "1. ", "001)", "- "
-                prompt = re.sub(r'^\s*\d+[\).\-\s]*', '', prompt).strip()
-                # Also handle just "- " bullet
-                if prompt.startswith("- "):
-                    prompt = prompt[2:].strip()
-
+            prompt = clean_prompt(line, self.remove_index)
             if prompt:
                 batch.append(prompt)
                 total += 1
@@ -56,59 +94,82 @@ class PromptParserWorker(QObject):
             if len(batch) >= self.batch_size:
                 self.batchReady.emit(batch)
                 batch = []
-                QThread.msleep(10) # Yield to main thread
 
         if batch:
             self.batchReady.emit(batch)
-            
+
         return total
 
     def process_file(self, path):
-        total = 0
-        batch = []
-        
         if path.lower().endswith('.csv'):
-            with open(path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    if not self.alive: break
-                    if row:
-                        prompt = row[0].strip()
-                        if self.remove_index:
-                             prompt = re.sub(r'^\s*\d+[\).\-\s]*', '', prompt).strip()
-                             if prompt.startswith("- "): prompt = prompt[2:].strip()
-                        
-                        if prompt:
-                            batch.append(prompt)
-                            total += 1
-                            
-                        if len(batch) >= self.batch_size:
-                            self.batchReady.emit(batch)
-                            batch = []
-                            QThread.msleep(10)
-        else:
-            with open(path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if not self.alive: break
-                    prompt = line.strip()
-                    if not prompt: continue
-                    
-                    if self.remove_index:
-                         prompt = re.sub(r'^\s*\d+[\).\-\s]*', '', prompt).strip()
-                         if prompt.startswith("- "): prompt = prompt[2:].strip()
-                    
+            return self._emit_timed(self._csv_chunks(path))
+        return self._emit_timed(self._text_file_chunks(path))
+
+    def _csv_chunks(self, path, rows_per_chunk=10000):
+        # Quoted fields may span lines, so CSV is read sequentially rather than split
+        with open(path, 'r', encoding='utf-8') as f:
+            prompts = []
+            for row in csv.reader(f):
+                if row:
+                    prompt = clean_prompt(row[0], self.remove_index)
                     if prompt:
-                        batch.append(prompt)
-                        total += 1
-                        
-                    if len(batch) >= self.batch_size:
-                        self.batchReady.emit(batch)
-                        batch = []
-                        QThread.msleep(10)
+                        prompts.append(prompt)
+                if len(prompts) >= rows_per_chunk:
+                    yield prompts
+                    prompts = []
+            if prompts:
+                yield prompts
+
+    def _text_file_chunks(self, path):
+        """Yields the cleaned prompts of each chunk of a text file, in file order."""
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                bounds = chunk_bounds(buf)
+                if len(buf) < PARALLEL_THRESHOLD or self.workers < 2:
+                    for start, end in bounds:
+                        if not self.alive:
+                            return
+                        yield clean_chunk(buf[start:end], self.remove_index)
+                    return
+
+                # Spawned, not forked: forking a process with Qt loaded is unsafe
+                with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    # Keep a couple of chunks per worker in flight so memory stays bounded
+                    pending = []
+                    for start, end in bounds:
+                        if not self.alive:
+                            break
+                        pending.append(pool.submit(clean_chunk, buf[start:end], self.remove_index))
+                        if len(pending) >= self.workers * 2:
+                            yield pending.pop(0).result()
+                    while pending and self.alive:
+                        yield pending.pop(0).result()
+                    for future in pending:
+                        future.cancel()
+
+    def _emit_timed(self, chunks):
+        """Emits what has accumulated every emit_interval seconds, however many prompts that is."""
+        batch = []
+        total = 0
+        last_emit = time.monotonic()
+        for prompts in chunks:
+            if not self.alive:
+                break
+            for i in range(0, len(prompts), self.batch_size):
+                batch.extend(prompts[i:i + self.batch_size])
+                now = time.monotonic()
+                if now - last_emit >= self.emit_interval:
+                    self.batchReady.emit(batch)
+                    total += len(batch)
+                    batch = []
+                    last_emit = now
 
         if batch:
             self.batchReady.emit(batch)
-            
+            total += len(batch)
+
         return total
 
     def stop(self):
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Callable, Dict, Optional
+
+from ..core.lru_index import LRUFileIndex
+
+def thumbnail_key(source_path: str) -> Optional[str]:
+    """
+    Identity of a source image's current content: its absolute path, mtime and size.
+    A file rewritten in place (a new run saving image_1.jpg again) gets a new key.
+    Returns None if the source does not exist.
+    """
+    try:
+        st = os.stat(source_path)
+    except OSError:
+        return None
+    material = f"{os.path.abspath(source_path)}\0{st.st_mtime_ns}\0{st.st_size}"
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+class ThumbnailCache:
+    """
+    On-disk thumbnail cache indexed in cache_dir/index.db.
+
+    Entries are keyed by thumbnail_key, so a stale thumbnail is never served for a
+    file that has changed; the entry it replaces is dropped when the new one is added.
+    Once the total exceeds `max_bytes` the least recently used thumbnails are deleted.
+    Thread-safe; use `for_dir` to share one instance between workers.
+    """
+
+    _instances: Dict[str, "ThumbnailCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 ** 2, extension: str = ".webp"):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.extension = extension
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = LRUFileIndex(os.path.join(cache_dir, "index.db"), "thumbnails", max_bytes, columns=("source",))
+
+    @classmethod
+    def for_dir(cls, cache_dir: str, **kwargs) -> "ThumbnailCache":
+        """The shared cache for cache_dir, created on first use."""
+        directory = os.path.abspath(cache_dir)
+        with cls._instances_lock:
+            cache = cls._instances.get(directory)
+            if cache is None:
+                cache = cls._instances[directory] = cls(directory, **kwargs)
+            return cache
+
+    @property
+    def total_bytes(self) -> int:
+        return self._index.total_bytes
+
+    def lookup(self, source_path: str) -> Optional[str]:
+        """Returns the thumbnail for source_path's current content (marking it used), or None."""
+        key = thumbnail_key(source_path)
+        if key is None:
+            return None
+        return self._index.lookup(key)
+
+    def put(self, source_path: str, render: Callable[[str], None]) -> Optional[str]:
+        """
+        Creates the thumbnail by calling render(dest_path), which must write the image
+        file, then indexes it. Returns the thumbnail path, or None if the source is gone.
+        """
+        key = thumbnail_key(source_path)
+        if key is None:
+            return None
+        entry_path = os.path.join(self.cache_dir, key[:2], key + self.extension)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".tmp_", suffix=self.extension, dir=os.path.dirname(entry_path))
+        os.close(fd)
+        try:
+            render(temp_path)
+            os.replace(temp_path, entry_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        # Drops the thumbnails of the file's previous content
+        self._index.add(key, entry_path, os.path.getsize(entry_path),
+                        values={"source": os.path.abspath(source_path)}, supersede="source")
+        return entry_path
+
+    def get_or_create(self, source_path: str, render: Callable[[str], None]) -> Optional[str]:
+        return self.lookup(source_path) or self.put(source_path, render)
+
+    def close(self):
+        self._index.close()
+        with self._instances_lock:
+            if self._instances.get(self.cache_dir) is self:
+                del self._instances[self.cache_dir]
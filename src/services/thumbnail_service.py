@@ -0,0 +1,115 @@
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+def load_thumbnail(path: str, size: Tuple[int, int]) -> Image.Image:
+    """
+    Decodes path straight to a thumbnail no larger than size.
+
+    For JPEGs, draft() lets the decoder scale by 1/2, 1/4 or 1/8 while decoding, so a
+    full-resolution result is never materialised; thumbnail() then does the final,
+    aspect-preserving resize. The returned image owns no file handle.
+    """
+    with Image.open(path) as img:
+        img.draft("RGB", size)
+        img.thumbnail(size, Image.Resampling.LANCZOS)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        else:
+            img.load()
+        return img.copy()
+
+class ThumbnailService:
+    """
+    Decodes thumbnails on a small worker pool and hands them back on the Tk main thread.
+
+    `request(path, callback)` returns at once; the callback later runs on the main
+    thread with the thumbnail (a small PIL image) or None if decoding failed. Workers
+    never touch Tk: finished images go on a queue that the main thread drains from an
+    after() poll, which only runs while requests are outstanding. Repeated requests for
+    a path being decoded share one decode, and the last `max_cached` thumbnails are
+    kept so rows scrolling back into view are served without a decode.
+    """
+
+    def __init__(self, widget, size: Tuple[int, int] = (100, 100), max_workers: int = 2,
+                 max_cached: int = 256, poll_ms: int = 16):
+        self.widget = widget
+        self.size = size
+        self.max_cached = max_cached
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="WhiskThumb")
+        self._results: "queue.Queue[Tuple[str, Optional[Image.Image]]]" = queue.Queue()
+        self._waiting: Dict[str, List[Callable]] = {}
+        self._cache: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self._polling = False
+        self._closed = False
+
+    def get(self, path: str) -> Optional[Image.Image]:
+        """The cached thumbnail for path, or None. Main thread only."""
+        image = self._cache.get(path)
+        if image is not None:
+            self._cache.move_to_end(path)
+        return image
+
+    def request(self, path: str, callback: Callable[[str, Optional[Image.Image]], None]):
+        """Calls callback(path, image) on the main thread once the thumbnail is ready. Main thread only."""
+        if self._closed:
+            return
+        image = self.get(path)
+        if image is not None:
+            callback(path, image)
+            return
+        waiting = self._waiting.get(path)
+        if waiting is not None:
+            waiting.append(callback)
+            return
+        self._waiting[path] = [callback]
+        self._executor.submit(self._decode, path)
+        self._schedule_poll()
+
+    def _decode(self, path: str):
+        try:
+            image = load_thumbnail(path, self.size)
+        except Exception as e:
+            print(f"Error loading thumbnail: {e}")
+            image = None
+        self._results.put((path, image))
+
+    def _schedule_poll(self):
+        if not self._polling and not self._closed:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        if self._closed:
+            return
+        while True:
+            try:
+                path, image = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if image is not None:
+                self._cache[path] = image
+                if len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+            for callback in self._waiting.pop(path, []):
+                callback(path, image)
+        if self._waiting:
+            self._schedule_poll()
+
+    def forget(self, path: Optional[str] = None):
+        """Drops one cached thumbnail (e.g. the file was rewritten), or all of them."""
+        if path is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(path, None)
+
+    def close(self):
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._waiting.clear()
+        self._cache.clear()
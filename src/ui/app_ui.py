@@ -5,10 +5,12 @@ import threading
 import os
 import sys
 import datetime
-from PIL import Image, ImageTk
+import time
+import re
 from ..core.job_manager import JobManager
-from ..core.job_manager import JobManager
-from ..core.utils import parse_cookie_json, open_file
+from ..core.concurrency import MAX_PARALLEL
+from ..core.utils import parse_cookie_json, parse_expiry, open_file
+from .virtual_list import VirtualJobList
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
@@ -41,13 +43,17 @@ class WhiskApp(ctk.CTk):
             print(f"Failed to set icon: {e}")
 
         self.job_manager = JobManager()
-        self.job_rows = {} # Map job_id -> dict of UI widgets
+        self.job_rows = {} # Map job_id -> row data; the queue view draws only the visible rows
         self.total_jobs = 0
         self.completed_jobs = 0
+        # Jobs from a previous session are counted on their own, and only once resumed
+        self.recovered_total = 0
+        self.recovered_completed = 0
         self.total_images_expected = 0
         self.total_images_expected = 0
         self.images_generated_count = 0
         self.start_time = None
+        self._closing = False
         
         self._setup_callbacks()
         
@@ -72,6 +78,11 @@ class WhiskApp(ctk.CTk):
         
         self.redirect_logging()
 
+        # Find jobs a previous session didn't finish; they only run if the user resumes them
+        self.recovered_jobs = self.job_manager.recover_jobs()
+        if self.recovered_jobs:
+            self.update_status(f"{self.recovered_jobs} unfinished jobs found. Press START with no prompts to resume them.")
+
     def _setup_callbacks(self):
         self.job_manager.on_status_change = self.update_status
         self.job_manager.on_job_error = self.log_error
@@ -147,12 +158,12 @@ class WhiskApp(ctk.CTk):
         self.count_menu = ctk.CTkOptionMenu(config_frame, variable=self.count_var, values=["1", "2", "3", "4"], width=70)
         self.count_menu.grid(row=1, column=1, padx=10, pady=(0, 10), sticky="ew")
 
-        # Parallel Threads
-        ctk.CTkLabel(config_frame, text="Parallel Threads:").grid(row=2, column=0, padx=10, pady=5, sticky="w")
-        self.parallel_var = ctk.IntVar(value=2)
-        self.parallel_slider = ctk.CTkSlider(config_frame, from_=1, to=2, number_of_steps=1, variable=self.parallel_var)
+        # Max Parallel (ceiling for the adaptive concurrency controller)
+        ctk.CTkLabel(config_frame, text="Max Parallel:").grid(row=2, column=0, padx=10, pady=5, sticky="w")
+        self.parallel_var = ctk.IntVar(value=16)
+        self.parallel_slider = ctk.CTkSlider(config_frame, from_=1, to=MAX_PARALLEL, number_of_steps=MAX_PARALLEL - 1, variable=self.parallel_var)
         self.parallel_slider.grid(row=3, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="ew")
-        self.parallel_label = ctk.CTkLabel(config_frame, text="2")
+        self.parallel_label = ctk.CTkLabel(config_frame, text="16")
         self.parallel_label.grid(row=2, column=1, padx=10, pady=5, sticky="e")
         
         # Update label on slider change
@@ -160,6 +171,16 @@ class WhiskApp(ctk.CTk):
             self.parallel_label.configure(text=str(int(value)))
         self.parallel_slider.configure(command=update_parallel_label)
 
+        # Reuse images already rendered with the same prompt and settings
+        self.reuse_cached_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(config_frame, text="Reuse cached results", variable=self.reuse_cached_var,
+                        command=self._toggle_reuse_cached).grid(row=4, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="w")
+
+        # Duplicate prompts share one generation unless distinct images are wanted
+        self.distinct_seeds_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(config_frame, text="Distinct images for duplicates", variable=self.distinct_seeds_var,
+                        command=self._toggle_distinct_seeds).grid(row=5, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="w")
+
         # Prompts Label
         ctk.CTkLabel(self.sidebar_frame, text="Prompts List:", anchor="w").grid(row=7, column=0, padx=20, pady=(10, 0), sticky="ew")
         
@@ -242,13 +263,11 @@ class WhiskApp(ctk.CTk):
         self.retry_all_btn = ctk.CTkButton(header_frame, text="Retry Failed", fg_color="red", width=80, height=24, command=self.retry_all_failed)
         self.retry_all_btn.grid(row=0, column=4, padx=5)
 
-        # Scrollable Job List
-        self.job_list_frame = ctk.CTkScrollableFrame(self.tab_queue)
+        # Virtualized Job List: recycles a screenful of row widgets over job_rows
+        self.job_list_frame = VirtualJobList(self.tab_queue, self.job_rows)
         self.job_list_frame.pack(fill="both", expand=True)
-        self.job_list_frame.grid_columnconfigure(0, weight=1)
-        self.job_list_frame.grid_columnconfigure(1, weight=6)
-        self.job_list_frame.grid_columnconfigure(2, weight=2)
-        self.job_list_frame.grid_columnconfigure(3, weight=4)
+        self.job_list_frame.on_retry = self.retry_job
+        self.job_list_frame.on_open = open_file
 
         # --- Logs Tab ---
         self.logs_textbox = ctk.CTkTextbox(self.tab_logs, state="disabled", font=("Consolas", 12))
@@ -296,24 +315,11 @@ class WhiskApp(ctk.CTk):
             self.profile_card.grid(row=1, column=0, padx=20, pady=10, sticky="ew")
             
             self.email_label.configure(text=email)
-            try:
-                import datetime
-                if isinstance(expires, (int, float)) or (isinstance(expires, str) and expires.isdigit()):
-                     # Expires is usually in milliseconds
-                     exp_ts = int(expires) / 1000
-                     dt = datetime.datetime.fromtimestamp(exp_ts)
-                     now = datetime.datetime.now()
-                     
-                     remaining = dt - now
-                     minutes = int(remaining.total_seconds() / 60)
-                     
-                     if minutes > 0:
-                         expires_str = f"{minutes} minutes"
-                     else:
-                         expires_str = "Expired"
-                else:
-                    expires_str = str(expires)
-            except:
+            exp_ts = parse_expiry(expires)
+            if exp_ts is not None:
+                minutes = int((exp_ts - time.time()) / 60)
+                expires_str = f"{minutes} minutes" if minutes > 0 else "Expired"
+            else:
                 expires_str = str(expires)
                 
             self.expiry_label.configure(text=f"Expires in: {expires_str}")
@@ -322,12 +328,26 @@ class WhiskApp(ctk.CTk):
             self.token_status.configure(text="SESSION INVALID", text_color="red")
             self.update_status("Session validation failed.")
 
+    def _toggle_reuse_cached(self):
+        # Opt-in: the cache lives beside the output folder and is only kept while this is on
+        if self.reuse_cached_var.get():
+            self.job_manager.enable_result_cache()
+        else:
+            self.job_manager.disable_result_cache()
+
+    def _toggle_distinct_seeds(self):
+        self.job_manager.force_distinct_seeds = self.distinct_seeds_var.get()
+
     def browse_dir(self):
         path = filedialog.askdirectory()
         if path:
             self.dir_entry.delete(0, "end")
             self.dir_entry.insert(0, path)
             self.job_manager.set_output_dir(path)
+            if self.reuse_cached_var.get():
+                # The cache follows the output folder
+                self.job_manager.disable_result_cache()
+                self.job_manager.enable_result_cache()
 
     def upload_prompts(self):
         filename = filedialog.askopenfilename(filetypes=[("Text Files", "*.txt")])
@@ -344,7 +364,10 @@ class WhiskApp(ctk.CTk):
     def start_processing(self):
         prompts_text = self.prompts_textbox.get("1.0", "end").strip()
         if not prompts_text:
-            self.update_status("No prompts to process.")
+            if self.job_manager.has_recovered_jobs:
+                self._resume_recovered_jobs()
+            else:
+                self.update_status("No prompts to process.")
             return
 
         prompts = [p.strip() for p in prompts_text.split('\n') if p.strip()]
@@ -378,19 +401,38 @@ class WhiskApp(ctk.CTk):
         self.start_time = datetime.datetime.now()
         
         # Add jobs
-        for idx, prompt in enumerate(prompts, 1):
-            if self.remove_index_var.get():
-                # Simple logic to remove leading numbers like "1. ", "1 - "
-                import re
-                prompt = re.sub(r'^\d+[\.\-\)]\s*', '', prompt)
-                
-            job_id = self.job_manager.add_job(prompt, aspect_ratio, count, prompt_index=idx)
-            self._add_job_to_ui(job_id, prompt)
+        if self.remove_index_var.get():
+            # Simple logic to remove leading numbers like "1. ", "1 - "
+            index_pattern = re.compile(r'^\d+[\.\-\)]\s*')
+            prompts = [index_pattern.sub('', prompt) for prompt in prompts]
+
+        job_ids = self.job_manager.add_jobs_bulk(prompts, aspect_ratio, count)
+        self._add_jobs_to_ui(list(zip(job_ids, prompts)))
+
+        self.job_manager.start_processing(max_workers=int(self.parallel_var.get()))
+
+    def _resume_recovered_jobs(self):
+        # Rows are added as each recovered job reports back (see _update_job_row)
+        if not self.job_manager.resume_recovered_jobs():
+            return
+        self.start_btn.configure(state="disabled")
+        self.stop_btn.configure(state="normal")
+        self.pause_btn.configure(state="normal", text="PAUSE", fg_color="orange")
+
+        self.recovered_total = self.recovered_jobs
+        self.recovered_completed = 0
+        self.total_jobs = 0
+        self.completed_jobs = 0
+        self.total_images_expected = self.job_manager.recovered_image_count
+        self.images_generated_count = 0
+        self.start_time = datetime.datetime.now()
+        self.update_status(f"Resuming {self.recovered_jobs} unfinished jobs...")
 
         self.job_manager.start_processing(max_workers=int(self.parallel_var.get()))
 
     def stop_processing(self):
-        self.job_manager.stop_processing()
+        # Never join the engine from the Tk thread: it may be waiting on after() calls to land
+        self.job_manager.stop_processing(timeout=None)
         self.start_btn.configure(state="normal")
         self.stop_btn.configure(state="disabled")
         self.pause_btn.configure(state="disabled", text="PAUSE", fg_color="orange")
@@ -403,32 +445,20 @@ class WhiskApp(ctk.CTk):
             self.job_manager.resume_processing()
             self.pause_btn.configure(text="PAUSE", fg_color="orange", text_color="white")
 
-    def _add_job_to_ui(self, job_id, prompt):
-        row = len(self.job_rows)
-        
-        # Sr No
-        lbl_sr = ctk.CTkLabel(self.job_list_frame, text=str(row + 1), width=30)
-        lbl_sr.grid(row=row, column=0, padx=5, pady=5)
+    def _add_jobs_to_ui(self, pending):
+        """Rows are plain data, so even a large batch is added in one go."""
+        for job_id, prompt in pending:
+            self._add_job_row(job_id, prompt)
+        self.job_list_frame.extend(job_id for job_id, _ in pending)
 
-        # Prompt Label with wrapping
-        # Calculate approximate wrap length based on column weight/width
-        # A safe bet is around 400-500px for the prompt column
-        lbl_prompt = ctk.CTkLabel(self.job_list_frame, text=prompt, anchor="w", justify="left", wraplength=400)
-        lbl_prompt.grid(row=row, column=1, padx=10, pady=15, sticky="ew") # Increased pady
-        
-        # Status Label
-        lbl_status = ctk.CTkLabel(self.job_list_frame, text="PENDING", text_color="orange")
-        lbl_status.grid(row=row, column=2, padx=10, pady=15)
-        
-        # Images Container
-        frame_images = ctk.CTkFrame(self.job_list_frame, fg_color="transparent")
-        frame_images.grid(row=row, column=3, padx=10, pady=15, sticky="ew")
-        
+    def _add_job_row(self, job_id, prompt, recovered=False):
         self.job_rows[job_id] = {
-            "status_label": lbl_status,
-            "images_frame": frame_images,
-            "loaded_images": set(), # Track loaded images to avoid flickering
-            "retry_btn": None # Placeholder for retry button
+            "sr": len(self.job_rows) + 1,
+            "prompt": prompt,
+            "status": "PENDING",
+            "images": [],
+            "seen_images": set(), # Images already counted towards progress
+            "recovered": recovered, # From a previous session; counts towards recovered_total
         }
 
     def handle_job_complete(self, data):
@@ -439,94 +469,59 @@ class WhiskApp(ctk.CTk):
         job_id = data.get("id")
         status = data.get("status")
         images = data.get("images", [])
-        
+
+        if job_id not in self.job_rows and data.get("prompt"):
+            # Recovered from a previous session, so it has no row yet
+            self._add_job_row(job_id, data["prompt"], recovered=True)
+            self.job_list_frame.append(job_id)
+
         if job_id in self.job_rows:
-            ui_elements = self.job_rows[job_id]
-            lbl_status = ui_elements["status_label"]
-            frame_images = ui_elements["images_frame"]
-            loaded_images = ui_elements["loaded_images"]
-            
-            lbl_status.configure(text=status)
-            if status == "COMPLETED":
-                lbl_status.configure(text_color="green")
-                self._check_queue_completion()
-                if ui_elements["retry_btn"]:
-                    ui_elements["retry_btn"].destroy()
-                    ui_elements["retry_btn"] = None
-            elif status == "FAILED":
-                lbl_status.configure(text_color="red")
-                self._check_queue_completion()
-                # Add Retry Button if not exists
-                if not ui_elements["retry_btn"]:
-                    btn_retry = ctk.CTkButton(frame_images, text="Retry", fg_color="red", width=60, height=24,
-                                              command=lambda j=job_id: self.retry_job(j))
-                    btn_retry.pack(side="left", padx=5)
-                    ui_elements["retry_btn"] = btn_retry
-            else:
-                lbl_status.configure(text_color="blue")
-                if ui_elements["retry_btn"]:
-                    ui_elements["retry_btn"].destroy()
-                    ui_elements["retry_btn"] = None
-                
-            # Update images (Append new ones only)
+            row = self.job_rows[job_id]
+            row["status"] = status
+            if status in ("COMPLETED", "FAILED"):
+                self._check_queue_completion(row)
+
             for img_path in images:
-                if img_path not in loaded_images:
-                    if os.path.exists(img_path):
-                        try:
-                            # Create thumbnail
-                            pil_img = Image.open(img_path)
-                            ctk_img = ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=(100, 100))
-                            
-                            btn = ctk.CTkButton(frame_images, text="", image=ctk_img, width=100, height=100,
-                                                fg_color="transparent", hover_color="gray",
-                                                command=lambda p=img_path: open_file(p))
-                            btn.pack(side="left", padx=5, pady=2)
-                            loaded_images.add(img_path)
-                        except Exception as e:
-                            print(f"Error loading thumbnail: {e}")
-                            # Fallback to text button
-                            btn = ctk.CTkButton(frame_images, text="Open", width=50, height=20, 
-                                                command=lambda p=img_path: open_file(p))
-                            btn.pack(side="left", padx=2)
-                            loaded_images.add(img_path)
-                        
-                        # Update Progress
-                        self.images_generated_count += 1
-                        if self.total_images_expected > 0:
-                            progress = self.images_generated_count / self.total_images_expected
-                            self.progress_bar.set(progress)
-                            remaining = self.total_images_expected - self.images_generated_count
-                            
-                            # Calculate ETA
-                            eta_str = ""
-                            if self.start_time and self.images_generated_count > 0:
-                                elapsed = (datetime.datetime.now() - self.start_time).total_seconds()
-                                avg_time = elapsed / self.images_generated_count
-                                remaining_seconds = int(avg_time * remaining)
-                                if remaining_seconds < 60:
-                                    eta_str = f" | ETA: {remaining_seconds}s"
-                                else:
-                                    eta_str = f" | ETA: {remaining_seconds // 60}m {remaining_seconds % 60}s"
-                            
-                            self.stats_label.configure(text=f"Images: {self.images_generated_count}/{self.total_images_expected} | Remaining: {remaining}{eta_str}")
+                if img_path not in row["seen_images"] and os.path.exists(img_path):
+                    row["seen_images"].add(img_path)
+                    row["images"].append(img_path)
+                    self._count_generated_image()
+
+            self.job_list_frame.refresh_row(job_id)
+
+    def _count_generated_image(self):
+        self.images_generated_count += 1
+        if self.total_images_expected > 0:
+            progress = self.images_generated_count / self.total_images_expected
+            self.progress_bar.set(progress)
+            remaining = self.total_images_expected - self.images_generated_count
+
+            # Calculate ETA
+            eta_str = ""
+            if self.start_time and self.images_generated_count > 0:
+                elapsed = (datetime.datetime.now() - self.start_time).total_seconds()
+                avg_time = elapsed / self.images_generated_count
+                remaining_seconds = int(avg_time * remaining)
+                if remaining_seconds < 60:
+                    eta_str = f" | ETA: {remaining_seconds}s"
+                else:
+                    eta_str = f" | ETA: {remaining_seconds // 60}m {remaining_seconds % 60}s"
+
+            self.stats_label.configure(text=f"Images: {self.images_generated_count}/{self.total_images_expected} | Remaining: {remaining}{eta_str}")
 
     def retry_job(self, job_id):
         self.job_manager.retry_job(job_id)
         # Update UI to pending
         if job_id in self.job_rows:
-            ui_elements = self.job_rows[job_id]
-            ui_elements["status_label"].configure(text="PENDING", text_color="orange")
-            if ui_elements["retry_btn"]:
-                ui_elements["retry_btn"].destroy()
-                ui_elements["retry_btn"] = None
+            self.job_rows[job_id]["status"] = "PENDING"
+            self.job_list_frame.refresh_row(job_id)
 
     def retry_all_failed(self):
         count = 0
-        for job_id, ui_elements in self.job_rows.items():
-            status_text = ui_elements["status_label"].cget("text")
-            if status_text == "FAILED":
-                self.retry_job(job_id)
-                count += 1
+        failed = [job_id for job_id, row in self.job_rows.items() if row["status"] == "FAILED"]
+        for job_id in failed:
+            self.retry_job(job_id)
+            count += 1
         
         if count > 0:
             self.update_status(f"Retrying {count} failed jobs...")
@@ -539,22 +534,52 @@ class WhiskApp(ctk.CTk):
         else:
             tk.messagebox.showinfo("WhiskForge", "No failed jobs to retry.")
 
-    def _check_queue_completion(self):
-        self.completed_jobs += 1
-        if self.completed_jobs >= self.total_jobs:
+    def _check_queue_completion(self, row):
+        if row["recovered"]:
+            self.recovered_completed += 1
+        else:
+            self.completed_jobs += 1
+        if self.completed_jobs >= self.total_jobs and self.recovered_completed >= self.recovered_total:
             self.after(500, self.on_queue_finished)
 
     def on_queue_finished(self):
         self.stop_processing()
         tk.messagebox.showinfo("WhiskForge", "Generation Finished!")
 
+    def _when_engine_stopped(self, callback, timeout=None, poll_ms=50):
+        """Runs callback on the Tk thread once the engine thread has exited, or after timeout seconds."""
+        thread = self.job_manager.engine_thread
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def _poll():
+            if thread is not None and thread.is_alive() and (deadline is None or time.monotonic() < deadline):
+                self.after(poll_ms, _poll)
+            else:
+                callback()
+
+        _poll()
+
     def on_closing(self):
-        self.job_manager.stop_processing()
+        if self._closing:
+            return
+        self._closing = True
+        # Aborts requests and lets received images finish writing before the store closes (bounded)
+        self.job_manager.stop_processing(timeout=None)
+        self._when_engine_stopped(self._close_now, timeout=2.0)
+
+    def _close_now(self):
+        self.job_manager.close()
         self.destroy()
 
     def reset_app(self):
-        # Stop any running jobs
-        self.job_manager.stop_processing()
+        # Stop any running jobs; the queue is cleared once the engine has put its interrupted jobs back
+        self.job_manager.stop_processing(timeout=None)
+        self.start_btn.configure(state="disabled")
+        self.stop_btn.configure(state="disabled")
+        self.pause_btn.configure(state="disabled", text="PAUSE", fg_color="orange")
+        self._when_engine_stopped(self._finish_reset)
+
+    def _finish_reset(self):
         self.job_manager.clear_queue()
         
         # Clear UI
@@ -568,23 +593,16 @@ class WhiskApp(ctk.CTk):
         self.stats_label.configure(text="Images: 0/0 | Remaining: 0")
         self.total_jobs = 0
         self.completed_jobs = 0
+        self.recovered_total = 0
+        self.recovered_completed = 0
         self.total_images_expected = 0
         self.images_generated_count = 0
         self.start_time = None
         
         # Clear Job List
-        for job_id, ui_elements in self.job_rows.items():
-            ui_elements["status_label"].destroy()
-            ui_elements["images_frame"].destroy()
-            # Also remove Sr No and Prompt labels if possible, but grid removal is tricky without references.
-            # Simpler approach: destroy the scrollable frame content and recreate.
-            # But we don't have direct references to row labels.
-            # Let's just clear the whole frame content.
-            for widget in self.job_list_frame.winfo_children():
-                widget.destroy()
-        
         self.job_rows = {}
-        
+        self.job_list_frame.clear(self.job_rows)
+
         # Reset Buttons
         self.start_btn.configure(state="normal")
         self.stop_btn.configure(state="disabled")
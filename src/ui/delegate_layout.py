@@ -0,0 +1,130 @@
+from collections import OrderedDict, namedtuple
+
+from PySide6.QtCore import QPoint, QPointF, QRect, QSize, QSizeF, Qt
+from PySide6.QtGui import QPainterPath, QStaticText, QTextOption
+
+# Prompt cell: rounded box inset 4px, text inset 8px leaving room for the pencil
+PROMPT_MARGIN = 4
+PROMPT_PADDING = 8
+PENCIL_SIZE = 16
+PROMPT_MIN_HEIGHT = 72
+
+# Status cell: [badge] [container [retry] [open]]
+BUTTON_SIZE = 36
+BUTTON_SPACING = 8
+CONTAINER_PADDING = 8
+
+# Thumbnail cell: centered image with a delete button in its corner
+THUMB_WIDTH = 220
+THUMB_HEIGHT = 120
+TRASH_SIZE = 20
+
+# Distinct cell sizes kept before the geometry cache starts over (column resizes)
+MAX_GEOMETRIES = 256
+
+PromptGeometry = namedtuple("PromptGeometry", "box_rect text_rect pencil_rect box_path")
+StatusGeometry = namedtuple("StatusGeometry", "badge_rect container_rect retry_rect open_rect container_path")
+ThumbnailGeometry = namedtuple("ThumbnailGeometry", "img_rect trash_rect")
+
+def _prompt_geometry(w, h):
+    box_rect = QRect(0, 0, w, h).adjusted(PROMPT_MARGIN, PROMPT_MARGIN, -PROMPT_MARGIN, -PROMPT_MARGIN)
+    text_rect = box_rect.adjusted(PROMPT_PADDING, PROMPT_PADDING, -(PENCIL_SIZE + PROMPT_PADDING), -PROMPT_PADDING)
+    pencil_rect = QRect(box_rect.right() - 20, box_rect.bottom() - 20, PENCIL_SIZE, PENCIL_SIZE)
+    path = QPainterPath()
+    path.addRoundedRect(box_rect, 6, 6)
+    return PromptGeometry(box_rect, text_rect, pencil_rect, path)
+
+def _status_geometry(w, h):
+    container_w = BUTTON_SIZE * 2 + BUTTON_SPACING + 2 * CONTAINER_PADDING
+    container_h = BUTTON_SIZE + 12
+    container_rect = QRect(w - 1 - container_w - 8, (h - container_h) // 2, container_w, container_h)
+    badge_rect = QRect(0, 0, container_rect.left() - 8, h)
+    retry_rect = QRect(container_rect.left() + CONTAINER_PADDING, container_rect.y() + 6, BUTTON_SIZE, BUTTON_SIZE)
+    open_rect = QRect(retry_rect.right() + BUTTON_SPACING, retry_rect.y(), BUTTON_SIZE, BUTTON_SIZE)
+    path = QPainterPath()
+    path.addRoundedRect(container_rect, 6, 6)
+    return StatusGeometry(badge_rect, container_rect, retry_rect, open_rect, path)
+
+def _thumbnail_geometry(w, h):
+    img_rect = QRect((w - THUMB_WIDTH) // 2, (h - THUMB_HEIGHT) // 2, THUMB_WIDTH, THUMB_HEIGHT)
+    trash_rect = QRect(img_rect.right() - 24, img_rect.bottom() - 24, TRASH_SIZE, TRASH_SIZE)
+    return ThumbnailGeometry(img_rect, trash_rect)
+
+def _translated(geometry, origin: QPoint):
+    if origin.isNull():
+        return geometry
+    return type(geometry)(*(
+        part.translated(origin) if isinstance(part, QRect) else part.translated(QPointF(origin))
+        for part in geometry
+    ))
+
+class DelegateLayout:
+    """
+    Geometry and text layout shared by the queue delegates.
+
+    Rects are computed once per cell size, relative to the cell, and moved to the
+    cell's origin on use, so paint and editorEvent call the same function and hit
+    exactly what was drawn. Wrapped prompt text is kept as QStaticText per (text,
+    width, font) in a bounded LRU; sizeHint reads its height from the same entry.
+    """
+
+    _shared = None
+
+    def __init__(self, max_texts=2048):
+        self._geometry = {}
+        self._texts = OrderedDict()
+        self.max_texts = max_texts
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def _cached(self, kind, build, rect: QRect):
+        key = (kind, rect.width(), rect.height())
+        geometry = self._geometry.get(key)
+        if geometry is None:
+            if len(self._geometry) >= MAX_GEOMETRIES:
+                self._geometry.clear()
+            geometry = self._geometry[key] = build(rect.width(), rect.height())
+        return _translated(geometry, rect.topLeft())
+
+    def prompt(self, rect: QRect) -> PromptGeometry:
+        return self._cached("prompt", _prompt_geometry, rect)
+
+    def status(self, rect: QRect) -> StatusGeometry:
+        return self._cached("status", _status_geometry, rect)
+
+    def thumbnail(self, rect: QRect) -> ThumbnailGeometry:
+        return self._cached("thumbnail", _thumbnail_geometry, rect)
+
+    def text(self, text, width, font) -> QStaticText:
+        """The word-wrapped, pre-laid-out text for width; built on first use."""
+        key = (text, width, font.key())
+        static = self._texts.get(key)
+        if static is not None:
+            self._texts.move_to_end(key)
+            return static
+        static = QStaticText(text)
+        static.setTextFormat(Qt.PlainText)
+        option = QTextOption()
+        option.setWrapMode(QTextOption.WordWrap)
+        static.setTextOption(option)
+        static.setTextWidth(max(1, width))
+        static.prepare(font=font)
+        self._texts[key] = static
+        if len(self._texts) > self.max_texts:
+            self._texts.popitem(last=False)
+        return static
+
+    def prompt_size_hint(self, text, cell_width, font) -> QSize:
+        """Cell size that fits text wrapped at cell_width, never below PROMPT_MIN_HEIGHT."""
+        text_width = _prompt_geometry(cell_width, PROMPT_MIN_HEIGHT).text_rect.width()
+        size: QSizeF = self.text(text or "", text_width, font).size()
+        chrome = 2 * (PROMPT_MARGIN + PROMPT_PADDING)
+        return QSize(cell_width, max(PROMPT_MIN_HEIGHT, int(size.height()) + 1 + chrome))
+
+    def clear(self):
+        self._geometry.clear()
+        self._texts.clear()
@@ -1,61 +1,59 @@
-from PySide6.QtWidgets import QStyledItemDelegate, QStyleOptionViewItem, QApplication
-from PySide6.QtCore import Qt, QRect, QSize, Signal, QPoint
-from PySide6.QtGui import QPainter, QColor, QPen, QBrush, QPixmap, QIcon, QFontMetrics, QPainterPath
+from PySide6.QtWidgets import QStyledItemDelegate, QStyle
+from PySide6.QtCore import Qt, Signal, QPoint
+from PySide6.QtGui import QPainter, QColor, QPen, QIcon, QFont
+
+from .delegate_layout import DelegateLayout
+from .pixmap_cache import ThumbnailPixmapCache
 
 class PromptDelegate(QStyledItemDelegate):
     editRequested = Signal(str)  # job_id
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, layout=None):
         super().__init__(parent)
         self.pencil_icon = QIcon("assets/icons/pencil.svg") # Placeholder path
+        self.layout = layout or DelegateLayout.shared()
 
     def paint(self, painter, option, index):
         painter.save()
         painter.setRenderHint(QPainter.Antialiasing)
 
         # Draw background (handled by table usually, but we want a rounded box inside)
-        # Table background is white/gray. We draw a rounded box.
-        
-        rect = option.rect
-        box_rect = rect.adjusted(4, 4, -4, -4)
-        
+        geometry = self.layout.prompt(option.rect)
+
         # Selection highlight
-        if option.state & QStyleOptionViewItem.State_Selected:
+        if option.state & QStyle.State_Selected:
             painter.setPen(QPen(QColor("#2B8CE6"), 2))
             painter.setBrush(QColor("#FFFFFF"))
         else:
             painter.setPen(QPen(QColor("#DFE6EA"), 1))
             painter.setBrush(QColor("#FFFFFF"))
+        painter.drawPath(geometry.box_path)
 
-        path = QPainterPath()
-        path.addRoundedRect(box_rect, 6, 6)
-        painter.drawPath(path)
-
-        # Draw Text
-        text = index.data(Qt.DisplayRole)
-        # print(f"PromptDelegate painting: {text}")
-        text_rect = box_rect.adjusted(8, 8, -24, -8) # Leave room for pencil
+        # Draw Text: wrapped once per (prompt, width), then just blitted
+        text = index.data(Qt.DisplayRole) or ""
+        text_rect = geometry.text_rect
         painter.setPen(QColor("#111827"))
-        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap, text)
+        painter.setClipRect(text_rect)
+        painter.drawStaticText(text_rect.topLeft(), self.layout.text(text, text_rect.width(), option.font))
+        painter.setClipping(False)
 
         # Draw Pencil Icon
-        pencil_rect = QRect(box_rect.right() - 20, box_rect.bottom() - 20, 16, 16)
         # Just drawing a circle for now if icon missing
         painter.setPen(Qt.NoPen)
         painter.setBrush(QColor("#E5E7EB"))
-        painter.drawEllipse(pencil_rect)
-        # If we had the icon: self.pencil_icon.paint(painter, pencil_rect)
+        painter.drawEllipse(geometry.pencil_rect)
+        # If we had the icon: self.pencil_icon.paint(painter, geometry.pencil_rect)
 
         painter.restore()
 
+    def sizeHint(self, option, index):
+        width = option.rect.width() or super().sizeHint(option, index).width()
+        return self.layout.prompt_size_hint(index.data(Qt.DisplayRole), width, option.font)
+
     def editorEvent(self, event, model, option, index):
         # Handle click on pencil
         if event.type() == event.MouseButtonRelease:
-            rect = option.rect
-            box_rect = rect.adjusted(4, 4, -4, -4)
-            pencil_rect = QRect(box_rect.right() - 20, box_rect.bottom() - 20, 16, 16)
-            
-            if pencil_rect.contains(event.pos()):
+            if self.layout.prompt(option.rect).pencil_rect.contains(event.pos()):
                 job = index.data(Qt.UserRole)
                 if job:
                     self.editRequested.emit(job["job_id"])
@@ -66,6 +64,33 @@ class PromptDelegate(QStyledItemDelegate):
 class ThumbnailDelegate(QStyledItemDelegate):
     deleteRequested = Signal(str) # job_id
 
+    def __init__(self, parent=None, pixmap_cache=None, layout=None):
+        super().__init__(parent)
+        self.pixmap_cache = pixmap_cache or ThumbnailPixmapCache.shared()
+        self.layout = layout or DelegateLayout.shared()
+
+    def attach(self, view, column, prefetch_rows=10):
+        """Repaints view as thumbnails land and decodes rows just outside the viewport ahead of scrolling."""
+        self.pixmap_cache.pixmapReady.connect(lambda path: view.viewport().update())
+        view.verticalScrollBar().valueChanged.connect(lambda value: self.prefetch(view, column, prefetch_rows))
+        self.prefetch(view, column, prefetch_rows)
+
+    def prefetch(self, view, column, rows=10):
+        model = view.model()
+        if model is None or model.rowCount() == 0:
+            return
+        viewport = view.viewport().rect()
+        first = view.indexAt(viewport.topLeft()).row()
+        last = view.indexAt(viewport.bottomLeft()).row()
+        first = max(0, first) if first >= 0 else 0
+        last = last if last >= 0 else model.rowCount() - 1
+        paths = []
+        for row in range(max(0, first - rows), min(model.rowCount(), last + rows + 1)):
+            job = model.index(row, column).data(Qt.UserRole)
+            if job and job.get("thumbnail"):
+                paths.append(job.get("thumbnail"))
+        self.pixmap_cache.prefetch(paths)
+
     def paint(self, painter, option, index):
         painter.save()
         painter.setRenderHint(QPainter.Antialiasing)
@@ -73,29 +98,26 @@ class ThumbnailDelegate(QStyledItemDelegate):
         job = index.data(Qt.UserRole)
         thumb_path = job.get("thumbnail")
         
-        rect = option.rect
         # Center 220x120
-        w, h = 220, 120
-        x = rect.x() + (rect.width() - w) / 2
-        y = rect.y() + (rect.height() - h) / 2
-        img_rect = QRect(int(x), int(y), w, h)
-
-        if thumb_path:
-            pixmap = QPixmap(thumb_path)
-            if not pixmap.isNull():
-                painter.drawPixmap(img_rect, pixmap, pixmap.rect())
-            else:
-                self._draw_placeholder(painter, img_rect)
+        geometry = self.layout.thumbnail(option.rect)
+        img_rect = geometry.img_rect
+
+        # Decoded pixmaps come from memory; a miss paints a placeholder and decodes in the background
+        pixmap = self.pixmap_cache.get(thumb_path)
+        if pixmap is not None:
+            painter.drawPixmap(img_rect, pixmap, pixmap.rect())
+        elif thumb_path and not self.pixmap_cache.is_failed(thumb_path):
+            self._draw_placeholder(painter, img_rect, "Loading…")
         else:
             self._draw_placeholder(painter, img_rect)
 
         # Hover overlay
-        if option.state & QStyleOptionViewItem.State_MouseOver:
+        if option.state & QStyle.State_MouseOver:
             painter.setBrush(QColor(0, 0, 0, 50))
             painter.drawRect(img_rect)
             
             # Trash icon
-            trash_rect = QRect(img_rect.right() - 24, img_rect.bottom() - 24, 20, 20)
+            trash_rect = geometry.trash_rect
             painter.setBrush(QColor("#EF4444"))
             painter.setPen(Qt.NoPen)
             painter.drawEllipse(trash_rect)
@@ -106,23 +128,16 @@ class ThumbnailDelegate(QStyledItemDelegate):
 
         painter.restore()
 
-    def _draw_placeholder(self, painter, rect):
+    def _draw_placeholder(self, painter, rect, text="No Image"):
         painter.setBrush(QColor("#F3F4F6"))
         painter.setPen(QColor("#E5E7EB"))
         painter.drawRect(rect)
         painter.setPen(QColor("#9CA3AF"))
-        painter.drawText(rect, Qt.AlignCenter, "No Image")
+        painter.drawText(rect, Qt.AlignCenter, text)
 
     def editorEvent(self, event, model, option, index):
         if event.type() == event.MouseButtonRelease:
-            rect = option.rect
-            w, h = 220, 120
-            x = rect.x() + (rect.width() - w) / 2
-            y = rect.y() + (rect.height() - h) / 2
-            img_rect = QRect(int(x), int(y), w, h)
-            trash_rect = QRect(img_rect.right() - 24, img_rect.bottom() - 24, 20, 20)
-            
-            if trash_rect.contains(event.pos()):
+            if self.layout.thumbnail(option.rect).trash_rect.contains(event.pos()):
                 job = index.data(Qt.UserRole)
                 if job:
                     self.deleteRequested.emit(job["job_id"])
@@ -134,6 +149,22 @@ class StatusDelegate(QStyledItemDelegate):
     retryRequested = Signal(str)
     openRequested = Signal(str)
 
+    STATUS_COLORS = {"COMPLETED": "#16A34A", "FAILED": "#EF4444", "RUNNING": "#2B8CE6"}
+
+    def __init__(self, parent=None, layout=None):
+        super().__init__(parent)
+        self.layout = layout or DelegateLayout.shared()
+        self._badge_fonts = {}
+
+    def _badge_font(self, font):
+        # SemiBold copy of the cell font, made once instead of on every paint
+        key = font.key()
+        badge_font = self._badge_fonts.get(key)
+        if badge_font is None:
+            badge_font = self._badge_fonts[key] = QFont(font)
+            badge_font.setWeight(QFont.DemiBold)
+        return badge_font
+
     def paint(self, painter, option, index):
         painter.save()
         painter.setRenderHint(QPainter.Antialiasing)
@@ -141,77 +172,46 @@ class StatusDelegate(QStyledItemDelegate):
         job = index.data(Qt.UserRole)
         status = job.get("status", "QUEUED")
         
-        rect = option.rect
         # Layout: [Badge] [Container [Retry] [Open]]
-        
-        # Container for buttons
-        btn_size = 36
-        spacing = 8
-        container_w = btn_size * 2 + spacing + 16 # padding
-        container_h = btn_size + 12
-        
-        container_rect = QRect(rect.right() - container_w - 8, rect.y() + (rect.height() - container_h) / 2, container_w, container_h)
-        
-        # Draw Badge (Left of container)
-        badge_rect = QRect(rect.x(), rect.y(), container_rect.left() - rect.x() - 8, rect.height())
+        geometry = self.layout.status(option.rect)
         
         # Badge Text
-        status_color = "#16A34A" if status == "COMPLETED" else "#6B7280"
-        if status == "FAILED": status_color = "#EF4444"
-        if status == "RUNNING": status_color = "#2B8CE6"
-        
-        painter.setPen(QColor(status_color))
-        font = painter.font()
-        font.setWeight(600) # SemiBold
-        painter.setFont(font)
-        painter.drawText(badge_rect, Qt.AlignRight | Qt.AlignVCenter, status.title())
+        painter.setPen(QColor(self.STATUS_COLORS.get(status, "#6B7280")))
+        painter.setFont(self._badge_font(option.font))
+        painter.drawText(geometry.badge_rect, Qt.AlignRight | Qt.AlignVCenter, status.title())
 
         # Draw Button Container
         painter.setPen(QColor("#DFE6EA"))
         painter.setBrush(QColor("#FFFFFF"))
-        path = QPainterPath()
-        path.addRoundedRect(container_rect, 6, 6)
-        painter.drawPath(path)
-        
-        # Buttons
-        retry_rect = QRect(container_rect.left() + 8, container_rect.y() + 6, btn_size, btn_size)
-        open_rect = QRect(retry_rect.right() + spacing, retry_rect.y(), btn_size, btn_size)
+        painter.drawPath(geometry.container_path)
         
         # Retry Button (Orange)
         painter.setPen(Qt.NoPen)
         painter.setBrush(QColor("#F59E0B"))
-        painter.drawRoundedRect(retry_rect, 6, 6)
+        painter.drawRoundedRect(geometry.retry_rect, 6, 6)
         # Icon placeholder (Loop)
         painter.setPen(Qt.white)
-        painter.drawText(retry_rect, Qt.AlignCenter, "R")
+        painter.drawText(geometry.retry_rect, Qt.AlignCenter, "R")
         
         # Open Button (Blue)
         painter.setBrush(QColor("#2B8CE6"))
-        painter.drawRoundedRect(open_rect, 6, 6)
+        painter.drawRoundedRect(geometry.open_rect, 6, 6)
         # Icon placeholder (Folder)
-        painter.drawText(open_rect, Qt.AlignCenter, "O")
+        painter.drawText(geometry.open_rect, Qt.AlignCenter, "O")
 
         painter.restore()
 
     def editorEvent(self, event, model, option, index):
         if event.type() == event.MouseButtonRelease:
-            rect = option.rect
-            btn_size = 36
-            spacing = 8
-            container_w = btn_size * 2 + spacing + 16
-            container_h = btn_size + 12
-            container_rect = QRect(rect.right() - container_w - 8, rect.y() + (rect.height() - container_h) / 2, container_w, container_h)
-            
-            retry_rect = QRect(container_rect.left() + 8, container_rect.y() + 6, btn_size, btn_size)
-            open_rect = QRect(retry_rect.right() + spacing, retry_rect.y(), btn_size, btn_size)
+            geometry = self.layout.status(option.rect)
             
             job = index.data(Qt.UserRole)
             if not job: return False
 
-            if retry_rect.contains(event.pos()):
+            if geometry.retry_rect.contains(event.pos()):
                 self.retryRequested.emit(job["job_id"])
                 return True
-            elif open_rect.contains(event.pos()):
+            elif geometry.open_rect.contains(event.pos()):
                 self.openRequested.emit(job["job_id"])
                 return True
                 
@@ -1,6 +1,95 @@
-from PySide6.QtCore import QAbstractTableModel, Qt, Signal, QModelIndex
+import sys
+import zlib
+from PySide6.QtCore import QAbstractTableModel, Qt, Signal, QModelIndex, QTimer
+
+class JobRecord:
+    """
+    Compact row of the job model. Fixed fields live in __slots__ (no per-row dict or
+    repeated key strings), status strings are interned, and prompts longer than
+    COMPRESS_PROMPT_CHARS are kept zlib-compressed and only inflated when read.
+    Anything else goes to a small `extra` dict created on first use.
+
+    Behaves like the dicts it replaces for the delegates: job["job_id"], job.get("status").
+    """
+    __slots__ = ("job_id", "prompt_index", "status", "thumbnail", "_prompt", "_preview", "extra")
+
+    COMPRESS_PROMPT_CHARS = 512
+    PREVIEW_CHARS = 200
+    _FIELDS = ("job_id", "prompt_index", "status", "thumbnail", "prompt")
+
+    def __init__(self, job_id, prompt="", prompt_index=None, status="QUEUED", thumbnail=None, **extra):
+        self.job_id = job_id
+        self.prompt_index = prompt_index
+        self.status = sys.intern(status) if isinstance(status, str) else status
+        self.thumbnail = thumbnail
+        self.extra = extra or None
+        self.prompt = prompt
+
+    @classmethod
+    def from_dict(cls, job):
+        return job if isinstance(job, cls) else cls(**job)
+
+    @property
+    def prompt(self) -> str:
+        value = self._prompt
+        return zlib.decompress(value).decode("utf-8") if isinstance(value, bytes) else value
+
+    @prompt.setter
+    def prompt(self, text):
+        text = text or ""
+        if len(text) > self.COMPRESS_PROMPT_CHARS:
+            self._prompt = zlib.compress(text.encode("utf-8"))
+            self._preview = text[:self.PREVIEW_CHARS] + "\u2026"
+        else:
+            self._prompt = text
+            self._preview = None
+
+    @property
+    def prompt_preview(self) -> str:
+        """Enough of the prompt to paint a row, without inflating a long one."""
+        return self._preview if self._preview is not None else self._prompt
+
+    def get(self, key, default=None):
+        if key in self._FIELDS:
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key):
+        if key in self._FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "status" and isinstance(value, str):
+            value = sys.intern(value)
+        if key in self._FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return (key in self._FIELDS and getattr(self, key) is not None) or bool(self.extra and key in self.extra)
+
+    def update(self, fields=(), **kwargs):
+        for key, value in dict(fields, **kwargs).items():
+            self[key] = value
 
 class JobModel(QAbstractTableModel):
+    """
+    Table model for the job queue.
+
+    Rows are found by job id through an id -> row index; after a removal the rows below
+    it are re-indexed lazily, on the next lookup that needs them. update_job changes the
+    data at once but only marks the row dirty, together with the columns its fields
+    show in: dirty rows are flushed once per frame (COALESCE_MS) as one dataChanged per
+    contiguous range of rows with the same columns, however many updates arrived.
+    Rows are stored as JobRecord; Qt.UserRole returns the record.
+    """
     # Columns
     COL_INDEX = 0
     COL_PROMPT = 1
@@ -9,11 +98,25 @@ class JobModel(QAbstractTableModel):
     
     COL_COUNT = 4
 
+    # Column each record field is painted in; other fields repaint the whole row
+    FIELD_COLUMNS = {"prompt_index": COL_INDEX, "prompt": COL_PROMPT, "thumbnail": COL_THUMBNAIL, "status": COL_STATUS}
+
+    # One frame at 60fps
+    COALESCE_MS = 16
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.jobs = []  # List of dicts
+        self.jobs = []  # List of JobRecord
         self.headers = ["#", "Prompt", "Image 1", "Status"]
 
+        self._row_of = {}           # job_id -> row; entries at rows >= _stale_from may be off
+        self._stale_from = 0
+        self._dirty_rows = {}        # row -> (first, last) column changed since the last flush
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(self.COALESCE_MS)
+        self._flush_timer.timeout.connect(self.flush_updates)
+
     def rowCount(self, parent=QModelIndex()):
         return len(self.jobs)
 
@@ -29,9 +132,9 @@ class JobModel(QAbstractTableModel):
 
         if role == Qt.DisplayRole:
             if col == self.COL_INDEX:
-                return str(job.get("prompt_index", ""))
+                return "" if job.prompt_index is None else str(job.prompt_index)
             elif col == self.COL_PROMPT:
-                return job.get("prompt", "")
+                return job.prompt_preview
             # Thumbnail and Status handled by delegates or custom roles if needed
             return None
         
@@ -52,34 +155,86 @@ class JobModel(QAbstractTableModel):
         if not new_jobs:
             return
         
+        new_jobs = [JobRecord.from_dict(job) for job in new_jobs]
         start_row = len(self.jobs)
         end_row = start_row + len(new_jobs) - 1
         
         self.beginInsertRows(QModelIndex(), start_row, end_row)
         self.jobs.extend(new_jobs)
+        if self._stale_from == start_row:
+            for row, job in enumerate(new_jobs, start_row):
+                self._row_of[job.job_id] = row
+            self._stale_from = len(self.jobs)
         self.endInsertRows()
 
     # Alias for compatibility if needed, but we should switch to add_jobs_batch
     def append_jobs(self, new_jobs):
         self.add_jobs_batch(new_jobs)
 
+    def row_of(self, job_id):
+        """Row of the job, or None if it is not in the model."""
+        row = self._row_of.get(job_id)
+        if row is not None and row < self._stale_from:
+            return row
+        if self._stale_from < len(self.jobs):
+            # Catch up on the rows shifted by earlier removals
+            for r in range(self._stale_from, len(self.jobs)):
+                self._row_of[self.jobs[r].job_id] = r
+            self._stale_from = len(self.jobs)
+        return self._row_of.get(job_id)
+
     def update_job(self, job_id, **fields):
-        for row, job in enumerate(self.jobs):
-            if job["job_id"] == job_id:
-                job.update(fields)
-                # Emit change for the whole row
-                self.dataChanged.emit(self.index(row, 0), self.index(row, self.COL_COUNT - 1))
-                return
+        row = self.row_of(job_id)
+        if row is None:
+            return
+        self.jobs[row].update(fields)
+        first, last = self._columns_of(fields)
+        pending = self._dirty_rows.get(row)
+        if pending is not None:
+            first, last = min(first, pending[0]), max(last, pending[1])
+        self._dirty_rows[row] = (first, last)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _columns_of(self, fields):
+        columns = [self.FIELD_COLUMNS.get(key) for key in fields]
+        if not columns or None in columns:
+            return 0, self.COL_COUNT - 1
+        return min(columns), max(columns)
+
+    def flush_updates(self):
+        """
+        Emits dataChanged for every row updated since the last flush: one signal per run
+        of contiguous rows that changed in the same columns, spanning only those columns.
+        """
+        self._flush_timer.stop()
+        if not self._dirty_rows:
+            return
+        dirty, self._dirty_rows = self._dirty_rows, {}
+        rows = sorted(dirty)
+        start = prev = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == prev + 1 and dirty[row] == dirty[start]:
+                prev = row
+                continue
+            first, last = dirty[start]
+            self.dataChanged.emit(self.index(start, first), self.index(prev, last))
+            if row is not None:
+                start = prev = row
 
     def remove_job(self, job_id):
-        for row, job in enumerate(self.jobs):
-            if job["job_id"] == job_id:
-                self.beginRemoveRows(QModelIndex(), row, row)
-                self.jobs.pop(row)
-                self.endRemoveRows()
-                # Re-index subsequent rows if needed, but user spec says "index" is part of job data
-                # If we need to re-number visually, we might do it here.
-                return
+        row = self.row_of(job_id)
+        if row is None:
+            return
+        # Pending updates refer to current row numbers
+        self.flush_updates()
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.jobs.pop(row)
+        del self._row_of[job_id]
+        self._stale_from = min(self._stale_from, row)
+        self.endRemoveRows()
+        # Re-index subsequent rows if needed, but user spec says "index" is part of job data
+        # If we need to re-number visually, we might do it here.
 
     def get_job(self, row):
         if 0 <= row < len(self.jobs):
@@ -89,4 +244,8 @@ class JobModel(QAbstractTableModel):
     def clear(self):
         self.beginResetModel()
         self.jobs = []
+        self._row_of = {}
+        self._stale_from = 0
+        self._dirty_rows.clear()
+        self._flush_timer.stop()
         self.endResetModel()
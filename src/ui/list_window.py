@@ -0,0 +1,7 @@
+def visible_window(offset: int, viewport_height: int, row_height: int, total: int):
+    """(first row, number of rows, pixel shift of the first row) for a scroll offset."""
+    if total <= 0 or viewport_height <= 0:
+        return 0, 0, 0
+    first = max(0, min(offset // row_height, total - 1))
+    count = min(total - first, viewport_height // row_height + 2)
+    return first, count, offset - first * row_height
@@ -0,0 +1,103 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+from PySide6.QtGui import QImage, QPixmap, QPixmapCache
+
+class _DecodeSignals(QObject):
+    decoded = Signal(str, str, QImage)  # cache key, path, image (null on failure)
+
+class _DecodeTask(QRunnable):
+    def __init__(self, key, path, signals):
+        super().__init__()
+        self.key = key
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        # QImage is safe off the GUI thread; the QPixmap is made on arrival
+        self.signals.decoded.emit(self.key, self.path, QImage(self.path))
+
+class ThumbnailPixmapCache(QObject):
+    """
+    Decoded thumbnails shared by every delegate, held in QPixmapCache.
+
+    Entries are keyed by thumbnail path and a version that `invalidate` bumps, and
+    QPixmapCache evicts the least recently used ones beyond `limit_kb`. A miss returns
+    None at once and queues a decode on a thread pool; `pixmapReady` fires when it
+    lands so views can repaint. Paints of cached thumbnails never touch the disk.
+    GUI thread only.
+    """
+
+    pixmapReady = Signal(str)  # thumbnail path
+
+    _shared = None
+
+    def __init__(self, limit_kb=64 * 1024, max_threads=2, parent=None):
+        super().__init__(parent)
+        QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), limit_kb))
+        self._versions = {}
+        self._pending = set()
+        self._failed = set()
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        self._signals = _DecodeSignals()
+        self._signals.decoded.connect(self._on_decoded)
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def key(self, path):
+        return f"whisk-thumb:{self._versions.get(path, 0)}:{path}"
+
+    def get(self, path):
+        """The pixmap for path if decoded, else None (and a decode is queued)."""
+        if not path:
+            return None
+        key = self.key(path)
+        pixmap = QPixmapCache.find(key)
+        if pixmap is not None and not pixmap.isNull():
+            return pixmap
+        self.request(path)
+        return None
+
+    def is_failed(self, path):
+        return self.key(path) in self._failed
+
+    def request(self, path):
+        """Queues a decode of path unless it is cached, pending or known to be unreadable."""
+        if not path:
+            return
+        key = self.key(path)
+        if key in self._pending or key in self._failed:
+            return
+        pixmap = QPixmapCache.find(key)
+        if pixmap is not None and not pixmap.isNull():
+            return
+        self._pending.add(key)
+        self._pool.start(_DecodeTask(key, path, self._signals))
+
+    def prefetch(self, paths):
+        for path in paths:
+            self.request(path)
+
+    def invalidate(self, path):
+        """Forgets path's pixmap, e.g. after its thumbnail was regenerated."""
+        old = self.key(path)
+        QPixmapCache.remove(old)
+        self._failed.discard(old)
+        self._versions[path] = self._versions.get(path, 0) + 1
+
+    def wait(self, msecs=-1):
+        return self._pool.waitForDone(msecs)
+
+    @Slot(str, str, QImage)
+    def _on_decoded(self, key, path, image):
+        self._pending.discard(key)
+        if key != self.key(path):
+            return  # invalidated while decoding
+        if image.isNull():
+            self._failed.add(key)
+        else:
+            QPixmapCache.insert(key, QPixmap.fromImage(image))
+        self.pixmapReady.emit(path)
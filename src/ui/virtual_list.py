@@ -0,0 +1,266 @@
+import math
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import customtkinter as ctk
+
+from ..services.thumbnail_service import ThumbnailService
+from .list_window import visible_window
+
+WHEEL_SEQUENCES = ("<MouseWheel>", "<Button-4>", "<Button-5>")
+
+STATUS_COLORS = {"COMPLETED": "green", "FAILED": "red", "PENDING": "orange", "INTERRUPTED": "orange"}
+
+class _JobRowView:
+    """One recycled row of widgets; bind() points it at a different job."""
+
+    MAX_THUMBS = 4
+    PROMPT_CHARS = 300
+
+    def __init__(self, owner: "VirtualJobList"):
+        self.owner = owner
+        self.job_id = None
+        self.frame = ctk.CTkFrame(owner.body, fg_color="transparent", corner_radius=0)
+        self.frame.grid_columnconfigure(0, weight=1)
+        self.frame.grid_columnconfigure(1, weight=6)
+        self.frame.grid_columnconfigure(2, weight=2)
+        self.frame.grid_columnconfigure(3, weight=4)
+
+        self.lbl_sr = ctk.CTkLabel(self.frame, text="", width=30)
+        self.lbl_sr.grid(row=0, column=0, padx=5, pady=5)
+        self.lbl_prompt = ctk.CTkLabel(self.frame, text="", anchor="w", justify="left", wraplength=400)
+        self.lbl_prompt.grid(row=0, column=1, padx=10, pady=5, sticky="ew")
+        self.lbl_status = ctk.CTkLabel(self.frame, text="")
+        self.lbl_status.grid(row=0, column=2, padx=10, pady=5)
+
+        self.images_frame = ctk.CTkFrame(self.frame, fg_color="transparent")
+        self.images_frame.grid(row=0, column=3, padx=10, pady=5, sticky="ew")
+        self.thumbs = [ctk.CTkButton(self.images_frame, text="", width=owner.thumb_size, height=owner.thumb_size,
+                                     fg_color="transparent", hover_color="gray")
+                       for _ in range(self.MAX_THUMBS)]
+        self.retry_btn = ctk.CTkButton(self.images_frame, text="Retry", fg_color="red", width=60, height=24,
+                                       command=self._retry)
+        self._shown: List[str] = []
+
+    def bind(self, job_id, data: Dict):
+        self.job_id = job_id
+        prompt = data.get("prompt", "")
+        if len(prompt) > self.PROMPT_CHARS:
+            prompt = prompt[:self.PROMPT_CHARS] + "…"
+        status = data.get("status", "PENDING")
+        self.lbl_sr.configure(text=str(data.get("sr", "")))
+        self.lbl_prompt.configure(text=prompt)
+        self.lbl_status.configure(text=status, text_color=STATUS_COLORS.get(status, "blue"))
+
+        images = [p for p in data.get("images", []) if p][:self.MAX_THUMBS]
+        failed = status == "FAILED"
+        if images == self._shown and failed == self.retry_btn.winfo_ismapped():
+            return
+        for btn in self.thumbs:
+            btn.pack_forget()
+        self.retry_btn.pack_forget()
+        for btn, path in zip(self.thumbs, images):
+            image = self.owner.thumbnail(path)
+            if image is not None:
+                btn.configure(image=image, text="", command=lambda p=path: self.owner.open_image(p))
+            else:
+                # Placeholder until the decoded thumbnail arrives (or "Open" if it cannot be decoded)
+                text = "Open" if path in self.owner._broken else "…"
+                btn.configure(image=None, text=text, command=lambda p=path: self.owner.open_image(p))
+            btn.pack(side="left", padx=5, pady=2)
+        if failed:
+            self.retry_btn.pack(side="left", padx=5)
+        self._shown = images
+
+    def _retry(self):
+        if self.job_id is not None and self.owner.on_retry:
+            self.owner.on_retry(self.job_id)
+
+class VirtualJobList(ctk.CTkFrame):
+    """
+    Scrollable job list that only creates widgets for the rows on screen.
+
+    Rows have a fixed height; a pool of row views just large enough to cover the
+    viewport is positioned with place() and re-bound to whichever jobs the scroll
+    offset makes visible, so the number of widgets does not grow with the queue.
+    The data source is the app's `job_rows` dict (job_id -> row data: sr, prompt,
+    status, images); call append() for new jobs and refresh_row() after changes.
+    """
+
+    def __init__(self, master, source: Dict, row_height: int = 120, thumb_size: int = 100,
+                 thumb_cache_size: int = 256, **kwargs):
+        super().__init__(master, **kwargs)
+        self.source = source
+        self.row_height = row_height
+        self.thumb_size = thumb_size
+        self.on_retry: Optional[Callable] = None
+        self.on_open: Optional[Callable[[str], None]] = None
+
+        self._ids: List = []
+        self._index: Dict = {}
+        self._offset = 0
+        self._views: List[_JobRowView] = []
+        self._thumbs: "OrderedDict[str, ctk.CTkImage]" = OrderedDict()
+        self._thumb_cache_size = thumb_cache_size
+        self._broken = set()
+        self.thumbnails = ThumbnailService(self, size=(thumb_size, thumb_size), max_cached=thumb_cache_size)
+        self._refresh_pending = False
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self.body = ctk.CTkFrame(self, fg_color="transparent", corner_radius=0)
+        self.body.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.body.bind("<Configure>", lambda e: self.refresh())
+        # Wheel events go to the widget under the pointer (often a row label), so listen
+        # application-wide and keep only the ones that land inside this list
+        self._wheel_bindings = {sequence: self.bind_all(sequence, self._on_wheel, add="+")
+                                for sequence in WHEEL_SEQUENCES}
+
+    # --- Data ---
+
+    def append(self, job_id):
+        if job_id in self._index:
+            return
+        self._index[job_id] = len(self._ids)
+        self._ids.append(job_id)
+        self._schedule_refresh()
+
+    def extend(self, job_ids):
+        for job_id in job_ids:
+            if job_id not in self._index:
+                self._index[job_id] = len(self._ids)
+                self._ids.append(job_id)
+        self._schedule_refresh()
+
+    def clear(self, source: Optional[Dict] = None):
+        if source is not None:
+            self.source = source
+        self._ids, self._index = [], {}
+        self._offset = 0
+        self._thumbs.clear()
+        self._broken.clear()
+        self.thumbnails.forget()
+        self.refresh()
+
+    def refresh_row(self, job_id):
+        """Re-binds the job's row if it is on screen; off-screen rows pick up changes when scrolled to."""
+        for view in self._views:
+            if view.job_id == job_id and view.frame.winfo_ismapped():
+                view.bind(job_id, self.source.get(job_id, {}))
+                return
+
+    def __len__(self):
+        return len(self._ids)
+
+    # --- Thumbnails ---
+
+    def thumbnail(self, path: str) -> Optional[ctk.CTkImage]:
+        """
+        The CTkImage for path if its thumbnail is ready; otherwise asks the thumbnail
+        service for it and returns None. Rows showing path are re-bound on arrival.
+        """
+        image = self._thumbs.get(path)
+        if image is not None:
+            self._thumbs.move_to_end(path)
+            return image
+        if path not in self._broken:
+            # Answered synchronously when the service still holds the thumbnail
+            self.thumbnails.request(path, self._on_thumbnail)
+        return self._thumbs.get(path)
+
+    def _on_thumbnail(self, path: str, pil_img):
+        if pil_img is None:
+            self._broken.add(path)
+        else:
+            # Wraps the already-small image, so the button never holds a full-size decode
+            self._thumbs[path] = ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=pil_img.size)
+            if len(self._thumbs) > self._thumb_cache_size:
+                self._thumbs.popitem(last=False)
+        for view in self._views:
+            if view.job_id is not None and path in view._shown:
+                view._shown = []
+                view.bind(view.job_id, self.source.get(view.job_id, {}))
+
+    def destroy(self):
+        self._unbind_wheel()
+        self.thumbnails.close()
+        super().destroy()
+
+    def open_image(self, path: str):
+        if self.on_open:
+            self.on_open(path)
+
+    # --- Layout ---
+
+    def _schedule_refresh(self):
+        # Many appends in one event-loop turn cost one layout pass
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self.refresh)
+
+    def refresh(self):
+        self._refresh_pending = False
+        height = max(1, self.body.winfo_height())
+        content = len(self._ids) * self.row_height
+        self._offset = max(0, min(self._offset, content - height))
+
+        first, count, shift = visible_window(self._offset, height, self.row_height, len(self._ids))
+        while len(self._views) < count:
+            self._views.append(_JobRowView(self))
+
+        for i, view in enumerate(self._views):
+            if i < count:
+                job_id = self._ids[first + i]
+                view.bind(job_id, self.source.get(job_id, {}))
+                view.frame.place(x=0, y=i * self.row_height - shift, relwidth=1, height=self.row_height)
+            else:
+                view.job_id = None
+                view.frame.place_forget()
+
+        if content <= height:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self._offset / content, (self._offset + height) / content)
+
+    def scroll_to(self, offset: int):
+        self._offset = max(0, int(offset))
+        self.refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        content = len(self._ids) * self.row_height
+        height = max(1, self.body.winfo_height())
+        if action == "moveto":
+            self.scroll_to(float(value) * content)
+        elif action == "scroll":
+            step = height if unit == "pages" else self.row_height
+            self.scroll_to(self._offset + int(value) * step)
+
+    def _unbind_wheel(self):
+        # unbind_all would drop other widgets' wheel handlers too; remove only this list's script
+        for sequence, funcid in self._wheel_bindings.items():
+            script = self.tk.call("bind", "all", sequence)
+            kept = "\n".join(line for line in script.split("\n") if funcid not in line)
+            self.tk.call("bind", "all", sequence, kept)
+            self.deletecommand(funcid)
+        self._wheel_bindings = {}
+
+    def _is_inside(self, widget) -> bool:
+        # Tk path names nest: a descendant's name starts with ours followed by "."
+        name, own = str(widget), str(self)
+        return name == own or name.startswith(own + ".")
+
+    def _on_wheel(self, event):
+        if not self._is_inside(event.widget):
+            return
+        if event.num == 4:
+            self.scroll_to(self._offset - self.row_height)
+            return
+        if event.num == 5:
+            self.scroll_to(self._offset + self.row_height)
+            return
+        # Windows reports multiples of 120, macOS small deltas
+        steps = -event.delta / 120 if abs(event.delta) >= 120 else -event.delta
+        self.scroll_to(self._offset + int(math.copysign(max(1, abs(steps)), steps)) * self.row_height // 2)
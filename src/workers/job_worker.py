@@ -1,10 +1,10 @@
 from PySide6.QtCore import QRunnable, Signal, QObject
 import time
 import os
-import base64
 from ..models.job import Job
 from ..services.whisk_api import WhiskAPI
 from ..utils.logger import logger
+from ..core.image_stream import write_base64_file
 
 class JobWorkerSignals(QObject):
     started = Signal(str)
@@ -44,7 +44,8 @@ class JobWorker(QRunnable):
                     for panel in response["imagePanels"]:
                         for img in panel.get("generatedImages", []):
                             encoded = img.get("encodedImage")
-                            if encoded:
+                            # Don't start new writes once cancelled; writes are atomic, so nothing is left half-done
+                            if encoded and not self.is_cancelled:
                                 # Naming logic
                                 if self.job.count == 1:
                                     filename = f"image_{self.job.prompt_index}.jpg"
@@ -71,15 +72,8 @@ class JobWorker(QRunnable):
             self.signals.failed.emit(self.job.id, str(e))
 
     def _save_image(self, encoded: str, path: str):
-        if ',' in encoded:
-            encoded = encoded.split(',', 1)[1]
-        data = base64.b64decode(encoded)
-        
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        
-        with open(path, "wb") as f:
-            f.write(data)
+        # Decodes in blocks into a temp file that is renamed into place
+        written = write_base64_file(encoded, path)
             
         # Verify
         if not os.path.exists(path):
@@ -87,7 +81,7 @@ class JobWorker(QRunnable):
         if os.path.getsize(path) == 0:
             raise Exception(f"File is empty: {path}")
             
-        logger.debug(f"Wrote {len(data)} bytes to {path}")
+        logger.debug(f"Wrote {written} bytes to {path}")
 
     def cancel(self):
         self.is_cancelled = True
@@ -1,53 +1,55 @@
-from PySide6.QtCore import QRunnable, Signal, QObject, Slot
-from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtCore import QRunnable, Signal, QObject, QSize, Qt
+from PySide6.QtGui import QImageReader
 import os
 
+from ..services.thumbnail_cache import ThumbnailCache
+
+THUMB_WIDTH = 220
+THUMB_HEIGHT = 120
+
+def render_thumbnail(image_path, dest_path, width=THUMB_WIDTH, height=THUMB_HEIGHT):
+    """Writes a thumbnail of image_path fitting width x height (keeping aspect) to dest_path."""
+    reader = QImageReader(image_path)
+    source_size = reader.size()
+    if source_size.isValid():
+        # Lets the JPEG decoder scale while decoding instead of producing the full image first
+        reader.setScaledSize(source_size.scaled(QSize(width, height), Qt.KeepAspectRatio))
+    img = reader.read()
+    if img.isNull():
+        raise Exception(f"Failed to load image: {reader.errorString()}")
+    if img.width() > width or img.height() > height:
+        img = img.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    if not img.save(dest_path, "WEBP"):
+        raise Exception("Failed to save thumbnail")
+
 class ThumbnailWorkerSignals(QObject):
     thumbnail_ready = Signal(str, str) # job_id, path
     error = Signal(str, str)
 
-class ThumbnailWorker(QRunnable):
-    def __init__(self, job_id, image_path, cache_dir):
+class ThumbnailBatchWorker(QRunnable):
+    """Produces thumbnails for many (job_id, image_path) pairs in one pool task."""
+
+    def __init__(self, items, cache_dir):
         super().__init__()
-        self.job_id = job_id
-        self.image_path = image_path
-        self.cache_dir = cache_dir
+        self.items = list(items)
+        self.cache = ThumbnailCache.for_dir(cache_dir)
         self.signals = ThumbnailWorkerSignals()
 
     def run(self):
-        try:
-            if not os.path.exists(self.image_path):
-                return
-
-            # Ensure cache dir exists
-            if not os.path.exists(self.cache_dir):
-                os.makedirs(self.cache_dir)
-
-            # Generate cache filename
-            # We use modification time or size to invalidate if needed, but simple name is fine for now
-            base_name = os.path.basename(self.image_path)
-            cache_name = f"thumb_{base_name}.webp"
-            cache_path = os.path.join(self.cache_dir, cache_name)
-
-            if os.path.exists(cache_path):
-                self.signals.thumbnail_ready.emit(self.job_id, cache_path)
-                return
-
-            # Load and scale
-            img = QImage(self.image_path)
-            if img.isNull():
-                raise Exception("Failed to load image")
-
-            # Scale to 220x120 (keeping aspect ratio or crop? Spec says "Center a thumbnail image (size ~200x120)")
-            # We'll scale to cover and crop or just fit. Let's fit for now to avoid cropping important details.
-            # Or better, scale to height 120, then crop width if too wide, or pad.
-            # Let's just scale to fixed height 120 and let width be whatever, but delegate draws it centered.
-            # Actually spec says "Center a thumbnail image (size ~200x120) inside cell".
-            
-            scaled = img.scaled(220, 120, aspectMode=1) # KeepAspect
-            scaled.save(cache_path, "WEBP")
-            
-            self.signals.thumbnail_ready.emit(self.job_id, cache_path)
-
-        except Exception as e:
-            self.signals.error.emit(self.job_id, str(e))
+        for job_id, image_path in self.items:
+            try:
+                if not os.path.exists(image_path):
+                    continue
+                # Keyed by path, mtime and size, so a rewritten image_N.jpg is never served a stale thumbnail
+                cache_path = self.cache.get_or_create(image_path, lambda dest: render_thumbnail(image_path, dest))
+                if cache_path:
+                    self.signals.thumbnail_ready.emit(job_id, cache_path)
+            except Exception as e:
+                self.signals.error.emit(job_id, str(e))
+
+class ThumbnailWorker(ThumbnailBatchWorker):
+    def __init__(self, job_id, image_path, cache_dir):
+        super().__init__([(job_id, image_path)], cache_dir)
+        self.job_id = job_id
+        self.image_path = image_path
+        self.cache_dir = cache_dir
@@ -0,0 +1,130 @@
+import asyncio
+import base64
+import threading
+import time
+import unittest
+
+import httpx
+
+from src.core.api_client import WhiskClient
+from src.core.rate_limit import GENERATE, RateLimiter
+from src.core.utils import parse_expiry
+
+class FakeWhisk:
+    """Mock transport: generation accepts only the latest token; the session endpoint issues a new one."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.valid_token = "fresh"
+        self.session_calls = 0
+        self.auth_seen = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/auth/session"):
+            with self.lock:
+                self.session_calls += 1
+            time.sleep(0.05)
+            return httpx.Response(200, json={"access_token": self.valid_token, "expires": "2099-01-01T00:00:00Z"})
+        auth = request.headers.get("Authorization")
+        with self.lock:
+            self.auth_seen.append(auth)
+        if auth != f"Bearer {self.valid_token}":
+            return httpx.Response(401, json={"error": "expired"})
+        encoded = base64.b64encode(b"img").decode()
+        return httpx.Response(200, json={"imagePanels": [{"generatedImages": [{"encodedImage": encoded}]}]})
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+class TestTokenRefresh(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeWhisk()
+        self.api = WhiskClient("stale", http2=False)
+        self.api.client = httpx.Client(transport=httpx.MockTransport(self.server.handler))
+
+    def tearDown(self):
+        self.api.close()
+
+    def test_sync_401_refreshes_once_and_retries(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.api.generate_image("p"))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual(self.server.session_calls, 1)
+        self.assertEqual(self.api.token, "fresh")
+        self.assertIsNotNone(self.api.expires_at)
+
+    def test_async_401_refreshes_once_and_retries(self):
+        async def run():
+            self.api._async_client = httpx.AsyncClient(transport=httpx.MockTransport(self.server.handler))
+            self.api._async_loop = asyncio.get_running_loop()
+            try:
+                return await asyncio.gather(*(self.api.generate_image_body("p", _collect) for _ in range(5)))
+            finally:
+                await self.api.aclose()
+
+        bodies = asyncio.run(run())
+        self.assertEqual(len(bodies), 5)
+        self.assertIn(b"imagePanels", b"".join(bodies[0]))
+        self.assertEqual(self.server.session_calls, 1)
+
+    def test_resend_after_401_takes_a_rate_token(self):
+        self.api.rate_limiter = RateLimiter()
+        self.api.rate_limiter.configure(GENERATE, 1, burst=5)
+
+        async def run():
+            self.api._async_client = httpx.AsyncClient(transport=httpx.MockTransport(self.server.handler))
+            self.api._async_loop = asyncio.get_running_loop()
+            try:
+                return await self.api.generate_image_body("p", _collect)
+            finally:
+                await self.api.aclose()
+
+        asyncio.run(run())
+        # The caller pays for the first send; the resend took one of its own
+        self.assertFalse(self.api.rate_limiter.bucket(GENERATE)._tokens > 4.5)
+
+    def test_failed_refresh_surfaces_401(self):
+        self.server.valid_token = "never-issued"
+        original = self.server.handler
+
+        def handler(request):
+            if request.url.path.endswith("/auth/session"):
+                self.server.session_calls += 1
+                return httpx.Response(401)
+            return original(request)
+
+        self.api.client = httpx.Client(transport=httpx.MockTransport(handler))
+        with self.assertRaises(httpx.HTTPStatusError):
+            self.api.generate_image("p")
+        self.assertEqual(self.server.session_calls, 1)
+
+class TestAutoRefresh(unittest.TestCase):
+    def test_new_expiry_reschedules_the_refresh(self):
+        api = WhiskClient("t", http2=False)
+        refreshed = threading.Event()
+        api.refresh_token = lambda generation=None: refreshed.set() or True
+        try:
+            # Expiry unknown at start: the first wait is the long fallback
+            api.start_auto_refresh(margin=0, fallback_interval=3600)
+            time.sleep(0.05)
+            api._apply_session({"access_token": "t2", "expires": time.time() + 0.2})
+            self.assertTrue(refreshed.wait(5))
+        finally:
+            api.close()
+        api._refresher.join(timeout=5)
+        self.assertFalse(api._refresher.is_alive())
+
+class TestParseExpiry(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_expiry("2025-01-01T00:00:00.000Z"), 1735689600.0)
+        self.assertEqual(parse_expiry(1735689600000), 1735689600.0)
+        self.assertEqual(parse_expiry("1735689600"), 1735689600.0)
+        self.assertIsNone(parse_expiry("Unknown"))
+        self.assertIsNone(parse_expiry(None))
+
+if __name__ == '__main__':
+    unittest.main()
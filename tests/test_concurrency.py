@@ -0,0 +1,52 @@
+import unittest
+from src.core.concurrency import AIMDController
+
+class TestAIMDController(unittest.TestCase):
+    def test_slow_start_grows_until_max(self):
+        ctrl = AIMDController(initial_limit=2, max_limit=10)
+        for _ in range(20):
+            ctrl.record_success(1.0)
+        self.assertEqual(ctrl.current_limit, 10)
+
+    def test_backoff_on_429_once_per_cooldown(self):
+        ctrl = AIMDController(initial_limit=16, max_limit=32)
+        ctrl.record_failure(429)
+        self.assertEqual(ctrl.current_limit, 8)
+        # Same burst of errors only counts once
+        ctrl.record_failure(503)
+        self.assertEqual(ctrl.current_limit, 8)
+
+    def test_client_errors_do_not_back_off(self):
+        ctrl = AIMDController(initial_limit=8)
+        ctrl.record_failure(400)
+        self.assertEqual(ctrl.current_limit, 8)
+
+    def test_additive_increase_after_backoff(self):
+        ctrl = AIMDController(initial_limit=8, max_limit=32)
+        ctrl.record_failure(500)
+        self.assertEqual(ctrl.current_limit, 4)
+        for _ in range(4):
+            ctrl.record_success(1.0)
+        # Roughly one extra slot per round-trip's worth of successes
+        self.assertEqual(ctrl.current_limit, 4)
+        for _ in range(2):
+            ctrl.record_success(1.0)
+        self.assertEqual(ctrl.current_limit, 5)
+
+    def test_latency_growth_holds_limit(self):
+        ctrl = AIMDController(initial_limit=4, max_limit=32, smoothing=1.0)
+        ctrl.record_success(1.0)
+        limit = ctrl.limit
+        ctrl.record_success(5.0)
+        self.assertEqual(ctrl.limit, limit)
+
+    def test_try_acquire_respects_limit(self):
+        ctrl = AIMDController(initial_limit=2)
+        self.assertTrue(ctrl.try_acquire())
+        self.assertTrue(ctrl.try_acquire())
+        self.assertFalse(ctrl.try_acquire())
+        ctrl.release()
+        self.assertTrue(ctrl.try_acquire())
+
+if __name__ == '__main__':
+    unittest.main()
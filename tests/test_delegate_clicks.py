@@ -1,18 +1,17 @@
 import unittest
 from PySide6.QtCore import QRect, QPoint
 
+from src.ui.delegate_layout import DelegateLayout
+
 class TestDelegateClicks(unittest.TestCase):
+    def setUp(self):
+        # Same geometry StatusDelegate paints with and hit-tests against
+        self.layout = DelegateLayout()
+
     def test_click_areas(self):
-        # Simulate StatusDelegate layout logic
         rect = QRect(0, 0, 180, 72)
-        btn_size = 36
-        spacing = 8
-        container_w = btn_size * 2 + spacing + 16
-        container_h = btn_size + 12
-        
-        container_rect = QRect(rect.right() - container_w - 8, rect.y() + (rect.height() - container_h) / 2, container_w, container_h)
-        retry_rect = QRect(container_rect.left() + 8, container_rect.y() + 6, btn_size, btn_size)
-        open_rect = QRect(retry_rect.right() + spacing, retry_rect.y(), btn_size, btn_size)
+        geometry = self.layout.status(rect)
+        retry_rect, open_rect = geometry.retry_rect, geometry.open_rect
         
         # Test Retry Click
         click_pt = retry_rect.center()
@@ -24,5 +23,25 @@ class TestDelegateClicks(unittest.TestCase):
         self.assertTrue(open_rect.contains(click_pt))
         self.assertFalse(retry_rect.contains(click_pt))
 
+        # Buttons sit inside the container, right of the badge
+        self.assertTrue(geometry.container_rect.contains(retry_rect))
+        self.assertTrue(geometry.container_rect.contains(open_rect))
+        self.assertLess(geometry.badge_rect.right(), geometry.container_rect.left())
+
+    def test_geometry_moves_with_cell(self):
+        first = self.layout.status(QRect(0, 0, 180, 72))
+        # A cell further down the column reuses the same layout, shifted
+        below = self.layout.status(QRect(0, 720, 180, 72))
+        self.assertEqual(below.retry_rect, first.retry_rect.translated(0, 720))
+        self.assertEqual(below.open_rect, first.open_rect.translated(0, 720))
+        self.assertTrue(below.container_path.boundingRect().contains(below.retry_rect.center()))
+
+    def test_other_cells(self):
+        prompt = self.layout.prompt(QRect(10, 10, 300, 72))
+        self.assertTrue(prompt.box_rect.contains(prompt.pencil_rect))
+        thumb = self.layout.thumbnail(QRect(0, 0, 260, 140))
+        self.assertEqual(thumb.img_rect, QRect(20, 10, 220, 120))
+        self.assertTrue(thumb.img_rect.contains(thumb.trash_rect))
+
 if __name__ == '__main__':
     unittest.main()
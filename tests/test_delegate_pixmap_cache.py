@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtGui import QColor, QImage, QPixmapCache
+from PySide6.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication([])
+
+from src.ui.pixmap_cache import ThumbnailPixmapCache
+
+class TestThumbnailPixmapCache(unittest.TestCase):
+    def setUp(self):
+        if not isinstance(app, QApplication):
+            self.skipTest("needs a QGuiApplication")
+        QPixmapCache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ThumbnailPixmapCache()
+        self.ready = []
+        self.cache.pixmapReady.connect(self.ready.append)
+
+    def tearDown(self):
+        self.cache.wait()
+        self.tmp.cleanup()
+
+    def _thumb(self, name):
+        path = os.path.join(self.tmp.name, name)
+        image = QImage(220, 120, QImage.Format_RGB32)
+        image.fill(QColor("red"))
+        image.save(path, "PNG")
+        return path
+
+    def _settle(self):
+        self.cache.wait()
+        QCoreApplication.processEvents()
+
+    def test_miss_then_hit_without_disk(self):
+        path = self._thumb("a.png")
+        self.assertIsNone(self.cache.get(path))
+        self.assertIsNone(self.cache.get(path))  # still pending, no second decode
+        self._settle()
+        self.assertEqual(self.ready, [path])
+
+        os.remove(path)  # served from memory from now on
+        pixmap = self.cache.get(path)
+        self.assertIsNotNone(pixmap)
+        self.assertEqual((pixmap.width(), pixmap.height()), (220, 120))
+
+    def test_invalidate_and_failure(self):
+        path = self._thumb("a.png")
+        self.cache.get(path)
+        self._settle()
+        self.cache.invalidate(path)
+        self.assertIsNone(self.cache.get(path))
+        self._settle()
+        self.assertIsNotNone(self.cache.get(path))
+
+        missing = os.path.join(self.tmp.name, "missing.png")
+        self.cache.prefetch([missing])
+        self._settle()
+        self.assertTrue(self.cache.is_failed(missing))
+        self.assertIsNone(self.cache.get(missing))
+
+if __name__ == "__main__":
+    unittest.main()
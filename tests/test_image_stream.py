@@ -0,0 +1,107 @@
+import unittest
+import asyncio
+import base64
+import threading
+import json
+import os
+import tempfile
+from src.core.image_stream import save_images_from_chunks, write_base64_file
+from src.core.io_pipeline import ChunkChannel
+
+class TestImageStream(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def _body(self, images, escape_slashes=False):
+        panels = [{"generatedImages": [{"encodedImage": img, "seed": 1} for img in images]}]
+        text = json.dumps({"prompt": 'a "quoted" encodedImage', "imagePanels": panels})
+        if escape_slashes:
+            text = text.replace("/", "\\/")
+        return text.encode()
+
+    def test_extracts_every_image_across_chunk_boundaries(self):
+        payloads = [os.urandom(200_000), os.urandom(1234)]
+        encoded = ["data:image/jpeg;base64," + base64.b64encode(payloads[0]).decode(),
+                   base64.b64encode(payloads[1]).decode()]
+        body = self._body(encoded, escape_slashes=True)
+
+        for size in (3, 7, 4096):
+            paths = [self._path(f"{size}_{n}.jpg") for n in range(2)]
+            chunks = [body[i:i + size] for i in range(0, len(body), size)]
+            saved = save_images_from_chunks(chunks, lambda n: paths[n])
+            self.assertEqual(saved, paths)
+            for path, payload in zip(paths, payloads):
+                with open(path, "rb") as f:
+                    self.assertEqual(f.read(), payload)
+
+    def test_skipped_images_are_not_written(self):
+        body = self._body([base64.b64encode(b"one").decode(), base64.b64encode(b"two").decode()])
+        saved = save_images_from_chunks([body], lambda n: self._path("first.jpg") if n == 0 else None)
+        self.assertEqual(saved, [self._path("first.jpg")])
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["first.jpg"])
+
+    def test_truncated_body_leaves_no_partial_file(self):
+        body = self._body([base64.b64encode(os.urandom(100_000)).decode()])
+        saved = save_images_from_chunks([body[:len(body) // 2]], lambda n: self._path("cut.jpg"))
+        self.assertEqual(saved, [])
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_write_base64_file(self):
+        data = os.urandom(300_000)
+        written = write_base64_file("data:image/jpeg;base64," + base64.b64encode(data).decode(), self._path("a.jpg"))
+        self.assertEqual(written, len(data))
+        with open(self._path("a.jpg"), "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_channel_decodes_while_the_body_streams(self):
+        payload = os.urandom(50_000)
+        body = self._body([base64.b64encode(payload).decode()])
+        chunks = [body[i:i + 4096] for i in range(0, len(body), 4096)]
+        path = self._path("streamed.jpg")
+        consumed = []
+
+        async def run():
+            channel = ChunkChannel(max_chunks=2)
+
+            def consume():
+                return save_images_from_chunks((consumed.append(c) or c for c in channel), lambda n: path)
+
+            write = asyncio.get_running_loop().run_in_executor(None, consume)
+            for n, chunk in enumerate(chunks):
+                await channel.put(chunk)
+                # Never more than max_chunks ahead of the decoder
+                self.assertLessEqual(n + 1 - len(consumed), 3)
+            channel.close()
+            return await write
+
+        self.assertEqual(asyncio.run(run()), [path])
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), payload)
+
+    def test_channel_drops_chunks_once_the_consumer_stops(self):
+        async def run():
+            channel = ChunkChannel(max_chunks=1)
+            first = threading.Event()
+
+            def consume():
+                for _ in channel:
+                    first.set()
+                    break
+
+            write = asyncio.get_running_loop().run_in_executor(None, consume)
+            for _ in range(10):
+                await channel.put(b"x")
+            channel.close()
+            await write
+            return first.is_set()
+
+        self.assertTrue(asyncio.run(asyncio.wait_for(run(), 5)))
+
+if __name__ == '__main__':
+    unittest.main()
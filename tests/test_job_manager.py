@@ -0,0 +1,457 @@
+import unittest
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+import httpx
+from src.core.job_manager import JobManager
+from src.core.io_pipeline import IOPipeline
+from src.core.rate_limit import GENERATE
+from src.core.session_pool import PooledSession
+
+JPEG_BYTES = b"\xff\xd8\xff\xe0fake-jpeg\xff\xd9"
+
+class FakeClient:
+    """Stands in for WhiskClient; records how many requests overlap."""
+    def __init__(self, delay=0.2, fail_on_calls=(), fail_status=None):
+        self.delay = delay
+        self.fail_on_calls = set(fail_on_calls)
+        self.fail_status = fail_status
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.closed = False
+        self.aclosed = False
+        self.lock = threading.Lock()
+
+    async def generate_image_body(self, prompt, consume, aspect_ratio="IMAGE_ASPECT_RATIO_LANDSCAPE", **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+            if self.calls in self.fail_on_calls:
+                if self.fail_status:
+                    request = httpx.Request("POST", "https://example.invalid/generate")
+                    response = httpx.Response(self.fail_status, request=request)
+                    raise httpx.HTTPStatusError("generation failed", request=request, response=response)
+                raise RuntimeError("generation failed")
+        encoded = "data:image/jpeg;base64," + base64.b64encode(JPEG_BYTES).decode()
+        body = json.dumps({"imagePanels": [{"generatedImages": [{"encodedImage": encoded}]}]}).encode()
+
+        async def chunks():
+            for i in range(0, len(body), 7):
+                yield body[i:i + 7]
+        return await consume(chunks())
+
+    async def warmup_async(self):
+        pass
+
+    def stop_auto_refresh(self):
+        pass
+
+    async def aclose(self):
+        self.aclosed = True
+
+    def close(self):
+        self.closed = True
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = JobManager(db_path=os.path.join(self.tmp.name, "jobs.db"))
+        self.manager.set_output_dir(os.path.join(self.tmp.name, "out"))
+        self.manager.client = FakeClient()
+        # Pacing has its own test; keep the rest fast
+        self.manager.rate_limiter.configure(GENERATE, None)
+        self.completed = []
+        self.failed = []
+        self.manager.on_job_complete = self._on_complete
+
+    def tearDown(self):
+        self.manager.stop_processing()
+        if self.manager.engine_thread:
+            self.manager.engine_thread.join(timeout=5)
+        self.manager.close()
+        self.tmp.cleanup()
+
+    def _on_complete(self, data):
+        if data["status"] == "COMPLETED":
+            self.completed.append(data)
+        elif data["status"] == "FAILED":
+            self.failed.append(data)
+
+    def _wait_for(self, n, timeout=10, results=None):
+        results = self.completed if results is None else results
+        deadline = time.time() + timeout
+        while len(results) < n and time.time() < deadline:
+            time.sleep(0.02)
+
+    def test_many_requests_share_one_loop(self):
+        for idx in range(1, 41):
+            self.manager.add_job(f"prompt {idx}", prompt_index=idx)
+        threads_before = threading.active_count()
+        self.manager.start_processing(max_workers=40)
+        self._wait_for(40)
+
+        self.assertEqual(len(self.completed), 40)
+        self.assertGreater(self.manager.client.max_in_flight, 2)
+        # One engine thread for the network side, not one per worker (disk threads are a fixed pool)
+        network_threads = [t for t in threading.enumerate() if not t.name.startswith("WhiskIO")]
+        self.assertLessEqual(len(network_threads), threads_before + 1)
+        with open(os.path.join(self.manager.output_dir, "image_1.jpg"), "rb") as f:
+            self.assertEqual(f.read(), JPEG_BYTES)
+
+    def test_connections_are_warmed_before_the_first_request(self):
+        events = []
+        client = self.manager.client
+
+        async def warmup_async():
+            await asyncio.sleep(0.1)
+            events.append("warmup")
+
+        real_generate = client.generate_image_body
+
+        async def generate_image_body(*args, **kwargs):
+            events.append("generate")
+            return await real_generate(*args, **kwargs)
+
+        client.warmup_async = warmup_async
+        client.generate_image_body = generate_image_body
+        client.delay = 0.01
+        self.manager.add_job("p", prompt_index=1)
+        self.manager.start_processing()
+        self._wait_for(1)
+        self.assertEqual(events, ["warmup", "generate"])
+
+    def test_clients_added_during_a_run_are_closed_at_shutdown(self):
+        first = self.manager.client
+        self.manager.start_processing()
+        added = FakeClient()
+        self.manager.sessions.add(PooledSession(added))
+        time.sleep(0.1)
+        replacement = FakeClient()
+        self.manager.client = replacement
+        self.manager.stop_processing(timeout=2.0)
+        self.assertTrue(first.aclosed)
+        self.assertTrue(added.aclosed)
+        self.assertTrue(replacement.aclosed)
+
+    def test_add_jobs_bulk(self):
+        statuses = []
+        self.manager.on_status_change = statuses.append
+        ids = self.manager.add_jobs_bulk(["a", "b", "c"], "IMAGE_ASPECT_RATIO_SQUARE", 2)
+
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(self.manager.queue.qsize(), 3)
+        self.assertEqual(len(statuses), 1)
+        row = self.manager.store.fetch_one("SELECT prompt, count, prompt_index FROM jobs WHERE id=?", (ids[2],))
+        self.assertEqual(row, ("c", 2, 3))
+
+    def test_recovery_resumes_unfinished_and_skips_existing_files(self):
+        ids = self.manager.add_jobs_bulk(["done", "partial", "fresh"], count=2)
+        self.manager._update_job_status(ids[0], "COMPLETED", result_path="[]")
+        self.manager._update_job_status(ids[1], "RUNNING")
+        # Simulate a crash: restart with a new manager on the same database, pointed at another folder
+        self.manager.close()
+        self.manager = JobManager(db_path=self.manager.db_path)
+        self.manager.set_output_dir(os.path.join(self.tmp.name, "elsewhere"))
+        self.manager.client = FakeClient(delay=0.01)
+        self.manager.on_job_complete = self._on_complete
+        out = os.path.join(self.tmp.name, "out")
+        with open(os.path.join(out, "image_2_1.jpg"), "wb") as f:
+            f.write(JPEG_BYTES)
+
+        self.assertEqual(self.manager.recover_jobs(), 2)
+        self.assertTrue(self.manager.resume_recovered_jobs())
+        self.assertEqual(self.manager.queue.qsize(), 0)
+        self.manager.start_processing()
+        self._wait_for(2)
+
+        self.assertEqual(sorted(d["id"] for d in self.completed), ids[1:])
+        # One variation of "partial" already existed on disk
+        self.assertEqual(self.manager.client.calls, 3)
+        # Resumed jobs finish in the folder they were created for
+        self.assertTrue(os.path.exists(os.path.join(out, "image_3_2.jpg")))
+        self.assertEqual(os.listdir(self.manager.output_dir), [])
+
+    def test_recovered_jobs_wait_for_resume(self):
+        self.manager.add_jobs_bulk(["left over"])
+        self.manager.close()
+        self.manager = JobManager(db_path=self.manager.db_path)
+        self.manager.set_output_dir(os.path.join(self.tmp.name, "out"))
+        self.manager.client = FakeClient(delay=0.01)
+        self.manager.on_job_complete = self._on_complete
+
+        self.assertEqual(self.manager.recover_jobs(), 1)
+        self.assertTrue(self.manager.has_recovered_jobs)
+        new_id = self.manager.add_job("new run", prompt_index=5)
+        self.manager.start_processing()
+        self._wait_for(1)
+        time.sleep(0.2)
+        self.assertEqual([d["id"] for d in self.completed], [new_id])
+        self.assertTrue(self.manager.has_recovered_jobs)
+
+    def test_replaced_clients_are_closed(self):
+        first = self.manager.client
+        second = FakeClient()
+        self.manager.client = second
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+        self.manager.client = second
+        self.assertFalse(second.closed)
+        self.assertIs(self.manager.client, second)
+
+    def test_batch_priority_survives_restart(self):
+        slow = self.manager.add_jobs_bulk(["slow batch"], batch_id="slow")
+        urgent = self.manager.add_jobs_bulk(["urgent batch"], start_index=2, batch_id="urgent")
+        self.manager.set_batch_priority("urgent", 5)
+        self.manager.close()
+        self.manager = JobManager(db_path=self.manager.db_path)
+        self.manager.set_output_dir(os.path.join(self.tmp.name, "out"))
+        self.manager.client = FakeClient()
+        self.manager.rate_limiter.configure(GENERATE, None)
+        self.manager.on_job_complete = self._on_complete
+
+        self.assertEqual(self.manager.recover_jobs(), 2)
+        self.assertTrue(self.manager.resume_recovered_jobs())
+        self.manager.start_processing(max_workers=1)
+        self._wait_for(2)
+        self.assertEqual([d["id"] for d in self.completed], urgent + slow)
+
+    def test_cleared_jobs_are_not_recovered(self):
+        ids = self.manager.add_jobs_bulk(["waiting", "stopped"])
+        self.manager._update_job_status(ids[1], "INTERRUPTED")
+        self.manager.clear_queue()
+        self.manager.close()
+        self.manager = JobManager(db_path=self.manager.db_path)
+        self.assertEqual(self.manager.recover_jobs(), 0)
+        self.assertEqual(self.manager.store.fetch_one("SELECT status FROM jobs WHERE id = ?", (ids[1],)), ("CANCELLED",))
+
+    def test_retry_only_requests_missing_variations(self):
+        self.manager.client = FakeClient(delay=0.01, fail_on_calls={3})
+        job_id = self.manager.add_job("four variations", count=4, prompt_index=7)
+        self.manager.start_processing(max_workers=1)
+        self._wait_for(1, results=self.failed)
+        self.assertEqual(self.manager.client.calls, 3)
+
+        self.manager.retry_job(job_id)
+        self._wait_for(1)
+        # Variations 1 and 2 were checkpointed, so only 3 and 4 are generated again
+        self.assertEqual(self.manager.client.calls, 5)
+        self.assertEqual(len(self.completed[0]["images"]), 4)
+        self.assertEqual(sorted(self.manager.store.fetch_images([job_id])[job_id]), [1, 2, 3, 4])
+
+    def test_manual_retry_jumps_the_queue(self):
+        self.manager.client = FakeClient(delay=0.01, fail_on_calls={1})
+        first = self.manager.add_job("fails once", prompt_index=1)
+        self.manager.start_processing(max_workers=1)
+        self._wait_for(1, results=self.failed)
+        self.manager.pause_processing()
+        self.manager.add_jobs_bulk([f"bulk {i}" for i in range(20)], start_index=2)
+        self.manager.retry_job(first)
+        self.manager.resume_processing()
+        self._wait_for(1)
+        self.assertEqual(self.completed[0]["id"], first)
+
+    def test_transient_errors_are_retried_automatically(self):
+        self.manager.retry_policy.base_delay = 0.01
+        self.manager.client = FakeClient(delay=0.01, fail_on_calls={2, 3}, fail_status=503)
+        job_id = self.manager.add_job("two variations", count=2, prompt_index=3)
+        self.manager.start_processing(max_workers=1)
+        self._wait_for(1)
+
+        self.assertEqual(len(self.completed), 1)
+        self.assertEqual(self.failed, [])
+        # Variation 1 landed before the first 503, so each retry only asks for variation 2
+        self.assertEqual(self.manager.client.calls, 4)
+        self.assertEqual(self.manager.store.fetch_one("SELECT attempts FROM jobs WHERE id = ?", (job_id,)), (2,))
+
+    def test_retry_budget_is_limited(self):
+        self.manager.retry_policy.base_delay = 0.01
+        self.manager.retry_policy.max_attempts = 3
+        self.manager.sessions.base_cooldown = 0.01
+        self.manager.client = FakeClient(delay=0.01, fail_on_calls=set(range(1, 10)), fail_status=429)
+        self.manager.add_job("always throttled", prompt_index=1)
+        self.manager.start_processing(max_workers=1)
+        self._wait_for(1, results=self.failed)
+
+        self.assertEqual(len(self.failed), 1)
+        self.assertEqual(self.manager.client.calls, 3)
+
+    def test_permanent_errors_are_not_retried(self):
+        self.manager.retry_policy.base_delay = 0.01
+        self.manager.client = FakeClient(delay=0.01, fail_on_calls={1}, fail_status=400)
+        self.manager.add_job("rejected prompt", prompt_index=1)
+        self.manager.start_processing(max_workers=1)
+        self._wait_for(1, results=self.failed)
+
+        self.assertEqual(len(self.failed), 1)
+        self.assertEqual(self.manager.client.calls, 1)
+
+    def test_slow_disk_applies_backpressure(self):
+        self.manager.io_max_pending = 2
+        self.manager.io_workers = 1
+        gate = threading.Event()
+        writes = []
+        real_submit = IOPipeline.submit
+
+        async def slow_submit(io, fn, *args, **kwargs):
+            def blocked(*a):
+                gate.wait(5)
+                writes.append(a)
+                return fn(*a)
+            return await real_submit(io, blocked, *args, **kwargs)
+
+        for idx in range(1, 11):
+            self.manager.add_job(f"prompt {idx}", prompt_index=idx)
+        IOPipeline.submit = slow_submit
+        try:
+            self.manager.client.delay = 0.01
+            self.manager.start_processing(max_workers=10)
+            time.sleep(0.5)
+            # Other jobs wait to hand off instead of queueing more payloads
+            self.assertLessEqual(self.manager.io.pending, 2)
+            self.assertEqual(len(writes), 0)
+            gate.set()
+            self._wait_for(10)
+        finally:
+            IOPipeline.submit = real_submit
+        self.assertEqual(len(self.completed), 10)
+
+    def test_reuse_cached_results(self):
+        self.manager.enable_result_cache(os.path.join(self.tmp.name, "cache"))
+        self.manager.client = FakeClient(delay=0.01)
+        self.manager.add_job("a cat", count=2, prompt_index=1)
+        self.manager.start_processing(max_workers=2)
+        self._wait_for(1)
+        self.assertEqual(self.manager.client.calls, 2)
+
+        # Same prompt and settings under a new index: both variations come from the cache
+        self.manager.add_job("a cat", count=2, prompt_index=2)
+        self.manager.add_job("a dog", count=1, prompt_index=3)
+        self._wait_for(3)
+        self.assertEqual(self.manager.client.calls, 3)
+        out = os.path.join(self.tmp.name, "out")
+        self.assertTrue(os.path.exists(os.path.join(out, "image_2_1.jpg")))
+        self.assertTrue(os.path.exists(os.path.join(out, "image_2_2.jpg")))
+
+    def test_result_cache_is_opt_in_and_beside_the_output(self):
+        self.assertIsNone(self.manager.result_cache)
+        cache = self.manager.enable_result_cache()
+        self.assertEqual(cache.cache_dir, os.path.join(self.manager.output_dir, ".whisk_cache"))
+        self.assertTrue(self.manager.reuse_cached)
+        self.manager.disable_result_cache()
+        self.assertIsNone(self.manager.result_cache)
+        self.assertFalse(self.manager.reuse_cached)
+
+    def test_duplicate_prompts_share_one_generation(self):
+        self.manager.client = FakeClient(delay=0.2)
+        for idx in range(1, 4):
+            self.manager.add_job("same prompt", prompt_index=idx)
+        self.manager.add_job("other prompt", prompt_index=4)
+        self.manager.start_processing(max_workers=8)
+        self._wait_for(4)
+
+        self.assertEqual(self.manager.client.calls, 2)
+        out = os.path.join(self.tmp.name, "out")
+        for idx in range(1, 5):
+            self.assertTrue(os.path.exists(os.path.join(out, f"image_{idx}.jpg")))
+
+    def test_coalesced_jobs_free_their_slot_while_waiting(self):
+        self.manager.client = FakeClient(delay=0.3)
+        for idx in range(1, 4):
+            self.manager.add_job("same prompt", prompt_index=idx)
+        self.manager.add_job("other prompt", prompt_index=4)
+        # Two slots: the followers must not keep "other prompt" waiting behind the leader
+        self.manager.start_processing(max_workers=2)
+        time.sleep(0.2)
+        self.assertEqual(self.manager.client.calls, 2)
+        self._wait_for(4)
+        self.assertEqual(self.manager.client.calls, 2)
+
+    def test_distinct_seeds_disable_coalescing(self):
+        self.manager.force_distinct_seeds = True
+        self.manager.client = FakeClient(delay=0.2)
+        for idx in range(1, 4):
+            self.manager.add_job("same prompt", prompt_index=idx)
+        self.manager.start_processing(max_workers=8)
+        self._wait_for(3)
+        self.assertEqual(self.manager.client.calls, 3)
+
+    def test_coalesced_job_generates_itself_when_leader_fails(self):
+        self.manager.client = FakeClient(delay=0.2, fail_on_calls={1})
+        self.manager.add_job("same prompt", prompt_index=1)
+        self.manager.add_job("same prompt", prompt_index=2)
+        self.manager.start_processing(max_workers=8)
+        self._wait_for(1)
+        self._wait_for(1, results=self.failed)
+
+        self.assertEqual(len(self.completed), 1)
+        self.assertEqual(len(self.failed), 1)
+        self.assertEqual(self.manager.client.calls, 2)
+
+    def test_jobs_move_off_a_rejected_account(self):
+        self.manager.client = FakeClient(delay=0.01, fail_on_calls=set(range(1, 100)), fail_status=401)
+        healthy = FakeClient(delay=0.01)
+        self.manager.sessions.add(PooledSession(healthy, "healthy"))
+        for idx in range(1, 6):
+            self.manager.add_job(f"prompt {idx}", prompt_index=idx)
+        self.manager.start_processing(max_workers=4)
+        self._wait_for(5)
+
+        self.assertEqual(len(self.completed), 5)
+        self.assertEqual(healthy.calls, 5)
+        self.assertTrue(self.manager.sessions.primary.disabled)
+
+    def test_rate_limit_paces_requests_without_holding_slots(self):
+        self.manager.rate_limiter.configure(GENERATE, 60, burst=1)
+        self.manager.client = FakeClient(delay=0.01)
+        for idx in range(1, 4):
+            self.manager.add_job(f"prompt {idx}", prompt_index=idx)
+        self.manager.start_processing(max_workers=4)
+        time.sleep(0.4)
+
+        # One token up front, the next only after a second
+        self.assertEqual(self.manager.client.calls, 1)
+        # Jobs waiting for a token are not counted against the concurrency limit
+        self.assertEqual(self.manager.concurrency.in_flight, 0)
+        self.manager.rate_limiter.configure(GENERATE, None)
+        self._wait_for(3)
+        self.assertEqual(len(self.completed), 3)
+
+    def test_stop_aborts_in_flight_requests(self):
+        self.manager.client = FakeClient(delay=30)
+        job_id = self.manager.add_job("slow prompt", prompt_index=1)
+        self.manager.start_processing(max_workers=1)
+        time.sleep(0.2)
+        self.assertEqual(self.manager.client.calls, 1)
+
+        started = time.monotonic()
+        self.manager.stop_processing()
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertFalse(self.manager.engine_thread.is_alive())
+
+        self.assertEqual(self.manager.store.fetch_one("SELECT status FROM jobs WHERE id = ?", (job_id,)), ("INTERRUPTED",))
+        # Back in the queue for the next start, and picked up by recovery after a restart
+        self.assertEqual(self.manager.queue.qsize(), 1)
+        self.assertEqual(self.manager.recover_jobs(), 1)
+        self.assertFalse(os.listdir(os.path.join(self.tmp.name, "out")))
+
+    def test_pause_holds_new_requests(self):
+        self.manager.start_processing(max_workers=4)
+        self.manager.pause_processing()
+        self.manager.add_job("paused prompt", prompt_index=1)
+        time.sleep(0.3)
+        self.assertEqual(self.manager.client.calls, 0)
+        self.manager.resume_processing()
+        self._wait_for(1)
+        self.assertEqual(len(self.completed), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtCore import Qt
+from src.ui.job_model import JobModel, JobRecord
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+def jobs(start, n):
+    return [{"job_id": f"j{i}", "prompt": f"p{i}", "prompt_index": i, "status": "PENDING"} for i in range(start, start + n)]
+
+class TestJobModel(unittest.TestCase):
+    def setUp(self):
+        self.model = JobModel()
+        self.model.add_jobs_batch(jobs(0, 10))
+        self.changes = []
+        self.model.dataChanged.connect(lambda tl, br: self.changes.append((tl.row(), br.row())))
+
+    def test_index_survives_removals_and_inserts(self):
+        self.model.remove_job("j2")
+        self.model.remove_job("j7")
+        self.model.add_jobs_batch(jobs(10, 2))
+        for row, job in enumerate(self.model.jobs):
+            self.assertEqual(self.model.row_of(job["job_id"]), row)
+        self.assertIsNone(self.model.row_of("j2"))
+        self.assertEqual(self.model.rowCount(), 10)
+
+    def test_updates_coalesce_into_ranges(self):
+        for job_id in ("j1", "j2", "j3", "j3", "j8"):
+            self.model.update_job(job_id, status="RUNNING")
+        self.assertEqual(self.changes, [])
+        # Data is current before the flush
+        self.assertEqual(self.model.get_job(3)["status"], "RUNNING")
+
+        self.model.flush_updates()
+        self.assertEqual(self.changes, [(1, 3), (8, 8)])
+
+    def test_only_changed_columns_are_signalled(self):
+        columns = []
+        self.model.dataChanged.connect(lambda tl, br: columns.append((tl.column(), br.column())))
+        self.model.update_job("j1", status="RUNNING")
+        self.model.update_job("j2", status="RUNNING")
+        self.model.update_job("j3", thumbnail="/tmp/a.jpg")
+        self.model.update_job("j3", status="COMPLETED")
+        self.model.update_job("j5", error="boom")
+        self.model.flush_updates()
+        self.assertEqual(self.changes, [(1, 2), (3, 3), (5, 5)])
+        self.assertEqual(columns, [(JobModel.COL_STATUS, JobModel.COL_STATUS),
+                                   (JobModel.COL_THUMBNAIL, JobModel.COL_STATUS),
+                                   (0, JobModel.COL_COUNT - 1)])
+
+    def test_timer_flushes(self):
+        self.model.update_job("j4", status="COMPLETED")
+        self.assertTrue(self.model._flush_timer.isActive())
+        self.model._flush_timer.timeout.emit()
+        self.assertEqual(self.changes, [(4, 4)])
+
+    def test_removal_flushes_pending_rows_first(self):
+        self.model.update_job("j5", status="RUNNING")
+        self.model.remove_job("j0")
+        self.assertEqual(self.changes, [(5, 5)])
+        self.model.update_job("j5", status="COMPLETED")
+        self.model.flush_updates()
+        self.assertEqual(self.changes[-1], (4, 4))
+
+class TestJobRecord(unittest.TestCase):
+    def test_dict_contract(self):
+        job = JobRecord("j1", prompt="cat", prompt_index=3, status="RUNNING", batch="b")
+        self.assertEqual(job["job_id"], "j1")
+        self.assertEqual(job.get("status", "QUEUED"), "RUNNING")
+        self.assertIsNone(job.get("thumbnail"))
+        self.assertEqual(job.get("batch"), "b")
+        self.assertEqual(job.get("missing", 5), 5)
+        with self.assertRaises(KeyError):
+            job["missing"]
+        job.update(status="COMPLETED", thumbnail="/tmp/a.jpg", error=None)
+        self.assertIs(job.status, "COMPLETED")
+        self.assertIn("thumbnail", job)
+        self.assertFalse(hasattr(job, "__dict__"))
+
+    def test_long_prompts_are_compressed(self):
+        text = "a very long prompt " * 200
+        job = JobRecord("j1", prompt=text)
+        self.assertIsInstance(job._prompt, bytes)
+        self.assertLess(len(job._prompt), len(text))
+        self.assertEqual(job["prompt"], text)
+        self.assertLessEqual(len(job.prompt_preview), JobRecord.PREVIEW_CHARS + 1)
+
+    def test_model_serves_records(self):
+        model = JobModel()
+        model.add_jobs_batch([{"job_id": "j1", "prompt": "x" * 1000, "prompt_index": 1}])
+        index = model.index(0, JobModel.COL_PROMPT)
+        self.assertIsInstance(model.data(index, Qt.UserRole), JobRecord)
+        self.assertEqual(len(model.data(index, Qt.DisplayRole)), JobRecord.PREVIEW_CHARS + 1)
+        self.assertEqual(model.data(model.index(0, JobModel.COL_INDEX)), "1")
+
+if __name__ == '__main__':
+    unittest.main()
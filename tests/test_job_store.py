@@ -0,0 +1,71 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+from src.core.job_store import JobStore
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "jobs.db")
+        self.store = JobStore(self.db_path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def _rows(self):
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT id, status, result_path FROM jobs ORDER BY id").fetchall()
+        conn.close()
+        return rows
+
+    def test_wal_mode(self):
+        mode = self.store.fetch_one("PRAGMA journal_mode")[0]
+        self.assertEqual(mode.lower(), "wal")
+
+    def test_insert_ids_are_sequential_and_persisted(self):
+        ids = [self.store.insert_job(f"p{i}", "PENDING", "IMAGE_ASPECT_RATIO_SQUARE", 1, i) for i in range(5)]
+        self.assertEqual(ids, [1, 2, 3, 4, 5])
+        self.store.flush()
+        self.assertEqual([r[0] for r in self._rows()], ids)
+
+    def test_ids_continue_after_reopen(self):
+        self.store.insert_job("p", "PENDING", "IMAGE_ASPECT_RATIO_SQUARE", 1, 1)
+        self.store.close()
+        self.store = JobStore(self.db_path)
+        self.assertEqual(self.store.insert_job("q", "PENDING", "IMAGE_ASPECT_RATIO_SQUARE", 1, 2), 2)
+
+    def test_status_updates_coalesce_last_wins(self):
+        job_id = self.store.insert_job("p", "PENDING", "IMAGE_ASPECT_RATIO_SQUARE", 1, 1)
+        self.store.update_status(job_id, "RUNNING")
+        self.store.update_status(job_id, "COMPLETED", result_path="[]")
+        self.store.flush()
+        self.assertEqual(self._rows(), [(job_id, "COMPLETED", "[]")])
+
+    def test_ordered_write_is_a_barrier(self):
+        job_id = self.store.insert_job("p", "PENDING", "IMAGE_ASPECT_RATIO_SQUARE", 1, 1)
+        self.store.update_status(job_id, "FAILED", result_path="boom")
+        self.store.submit(lambda c: c.execute("UPDATE jobs SET status='PENDING', result_path=NULL WHERE id=?", (job_id,)))
+        self.store.update_status(job_id, "RUNNING")
+        self.store.flush()
+        self.assertEqual(self._rows(), [(job_id, "RUNNING", None)])
+
+    def test_failing_write_only_drops_itself(self):
+        job_id = self.store.insert_job("p", "PENDING", "IMAGE_ASPECT_RATIO_SQUARE", 1, 1)
+        self.store.flush()
+
+        def half_then_fail(c):
+            c.execute("UPDATE jobs SET status='BROKEN' WHERE id=?", (job_id,))
+            c.execute("INSERT INTO jobs (id, prompt) VALUES (?, 'dup')", (job_id,))
+
+        bad = self.store.submit(half_then_fail)
+        good = self.store.insert_job("q", "PENDING", "IMAGE_ASPECT_RATIO_SQUARE", 1, 2)
+        self.store.update_status(good, "RUNNING")
+        with self.assertRaises(sqlite3.IntegrityError):
+            bad.result()
+        self.store.flush()
+        self.assertEqual(self._rows(), [(job_id, "PENDING", None), (good, "RUNNING", None)])
+
+if __name__ == '__main__':
+    unittest.main()
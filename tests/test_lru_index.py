@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from src.core.lru_index import LRUFileIndex
+
+class TestLRUFileIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "index.db")
+        self.index = LRUFileIndex(self.db, "entries", max_bytes=250, columns=("source",))
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def _file(self, name, size=100):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        return path
+
+    def test_evicts_least_recently_used_but_never_the_new_entry(self):
+        a, b = self._file("a"), self._file("b")
+        self.index.add("a", a, 100, {"source": "1"})
+        self.index.add("b", b, 100, {"source": "2"})
+        self.index.lookup("a")
+        big = self._file("big", 300)
+        self.index.add("big", big, 300, {"source": "3"})
+        self.assertFalse(os.path.exists(a) or os.path.exists(b))
+        self.assertEqual(self.index.lookup("big"), big)
+        self.assertEqual(self.index.total_bytes, 300)
+
+    def test_supersede_drops_entries_with_the_same_value(self):
+        old, new = self._file("old"), self._file("new")
+        self.index.add("old", old, 100, {"source": "s"})
+        self.index.add("new", new, 100, {"source": "s"}, supersede="source")
+        self.assertFalse(os.path.exists(old))
+        self.assertIsNone(self.index.lookup("old"))
+        self.assertEqual(self.index.total_bytes, 100)
+
+    def test_missing_file_is_forgotten(self):
+        path = self._file("a")
+        self.index.add("a", path, 100, {"source": "1"})
+        os.remove(path)
+        self.assertIsNone(self.index.lookup("a"))
+        self.assertEqual(self.index.total_bytes, 0)
+
+    def test_total_survives_reopen(self):
+        self.index.add("a", self._file("a"), 100, {"source": "1"})
+        self.index.add("a", self._file("a", 120), 120, {"source": "1"})
+        self.index.close()
+        self.index = LRUFileIndex(self.db, "entries", max_bytes=250, columns=("source",))
+        self.assertEqual(self.index.total_bytes, 120)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -33,6 +33,40 @@ class TestPromptWorker(unittest.TestCase):
         self.assertEqual(batches[0], ["A", "B"])
         self.assertEqual(batches[2], ["E"])
 
+    def test_file_chunks_on_line_boundaries(self):
+        import os
+        import tempfile
+        from src.services import prompt_parser
+
+        lines = [f"{i}. prompt number {i} with some padding text" for i in range(1, 2001)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "prompts.txt")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write("\ufeff" + "\r\n".join(lines) + "\r\n\r\n")
+
+            original = prompt_parser.CHUNK_BYTES
+            prompt_parser.CHUNK_BYTES = 1000  # many chunks, each cut mid-file
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                bounds = list(prompt_parser.chunk_bounds(data, 1000))
+                self.assertGreater(len(bounds), 10)
+                for start, end in bounds[:-1]:
+                    self.assertEqual(data[end - 1:end], b"\n")
+
+                worker = PromptParserWorker(path, "file", remove_index=True)
+                batches = []
+                totals = []
+                worker.batchReady.connect(batches.append)
+                worker.finished.connect(totals.append)
+                worker.run()
+            finally:
+                prompt_parser.CHUNK_BYTES = original
+
+        prompts = [p for batch in batches for p in batch]
+        self.assertEqual(prompts, [f"prompt number {i} with some padding text" for i in range(1, 2001)])
+        self.assertEqual(totals, [2000])
+
 if __name__ == '__main__':
     # QObject needs a QCoreApplication to work properly with signals usually, 
     # but for direct method calls it might be okay. 
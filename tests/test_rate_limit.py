@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from src.core.rate_limit import GENERATE, SESSION, RateLimiter, TokenBucket
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_refill_rate(self):
+        bucket = TokenBucket(600, burst=3)  # one token every 0.1s
+        self.assertTrue(all(bucket.try_acquire() for _ in range(3)))
+        self.assertFalse(bucket.try_acquire())
+        time.sleep(0.12)
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+    def test_refund(self):
+        bucket = TokenBucket(1, burst=1)
+        self.assertTrue(bucket.try_acquire())
+        bucket.refund()
+        self.assertTrue(bucket.try_acquire())
+
+    def test_unlimited(self):
+        bucket = TokenBucket(None)
+        self.assertTrue(all(bucket.try_acquire() for _ in range(1000)))
+
+    def test_shared_across_threads(self):
+        bucket = TokenBucket(1200, burst=2)  # one token every 0.05s
+        start = time.monotonic()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # Two from the burst, four more at the refill rate
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_acquire_async(self):
+        bucket = TokenBucket(1200, burst=1)
+
+        async def run():
+            start = time.monotonic()
+            await asyncio.gather(*(bucket.acquire_async() for _ in range(4)))
+            return time.monotonic() - start
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.14)
+
+class TestRateLimiter(unittest.TestCase):
+    def test_endpoints_have_separate_buckets(self):
+        limiter = RateLimiter({GENERATE: (1, 1), SESSION: (1, 1)})
+        self.assertTrue(limiter.bucket(GENERATE).try_acquire())
+        self.assertFalse(limiter.bucket(GENERATE).try_acquire())
+        self.assertTrue(limiter.bucket(SESSION).try_acquire())
+        # Unknown endpoints are not paced
+        self.assertTrue(limiter.bucket("other").unlimited)
+
+if __name__ == '__main__':
+    unittest.main()
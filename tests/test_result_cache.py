@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from src.core.result_cache import ResultCache, make_cache_key
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(os.path.join(self.tmp.name, "cache"), max_bytes=250)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def _file(self, name, size=100):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        return path
+
+    def test_key(self):
+        key = make_cache_key("cat", "IMAGE_ASPECT_RATIO_SQUARE", "IMAGEN_3_5", None, 1)
+        self.assertEqual(key, make_cache_key("cat", "IMAGE_ASPECT_RATIO_SQUARE", "IMAGEN_3_5", None, 1))
+        # Unseeded: each variation is its own draw
+        self.assertNotEqual(key, make_cache_key("cat", "IMAGE_ASPECT_RATIO_SQUARE", "IMAGEN_3_5", None, 2))
+        # Seeded: same image whatever the variation
+        self.assertEqual(make_cache_key("cat", "IMAGE_ASPECT_RATIO_SQUARE", "IMAGEN_3_5", 7, 1),
+                         make_cache_key("cat", "IMAGE_ASPECT_RATIO_SQUARE", "IMAGEN_3_5", 7, 2))
+
+    def test_materialize_survives_source_removal(self):
+        source = self._file("image_1.jpg")
+        with open(source, "rb") as f:
+            data = f.read()
+        self.cache.put("k1", source)
+        os.remove(source)
+
+        dest = os.path.join(self.tmp.name, "out", "image_9.jpg")
+        self.assertTrue(self.cache.materialize("k1", dest))
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), data)
+        self.assertFalse(self.cache.materialize("missing", dest))
+
+    def test_lru_eviction(self):
+        self.cache.put("a", self._file("a.jpg"))
+        self.cache.put("b", self._file("b.jpg"))
+        self.assertIsNotNone(self.cache.lookup("a"))  # b is now least recently used
+        self.cache.put("c", self._file("c.jpg"))
+
+        self.assertLessEqual(self.cache.total_bytes, 250)
+        self.assertIsNone(self.cache.lookup("b"))
+        self.assertIsNotNone(self.cache.lookup("a"))
+        self.assertIsNotNone(self.cache.lookup("c"))
+
+    def test_index_persists(self):
+        self.cache.put("a", self._file("a.jpg"))
+        self.cache.close()
+        self.cache = ResultCache(os.path.join(self.tmp.name, "cache"), max_bytes=250)
+        self.assertEqual(self.cache.total_bytes, 100)
+        self.assertIsNotNone(self.cache.lookup("a"))
+
+if __name__ == '__main__':
+    unittest.main()
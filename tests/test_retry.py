@@ -0,0 +1,51 @@
+import unittest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from src.core.retry import RetryPolicy, parse_retry_after
+
+def status_error(code, headers=None):
+    request = httpx.Request("POST", "https://example.invalid/generate")
+    response = httpx.Response(code, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_classifies_errors(self):
+        policy = RetryPolicy()
+        for code in (408, 429, 500, 502, 503, 504):
+            self.assertTrue(policy.is_retryable(status_error(code)), code)
+        for code in (400, 401, 403, 404):
+            self.assertFalse(policy.is_retryable(status_error(code)), code)
+        self.assertTrue(policy.is_retryable(httpx.ReadTimeout("timeout")))
+        self.assertTrue(policy.is_retryable(httpx.ConnectError("reset")))
+        self.assertFalse(policy.is_retryable(ValueError("bad payload")))
+
+    def test_budget(self):
+        policy = RetryPolicy(max_attempts=3)
+        self.assertTrue(policy.should_retry(status_error(503), 2))
+        self.assertFalse(policy.should_retry(status_error(503), 3))
+
+    def test_backoff_uses_full_jitter_within_cap(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=10.0)
+        for attempts in range(1, 8):
+            ceiling = min(10.0, 2 ** (attempts - 1))
+            for _ in range(50):
+                self.assertTrue(0 <= policy.backoff(attempts) <= ceiling)
+
+    def test_backoff_honours_retry_after(self):
+        policy = RetryPolicy(base_delay=0.01, max_delay=60.0)
+        self.assertGreaterEqual(policy.backoff(1, status_error(429, {"Retry-After": "30"})), 30)
+        # Capped so a hostile header can't park a job forever
+        self.assertEqual(policy.backoff(1, status_error(429, {"Retry-After": "86400"})), 60.0)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("120"), 120.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        when = datetime.now(timezone.utc) + timedelta(seconds=90)
+        self.assertAlmostEqual(parse_retry_after(format_datetime(when, usegmt=True)), 90, delta=2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import queue
+import unittest
+
+from src.core.scheduler import JobScheduler
+
+def job(job_id, batch="a", priority=0, deadline=None):
+    return {"id": job_id, "batch_id": batch, "priority": priority, "deadline": deadline}
+
+def drain(scheduler):
+    order = []
+    while not scheduler.empty():
+        order.append(scheduler.get_nowait()["id"])
+    return order
+
+class TestJobScheduler(unittest.TestCase):
+    def test_fifo_within_priority(self):
+        s = JobScheduler()
+        s.put_many([job(i) for i in range(5)])
+        self.assertEqual(drain(s), [0, 1, 2, 3, 4])
+        with self.assertRaises(queue.Empty):
+            s.get_nowait()
+
+    def test_priority_first(self):
+        s = JobScheduler()
+        s.put_many([job(1), job(2), job(3, priority=5)])
+        self.assertEqual(drain(s), [3, 1, 2])
+
+    def test_fair_share_between_batches(self):
+        s = JobScheduler()
+        s.put_many([job(i, "overnight") for i in range(100)])
+        for _ in range(10):
+            s.get_nowait()
+        # A small batch arriving later interleaves instead of waiting for 90 jobs
+        s.put_many([job(f"u{i}", "urgent") for i in range(3)])
+        order = [s.get_nowait()["id"] for _ in range(6)]
+        self.assertEqual(sorted(str(i) for i in order if str(i).startswith("u")), ["u0", "u1", "u2"])
+
+    def test_batch_weight(self):
+        s = JobScheduler()
+        s.set_batch_weight("heavy", 3)
+        s.put_many([job(f"h{i}", "heavy") for i in range(30)] + [job(f"l{i}", "light") for i in range(30)])
+        first = [s.get_nowait()["id"] for _ in range(20)]
+        self.assertEqual(sum(1 for i in first if i.startswith("h")), 15)
+
+    def test_deadline_orders_within_priority(self):
+        s = JobScheduler()
+        s.put_many([job(1), job(2, deadline=200.0), job(3, deadline=100.0), job(4, priority=1)])
+        self.assertEqual(drain(s), [4, 3, 2, 1])
+
+    def test_reprioritize_and_remove(self):
+        s = JobScheduler()
+        s.put_many([job(i) for i in range(5)])
+        self.assertTrue(s.reprioritize(3, 10))
+        self.assertFalse(s.reprioritize(99, 10))
+        self.assertEqual(s.remove(1)["id"], 1)
+        self.assertEqual(s.qsize(), 4)
+        self.assertEqual(drain(s), [3, 0, 2, 4])
+
+    def test_batch_priority(self):
+        s = JobScheduler()
+        s.put_many([job(1, "a"), job(2, "b")])
+        s.set_batch_priority("b", 1)
+        self.assertEqual(drain(s), [2, 1])
+
+    def test_task_accounting_and_clear(self):
+        s = JobScheduler()
+        s.put_many([job(i) for i in range(3)])
+        s.get_nowait()
+        s.clear()
+        self.assertEqual(s.qsize(), 0)
+        self.assertEqual(s.unfinished_tasks, 1)
+        s.task_done()
+        self.assertEqual(s.unfinished_tasks, 0)
+
+if __name__ == '__main__':
+    unittest.main()
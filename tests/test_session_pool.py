@@ -0,0 +1,96 @@
+import asyncio
+import time
+import unittest
+
+from src.core.retry import RetryPolicy
+from src.core.session_pool import (LEAST_LOADED, WEIGHTED_ROUND_ROBIN, NoSessionAvailable,
+                                   PooledSession, SessionPool)
+
+class TestSessionPool(unittest.TestCase):
+    def test_least_loaded(self):
+        pool = SessionPool(LEAST_LOADED)
+        a = pool.add(PooledSession("a", "a"))
+        b = pool.add(PooledSession("b", "b"))
+        self.assertIs(pool.try_acquire(), a)
+        self.assertIs(pool.try_acquire(), b)
+        pool.record_success(a)
+        self.assertIs(pool.try_acquire(), a)
+
+    def test_weighted_round_robin(self):
+        pool = SessionPool(WEIGHTED_ROUND_ROBIN)
+        heavy = pool.add(PooledSession("heavy", "heavy", weight=3))
+        pool.add(PooledSession("light", "light", weight=1))
+        picks = []
+        for _ in range(8):
+            session = pool.try_acquire()
+            picks.append(session.name)
+            pool.record_success(session)
+        self.assertEqual(picks.count(heavy.name), 6)
+        # Smooth: the light account is not starved until the end of a cycle
+        self.assertIn("light", picks[:4])
+
+    def test_auth_failure_parks_all_but_the_last_account(self):
+        pool = SessionPool(base_cooldown=0.1)
+        a = pool.add(PooledSession("a", "a"))
+        b = pool.add(PooledSession("b", "b"))
+        pool.record_failure(pool.try_acquire(), 401)
+        self.assertTrue(a.disabled)
+        for _ in range(3):
+            session = pool.try_acquire()
+            self.assertIs(session, b)
+            pool.record_success(session)
+
+        # b is the last healthy account: it only cools down, so queued jobs wait instead of failing
+        pool.record_failure(pool.try_acquire(), 403)
+        self.assertFalse(b.disabled)
+        self.assertIsNone(pool.try_acquire())
+        self.assertIs(asyncio.run(pool.acquire_async()), b)
+
+    def test_new_token_brings_a_parked_account_back(self):
+        class Client:
+            auth_generation = 0
+
+        pool = SessionPool()
+        client = Client()
+        a = pool.add(PooledSession(client, "a"))
+        pool.add(PooledSession("b", "b"))
+        pool.record_failure(pool.try_acquire(), 401)
+        self.assertFalse(a.is_available(time.monotonic()))
+        client.auth_generation += 1
+        self.assertTrue(a.is_available(time.monotonic()))
+        self.assertFalse(a.disabled)
+
+    def test_all_parked_is_retryable(self):
+        pool = SessionPool(auth_cooldown=5)
+        a = pool.add(PooledSession("a", "a"))
+        a.disabled = True
+        a.cooldown_until = time.monotonic() + 5
+        with self.assertRaises(NoSessionAvailable) as ctx:
+            pool.try_acquire()
+        self.assertGreater(ctx.exception.retry_after, 4)
+        self.assertTrue(RetryPolicy().is_retryable(ctx.exception))
+        self.assertFalse(RetryPolicy().is_retryable(NoSessionAvailable("No accounts configured")))
+
+    def test_throttled_account_cools_down(self):
+        pool = SessionPool(base_cooldown=0.1)
+        a = pool.add(PooledSession("a", "a"))
+        pool.record_failure(pool.try_acquire(), 429)
+        self.assertIsNone(pool.try_acquire())
+        self.assertFalse(pool.has_available())
+
+        session = asyncio.run(pool.acquire_async())
+        self.assertIs(session, a)
+        pool.record_success(session)
+        self.assertEqual(a.cooldown, 0.0)
+
+    def test_per_account_quota(self):
+        pool = SessionPool()
+        a = pool.add(PooledSession("a", "a", rate_per_minute=1, burst=1))
+        b = pool.add(PooledSession("b", "b"))
+        self.assertIs(pool.try_acquire(), a)
+        # a is out of tokens, so b takes the next ones even though a is idle again
+        pool.record_success(a)
+        self.assertIs(pool.try_acquire(), b)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from src.services.thumbnail_cache import ThumbnailCache, thumbnail_key
+
+class TestThumbnailCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ThumbnailCache(os.path.join(self.tmp.name, "thumbs"), max_bytes=250)
+        self.renders = 0
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def _source(self, name, content=b"jpeg"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def _render(self, size=100):
+        def render(dest):
+            self.renders += 1
+            with open(dest, "wb") as f:
+                f.write(b"t" * size)
+        return render
+
+    def test_hit_after_put(self):
+        source = self._source("image_1.jpg")
+        thumb = self.cache.get_or_create(source, self._render())
+        self.assertTrue(os.path.exists(thumb))
+        self.assertEqual(self.cache.get_or_create(source, self._render()), thumb)
+        self.assertEqual(self.renders, 1)
+
+    def test_rewritten_source_invalidates(self):
+        source = self._source("image_1.jpg", b"first run")
+        old = self.cache.get_or_create(source, self._render())
+        key = thumbnail_key(source)
+
+        self._source("image_1.jpg", b"second run, new image")
+        self.assertNotEqual(thumbnail_key(source), key)
+        self.assertIsNone(self.cache.lookup(source))
+        new = self.cache.get_or_create(source, self._render())
+        self.assertNotEqual(new, old)
+        # The stale thumbnail is gone, not just unreferenced
+        self.assertFalse(os.path.exists(old))
+        self.assertEqual(self.cache.total_bytes, 100)
+
+    def test_lru_eviction(self):
+        sources = [self._source(f"image_{i}.jpg", bytes([i])) for i in range(3)]
+        thumbs = [self.cache.put(sources[0], self._render()), self.cache.put(sources[1], self._render())]
+        self.cache.lookup(sources[0])  # 1 is now least recently used
+        thumbs.append(self.cache.put(sources[2], self._render()))
+        self.assertLessEqual(self.cache.total_bytes, 250)
+        self.assertFalse(os.path.exists(thumbs[1]))
+        self.assertTrue(os.path.exists(thumbs[0]))
+        self.assertTrue(os.path.exists(thumbs[2]))
+
+    def test_index_survives_reopen(self):
+        source = self._source("image_1.jpg")
+        thumb = self.cache.put(source, self._render())
+        self.cache.close()
+        self.cache = ThumbnailCache(os.path.join(self.tmp.name, "thumbs"), max_bytes=250)
+        self.assertEqual(self.cache.lookup(source), thumb)
+        self.assertEqual(self.cache.total_bytes, 100)
+
+    def test_missing_source(self):
+        self.assertIsNone(self.cache.get_or_create(os.path.join(self.tmp.name, "nope.jpg"), self._render()))
+        self.assertEqual(self.renders, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import time
+import unittest
+
+from PIL import Image
+
+from src.services.thumbnail_service import ThumbnailService, load_thumbnail
+
+class FakeWidget:
+    """Stands in for the Tk root: after() callbacks run when the test pumps them."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, fn):
+        self.scheduled.append(fn)
+
+    def pump(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self.scheduled and time.monotonic() < deadline:
+            fn = self.scheduled.pop(0)
+            fn()
+            time.sleep(0.01)
+
+class TestThumbnailService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.widget = FakeWidget()
+        self.service = ThumbnailService(self.widget, size=(100, 100), max_cached=2)
+
+    def tearDown(self):
+        self.service.close()
+        self.tmp.cleanup()
+
+    def _jpeg(self, name, size=(1600, 900)):
+        path = os.path.join(self.tmp.name, name)
+        Image.new("RGB", size, (200, 30, 30)).save(path, "JPEG")
+        return path
+
+    def test_load_thumbnail_is_small(self):
+        thumb = load_thumbnail(self._jpeg("a.jpg"), (100, 100))
+        self.assertEqual(thumb.size[0], 100)
+        self.assertLess(thumb.size[1], 60)
+        self.assertEqual(thumb.mode, "RGB")
+
+    def test_request_delivers_through_after(self):
+        path = self._jpeg("a.jpg")
+        got = []
+        self.service.request(path, lambda p, img: got.append((p, img)))
+        self.service.request(path, lambda p, img: got.append((p, img)))
+        # Nothing runs until the main loop polls
+        self.assertEqual(got, [])
+        self.widget.pump()
+        self.assertEqual(len(got), 2)
+        self.assertIs(got[0][1], got[1][1])
+        self.assertLessEqual(max(got[0][1].size), 100)
+
+        # Cached: answered immediately
+        self.service.request(path, lambda p, img: got.append((p, img)))
+        self.assertEqual(len(got), 3)
+
+    def test_lru_and_failures(self):
+        paths = [self._jpeg(f"{i}.jpg") for i in range(3)]
+        for path in paths:
+            self.service.request(path, lambda p, img: None)
+        self.widget.pump()
+        # Only the newest two survive, whichever order the workers finished in
+        self.assertEqual(sum(self.service.get(p) is not None for p in paths), 2)
+
+        bad = os.path.join(self.tmp.name, "bad.jpg")
+        with open(bad, "wb") as f:
+            f.write(b"not an image")
+        got = []
+        self.service.request(bad, lambda p, img: got.append(img))
+        self.widget.pump()
+        self.assertEqual(got, [None])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from src.ui.list_window import visible_window
+
+class TestVisibleWindow(unittest.TestCase):
+    def test_top_of_list(self):
+        # 300px viewport of 100px rows: 3 rows plus one partly scrolled in and a spare
+        self.assertEqual(visible_window(0, 300, 100, 50), (0, 5, 0))
+
+    def test_scrolled_mid_row(self):
+        self.assertEqual(visible_window(1050, 300, 100, 50), (10, 5, 50))
+
+    def test_short_list_shows_every_row(self):
+        self.assertEqual(visible_window(0, 300, 100, 2), (0, 2, 0))
+
+    def test_last_partial_row(self):
+        # Offset as refresh() clamps it: content 1000 - viewport 250
+        first, count, shift = visible_window(750, 250, 100, 10)
+        self.assertEqual((first, count, shift), (7, 3, 50))
+        self.assertEqual(first + count, 10)
+
+    def test_offset_past_the_end_keeps_the_last_row(self):
+        first, count, shift = visible_window(5000, 300, 100, 10)
+        self.assertEqual((first, count), (9, 1))
+        self.assertEqual(shift, 5000 - 900)
+
+    def test_empty(self):
+        self.assertEqual(visible_window(0, 300, 100, 0), (0, 0, 0))
+        self.assertEqual(visible_window(0, 0, 100, 10), (0, 0, 0))
+
+if __name__ == '__main__':
+    unittest.main()